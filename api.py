@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+API JSON - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Leitura das atividades em JSON, com as mesmas regras de visibilidade do painel
+e suporte a GET condicional (ETag / 304 Not Modified), e sincronização
+incremental (alterações desde uma versão) e busca textual
+"""
+
+from flask import Blueprint, request, session, jsonify, current_app
+from models import get_escopo_versao, get_alteracoes, get_estatisticas, get_dashboard_page, CursorPagination
+from busca import parse_terms, search_atividades
+from identity import current_identity
+import hashlib
+
+api_blueprint = Blueprint('api', __name__, url_prefix='/api')
+
+# Row layout of /api/atividades, sent once per response instead of once per row
+ATIVIDADE_COLUMNS = ['id', 'descricao', 'status', 'prioridade', 'data_criada', 'prazo',
+                     'local', 'setor', 'criado_por_nome', 'solicitante', 'atendente']
+
+SYNC_COLUMNS = ATIVIDADE_COLUMNS + ['versao', 'atualizado_em']
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+def _compact_row(row):
+    return [row.id, row.descricao, row.status, row.prioridade, _isoformat(row.data_criada),
+            _isoformat(row.prazo), row.local, row.setor, row.criado_por_nome,
+            row.solicitante, row.atendente]
+
+def _api_error(message, status):
+    return jsonify({'error': message}), status
+
+def _scope(user):
+    """Setor whose atividades the user can read: None for every setor, False for none"""
+    if user and user.tipo == 2:
+        return user.setor_id if user.setor_nome else False
+    return None
+
+def _etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+def _page_body(setor_id, page, per_page, cursor):
+    pagination = get_dashboard_page(setor_id, page, per_page, cursor)
+    body = {
+        'columns': ATIVIDADE_COLUMNS,
+        'rows': [_compact_row(row) for row in pagination.items],
+        'per_page': per_page,
+    }
+    if isinstance(pagination, CursorPagination):
+        body.update(next_cursor=pagination.next_cursor, prev_cursor=pagination.prev_cursor)
+    else:
+        body.update(page=pagination.page, total=pagination.total,
+                    next_cursor=pagination.next_cursor, prev_cursor=None)
+    return body
+
+@api_blueprint.route('/atividades')
+def list_atividades():
+    """Atividades visible to the current user, as compact rows.
+
+    The ETag is derived from the version of the user's scope, so a matching
+    If-None-Match is answered with 304 before the atividades are queried.
+    """
+    if 'user_id' not in session:
+        return _api_error('Login necessário', 401)
+    user = current_identity()
+    if not user:
+        return _api_error('Login necessário', 401)
+
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', 10, type=int)),
+                   current_app.config.get('API_MAX_PER_PAGE', 100))
+    cursor = request.args.get('cursor') or None
+
+    setor_id = _scope(user)
+    if setor_id is False:
+        body = {'columns': ATIVIDADE_COLUMNS, 'rows': [], 'per_page': per_page,
+                'page': 1, 'total': 0, 'next_cursor': None, 'prev_cursor': None}
+        return jsonify(body)
+
+    # Read the version before the rows: if a change lands in between, the body is
+    # newer than its ETag and the next request simply gets a 200 again
+    versao = get_escopo_versao(setor_id)
+    etag = _etag(setor_id, versao, page, per_page, cursor)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        try:
+            body = _page_body(setor_id, page, per_page, cursor)
+        except ValueError:
+            # Invalid cursor, start over from the first page (like the dashboard)
+            body = _page_body(setor_id, 1, per_page, None)
+        response = jsonify(dict(body, versao=versao))
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@api_blueprint.route('/atividades/alteracoes')
+def list_alteracoes():
+    """Atividades changed and removed since the version in ?desde=, for incremental sync.
+
+    Clients keep the returned versao and pass it as desde on the next call,
+    repeating while mais is true.
+    """
+    if 'user_id' not in session:
+        return _api_error('Login necessário', 401)
+    user = current_identity()
+    if not user:
+        return _api_error('Login necessário', 401)
+
+    desde = request.args.get('desde', type=int)
+    if desde is None or desde < 0:
+        return _api_error('Parâmetro desde inválido', 400)
+    limite = min(max(1, request.args.get('limite', 500, type=int)),
+                 current_app.config.get('API_MAX_CHANGES', 1000))
+
+    setor_id = _scope(user)
+    if setor_id is False:
+        return jsonify({'columns': SYNC_COLUMNS, 'rows': [], 'removidas': [],
+                        'desde': desde, 'versao': desde, 'mais': False})
+
+    rows, removidas, versao, mais = get_alteracoes(desde, setor_id, limite)
+    return jsonify({
+        'columns': SYNC_COLUMNS,
+        'rows': [_compact_row(row) + [row.versao, _isoformat(row.atualizado_em)] for row in rows],
+        'removidas': removidas,
+        'desde': desde,
+        'versao': versao,
+        'mais': mais,
+    })
+
+@api_blueprint.route('/estatisticas')
+def estatisticas():
+    """Totals per status, prioridade and setor and the overdue count, for the atividades the user can see"""
+    if 'user_id' not in session:
+        return _api_error('Login necessário', 401)
+    user = current_identity()
+    if not user:
+        return _api_error('Login necessário', 401)
+
+    setor_id = _scope(user)
+    if setor_id is False:
+        return jsonify({'total': 0, 'por_status': {}, 'por_prioridade': {}, 'por_setor': [], 'atrasadas': 0})
+    return jsonify(get_estatisticas(setor_id))
+
+@api_blueprint.route('/atividades/busca')
+def search():
+    """Atividades visible to the current user matching ?q=, most relevant first"""
+    if 'user_id' not in session:
+        return _api_error('Login necessário', 401)
+    user = current_identity()
+    if not user:
+        return _api_error('Login necessário', 401)
+
+    terms = parse_terms(request.args.get('q'))
+    if not terms:
+        return _api_error('Parâmetro q inválido', 400)
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = min(max(1, request.args.get('per_page', 10, type=int)),
+                   current_app.config.get('API_MAX_PER_PAGE', 100))
+
+    setor_id = _scope(user)
+    if setor_id is False:
+        return jsonify({'columns': ATIVIDADE_COLUMNS + ['relevancia'], 'rows': [], 'page': 1,
+                        'per_page': per_page, 'total': 0})
+
+    pagination = search_atividades(terms, setor_id, page, per_page)
+    return jsonify({
+        'columns': ATIVIDADE_COLUMNS + ['relevancia'],
+        'rows': [_compact_row(row) + [float(row.relevancia)] for row in pagination.items],
+        'page': pagination.page,
+        'per_page': per_page,
+        'total': pagination.total,
+    })
@@ -9,9 +9,21 @@ Features: User authentication, task management, real-time notifications, role-ba
 """
 
 from flask import Flask, render_template, request
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_socketio import SocketIO, emit, join_room
 from auth import auth_blueprint, mail
+from api import api_blueprint
 from models import db, init_db
+from commands import register_commands
+from cache import dashboard_cache, setor_cache
+from mail_queue import mail_queue
+from security import password_hasher, throttle
+from notifications import notifications
+from arquivamento import archiver
+from prazos import deadline_scanner
+from db_pool import pool_monitor
+from metrics import metrics
+from slow_query import slow_query_log
 import os
 from dotenv import load_dotenv
 import logging
@@ -28,12 +40,88 @@ app.config['TESTING'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')  # Must be secure!
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Initialize SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Database connection pool (per worker). The threads per worker (GUNICORN_THREADS)
+# default to, and are capped at, size + overflow; pool_recycle stays below MySQL's wait_timeout and the
+# pre-ping replaces connections the server closed while the app was idle
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 10))
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 20))
+app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 30))
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 3600))
+app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+# Dashboard pagination: page numbers for the first pages, cursors after that
+app.config['DASHBOARD_OFFSET_PAGES'] = int(os.getenv('DASHBOARD_OFFSET_PAGES', 5))
+
+# Dashboard result cache: 'memory' (one worker), 'sqlite' (workers sharing a host) or 'none'.
+# Entries are keyed by the scope versions in the database, so writes of any process are
+# seen; the shared store is the default as soon as several workers can serve pages
+# (a Socket.IO message queue is configured)
+app.config['DASHBOARD_CACHE_BACKEND'] = (os.getenv('DASHBOARD_CACHE_BACKEND')
+                                         or ('sqlite' if os.getenv('SOCKETIO_MESSAGE_QUEUE') else 'memory'))
+app.config['DASHBOARD_CACHE_SIZE'] = int(os.getenv('DASHBOARD_CACHE_SIZE', 512))
+app.config['DASHBOARD_CACHE_PATH'] = os.getenv('DASHBOARD_CACHE_PATH', 'cache/dashboard.db')
+# Largest number of atividades changed by one bulk operation
+app.config['BULK_MAX_ATIVIDADES'] = int(os.getenv('BULK_MAX_ATIVIDADES', 500))
+# Rows per INSERT / commit when importing atividades
+app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+# Rows read from the server-side cursor (and written) at a time when exporting atividades
+app.config['EXPORT_CHUNK_SIZE'] = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+# Largest page size accepted by the JSON API
+app.config['API_MAX_PER_PAGE'] = int(os.getenv('API_MAX_PER_PAGE', 100))
+# Largest number of changes returned by one delta sync call
+app.config['API_MAX_CHANGES'] = int(os.getenv('API_MAX_CHANGES', 1000))
+# Finished atividades (Concluída / Cancelada) older than ARCHIVE_AFTER_DAYS are moved to
+# atividade_archive every ARCHIVE_INTERVAL seconds (0 = only with `flask archive-atividades`)
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 90))
+app.config['ARCHIVE_INTERVAL'] = int(os.getenv('ARCHIVE_INTERVAL', 0))
+app.config['ARCHIVE_BATCH_SIZE'] = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+app.config['ARCHIVE_BATCH_PAUSE'] = float(os.getenv('ARCHIVE_BATCH_PAUSE', 0.1))
+# Seconds between deadline scans (0 = only with `flask scan-prazos`) and the "due soon" window
+app.config['DEADLINE_SCAN_INTERVAL'] = int(os.getenv('DEADLINE_SCAN_INTERVAL', 60))
+app.config['DEADLINE_DUE_SOON_HOURS'] = int(os.getenv('DEADLINE_DUE_SOON_HOURS', 24))
+# Seconds a worker keeps its copy of the setor table
+app.config['SETOR_CACHE_TTL'] = int(os.getenv('SETOR_CACHE_TTL', 300))
+
+# Socket.IO pub/sub backend (e.g. redis://localhost:6379/0 or amqp://...) so that
+# emits reach clients connected to any worker; unset for a single process
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+app.config['SOCKETIO_CHANNEL'] = os.getenv('SOCKETIO_CHANNEL', 'gestor_tarefas')
+# Without sticky sessions in the load balancer, long-polling breaks across workers
+# (start_production.py turns this on when it starts several workers)
+app.config['SOCKETIO_WEBSOCKET_ONLY'] = os.getenv('SOCKETIO_WEBSOCKET_ONLY', 'False').lower() == 'true'
+
+# Initialize SocketIO; websocket-only is enforced by the server too, so a client
+# that still tries long-polling fails at once instead of on another worker
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'],
+                    channel=app.config['SOCKETIO_CHANNEL'],
+                    transports=['websocket'] if app.config['SOCKETIO_WEBSOCKET_ONLY'] else None)
 
 # Store socketio in app extensions for access from blueprints
 app.extensions['socketio'] = socketio
 
+# Task notifications are grouped per room for this many seconds before being emitted
+app.config['NOTIFY_COALESCE_WINDOW'] = float(os.getenv('NOTIFY_COALESCE_WINDOW', 0.25))
+app.config['NOTIFY_MAX_BATCH'] = int(os.getenv('NOTIFY_MAX_BATCH', 200))
+notifications.init_app(app, socketio)
+
+# Prometheus metrics on /metrics (per worker process). Off by default: no hook is
+# installed; when METRICS_TOKEN is set scrapes must send "Authorization: Bearer <token>"
+app.config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN') or None
+metrics.init_app(app, socketio)
+
+# Slow-query log: statements above the threshold are kept in a ring buffer (shown on
+# /admin/slow-queries) and in a rotating JSONL file; a sample of them is EXPLAINed
+app.config['SLOW_QUERY_ENABLED'] = os.getenv('SLOW_QUERY_ENABLED', 'False').lower() == 'true'
+app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+app.config['SLOW_QUERY_EXPLAIN_SAMPLE'] = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', 0.1))
+# Parameters are masked (type and length only) unless this is set: they hold emails and reset tokens
+app.config['SLOW_QUERY_LOG_PARAMETERS'] = os.getenv('SLOW_QUERY_LOG_PARAMETERS', 'False').lower() == 'true'
+app.config['SLOW_QUERY_BUFFER_SIZE'] = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', 500))
+app.config['SLOW_QUERY_LOG_PATH'] = os.getenv('SLOW_QUERY_LOG_PATH', 'logs/slow_queries.jsonl')
+slow_query_log.init_app(app)
+
 # Security headers
 @app.after_request
 def security_headers(response):
@@ -43,6 +131,26 @@ def security_headers(response):
     response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
     return response
 
+# Password hashing runs on a bounded executor (0 workers = half the CPUs)
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+# Login / password reset throttling: bucket size and tokens refilled per second
+app.config['THROTTLE_EMAIL_CAPACITY'] = int(os.getenv('THROTTLE_EMAIL_CAPACITY', 5))
+app.config['THROTTLE_EMAIL_REFILL'] = float(os.getenv('THROTTLE_EMAIL_REFILL', 5 / 300))
+app.config['THROTTLE_IP_CAPACITY'] = int(os.getenv('THROTTLE_IP_CAPACITY', 20))
+app.config['THROTTLE_IP_REFILL'] = float(os.getenv('THROTTLE_IP_REFILL', 20 / 60))
+
+# Reverse proxies in front of the app (nginx, a load balancer...). The per-IP
+# throttle keys on request.remote_addr, which behind a proxy is the proxy's
+# address; with PROXY_FIX_X_FOR=1 it is read from X-Forwarded-For instead.
+# Leave it at 0 when clients reach the app directly, or they could forge it
+app.config['PROXY_FIX_X_FOR'] = int(os.getenv('PROXY_FIX_X_FOR', 0))
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'],
+                            x_proto=app.config['PROXY_FIX_X_FOR'])
+
 # Mail configuration
 app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
@@ -56,12 +164,28 @@ app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', os.getenv('
 app.config['MAIL_TIMEOUT'] = 30
 app.config['MAIL_DEBUG'] = True
 
+# Outbound mail queue (emails are sent by background workers)
+app.config['MAIL_QUEUE_WORKERS'] = int(os.getenv('MAIL_QUEUE_WORKERS', 2))
+app.config['MAIL_QUEUE_MAX_ATTEMPTS'] = int(os.getenv('MAIL_QUEUE_MAX_ATTEMPTS', 5))
+app.config['MAIL_QUEUE_RETRY_BASE'] = int(os.getenv('MAIL_QUEUE_RETRY_BASE', 30))
+app.config['MAIL_QUEUE_POLL_INTERVAL'] = int(os.getenv('MAIL_QUEUE_POLL_INTERVAL', 30))
+
 # Initialize extensions
+pool_monitor.init_app(app, db)  # Engine options, before the engine is created
 db.init_app(app)
 mail.init_app(app)
+mail_queue.init_app(app, mail)
+archiver.init_app(app)
+deadline_scanner.init_app(app)
+password_hasher.init_app(app)
+throttle.init_app(app)
+dashboard_cache.init_app(app)
+setor_cache.init_app(app)
 init_db(app)
 
 app.register_blueprint(auth_blueprint)
+app.register_blueprint(api_blueprint)
+register_commands(app)
 
 # WebSocket events
 @socketio.on('connect')
@@ -104,12 +228,13 @@ def internal_error(error):
     db.session.rollback()
     return render_template('500.html'), 500
 
-# Logging setup
-if not app.debug and not os.path.exists('logs'):
-    os.mkdir('logs')
+# Logging setup (LOG_DIR, relative to the working directory)
+log_dir = os.getenv('LOG_DIR', 'logs')
+if not app.debug and not os.path.exists(log_dir):
+    os.makedirs(log_dir)
     
 if not app.debug:
-    file_handler = RotatingFileHandler('logs/gestor_tarefas.log', maxBytes=10240, backupCount=10)
+    file_handler = RotatingFileHandler(os.path.join(log_dir, 'gestor_tarefas.log'), maxBytes=10240, backupCount=10)
     file_handler.setFormatter(logging.Formatter(
         '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
     ))
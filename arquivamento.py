@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Arquivamento de Atividades - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Arquivamento das atividades concluídas ou canceladas há mais de N dias: as
+linhas são movidas em lotes pequenos da tabela atividade para atividade_archive,
+mantendo a tabela do painel pequena à medida que o histórico cresce
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import literal, select
+from models import (db, Atividade, AtividadeArquivada, AtividadeRemovida,
+                    next_versao, apply_bulk_change, counted_state)
+import threading
+import time
+
+# Only atividades in these statuses are archived
+FINISHED_STATUSES = ('Concluída', 'Cancelada')
+
+def archive_batch(cutoff, batch_size=500):
+    """Move up to batch_size finished atividades last changed before cutoff to the archive.
+
+    Runs in one short transaction; returns the number of atividades moved.
+    """
+    connection = db.session.connection()
+    # The version row is locked first, in the same order as the other changes
+    versao = next_versao(connection)
+    rows = db.session.query(
+        Atividade.id, Atividade.setor_id, Atividade.status, Atividade.prioridade, Atividade.prazo
+    ).filter(
+        Atividade.status.in_(FINISHED_STATUSES),
+        Atividade.atualizado_em < cutoff
+    ).order_by(Atividade.id).limit(batch_size).with_for_update().all()
+    if not rows:
+        db.session.rollback()
+        return 0
+
+    ids = [row.id for row in rows]
+    table = Atividade.__table__
+    archive = AtividadeArquivada.__table__
+    columns = [column.name for column in table.columns]
+    arquivada_em = datetime.utcnow()
+    connection.execute(archive.insert().from_select(
+        columns + ['arquivada_em'],
+        select(*[table.c[name] for name in columns], literal(arquivada_em)).where(table.c.id.in_(ids))
+    ))
+    connection.execute(table.delete().where(table.c.id.in_(ids)))
+
+    # For the dashboard and delta sync an archived atividade is a removed one
+    apply_bulk_change(connection, versao,
+                      [counted_state(row.setor_id, row.status, row.prioridade, row.prazo) for row in rows], [])
+    connection.execute(AtividadeRemovida.__table__.insert(), [
+        {'atividade_id': row.id, 'setor_id': row.setor_id, 'versao': versao, 'movida': False,
+         'removido_em': arquivada_em}
+        for row in rows
+    ])
+
+    db.session.commit()
+    db.session.expire_all()
+    return len(rows)
+
+def archive_finished(max_age_days, batch_size=500, pause=0, on_batch=None):
+    """Archive every atividade finished more than max_age_days ago, batch by batch.
+
+    pause (seconds) between batches leaves room for the regular traffic;
+    on_batch(total) is called after every batch. Returns the number archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if on_batch and moved:
+            on_batch(total)
+        if moved < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
+
+class Archiver:
+    """Periodic archival of finished atividades in a background thread.
+
+    Disabled when ARCHIVE_INTERVAL is 0; the `flask archive-atividades`
+    command can then be scheduled (e.g. with cron) instead.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._started = False
+        self.archived = 0
+        self.last_run = None
+
+    def init_app(self, app):
+        self.app = app
+        self.max_age_days = app.config.get('ARCHIVE_AFTER_DAYS', 90)
+        self.batch_size = app.config.get('ARCHIVE_BATCH_SIZE', 500)
+        self.interval = app.config.get('ARCHIVE_INTERVAL', 0)
+        self.pause = app.config.get('ARCHIVE_BATCH_PAUSE', 0.1)
+        # Threads don't survive a fork, so the thread is started by the first request of each worker
+        app.before_request(self._ensure_started)
+        app.extensions['archiver'] = self
+
+    def _ensure_started(self):
+        if self._started or self.interval <= 0:
+            return
+        with self._lock:
+            if self._started:
+                return
+            threading.Thread(target=self._run, name='archiver', daemon=True).start()
+            self._started = True
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.run_once()
+                except Exception as e:
+                    self.app.logger.error(f"Archiver error: {e}")
+                finally:
+                    db.session.remove()
+
+    def run_once(self):
+        archived = archive_finished(self.max_age_days, self.batch_size, self.pause)
+        with self._lock:
+            self.archived += archived
+            self.last_run = datetime.utcnow()
+        if archived:
+            self.app.logger.info(f"Archived {archived} finished atividades")
+        return archived
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'max_age_days': self.max_age_days,
+            'archived': self.archived,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+        }
+
+archiver = Archiver()
@@ -8,13 +8,26 @@ Gerencia autenticação de usuários, registro, gerenciamento de senhas,
 gestão de tarefas com controle de acesso baseado em papéis e notificações em tempo real
 """
 
-from flask import Blueprint, request, render_template, redirect, url_for, session, flash
+from flask import (Blueprint, request, render_template, redirect, url_for, session, flash, current_app, jsonify,
+                   stream_with_context)
 from flask_mail import Mail, Message
 from flask_socketio import emit
-from werkzeug.security import generate_password_hash, check_password_hash
 from models import (get_user_by_username, get_user_by_email, create_user, 
                    get_user_by_reset_token, update_user_password, create_atividade, 
-                   get_all_atividades, get_atividades_by_setor, Atividade, db)
+                   get_all_atividades, get_atividades_by_setor, Atividade, db,
+                   CursorPagination, encode_cursor, get_setores, get_setor_nome,
+                   get_escopo_versao, bulk_update_status, bulk_delete_atividades, PRAZO_DIAS,
+                   get_atividades_arquivadas, get_estatisticas)
+from cache import dashboard_cache
+from identity import current_identity
+from mail_queue import mail_queue
+from db_pool import pool_monitor
+from slow_query import slow_query_log
+from security import password_hasher, throttle, HashBusy
+from notifications import notifications
+from importacao import import_atividades
+from exportacao import export_atividades, parse_date, FORMATS
+from busca import parse_terms, search_atividades
 import logging
 
 auth_blueprint = Blueprint('auth', __name__)
@@ -27,8 +40,7 @@ def register():
     # Redirect logged-in users to dashboard
     if 'user_id' in session:
         return redirect(url_for('auth.index'))
-    from models import Setor
-    setores = Setor.query.all()
+    setores = get_setores()
     if request.method == 'POST':
         username = request.form['username']
         email = request.form['email']
@@ -50,7 +62,11 @@ def register():
             flash('Email já está cadastrado', 'error')
             return redirect(url_for('auth.register'))
         
-        create_user(username, email, password, setor_id, tipo)
+        try:
+            create_user(username, email, password, setor_id, tipo)
+        except HashBusy:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return redirect(url_for('auth.register'))
         flash('Cadastro realizado com sucesso! Faça o login.', 'success')
         return redirect(url_for('auth.login'))
     return render_template('register.html', setores=setores)
@@ -64,8 +80,23 @@ def login():
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
+        if not throttle.allow(email, request.remote_addr):
+            flash('Muitas tentativas. Aguarde alguns minutos e tente novamente.', 'error')
+            return redirect(url_for('auth.login'))
         user = get_user_by_email(email)
-        if user and check_password_hash(user.password, password):
+        try:
+            valid = bool(user) and password_hasher.check(user.password, password)
+        except HashBusy:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return redirect(url_for('auth.login'))
+        if valid:
+            # Upgrade hashes made with older parameters while we have the plain password
+            if password_hasher.needs_rehash(user.password):
+                try:
+                    user.password = password_hasher.generate(password)
+                    db.session.commit()
+                except HashBusy:
+                    pass
             session['user_id'] = user.id
             session['username'] = user.username
             session['email'] = user.email
@@ -91,35 +122,63 @@ def index():
     
     # Get pagination parameters
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor') or None
+    # ?arquivo=1 shows the archive alone (read-only); the dashboard never includes archived atividades
+    arquivo = request.args.get('arquivo') == '1'
     per_page = 10  # 10 tasks per page
+    # Page numbers are only offered for the first pages, deeper pages use cursors
+    offset_pages = current_app.config.get('DASHBOARD_OFFSET_PAGES', 5)
+    page = max(1, min(page, offset_pages))
     
-    # Get the current user object
-    from models import User, Setor
-    user = User.query.get(session['user_id'])
+    # Get the current user (loaded once per request, setor name included)
+    user = current_identity()
     
     # Filter atividades based on user type
     user_setor_nome = None
-    if user and getattr(user, 'tipo', None) == 2:
-        # For tipo 2 users, only show tasks from their setor
-        user_setor = Setor.query.get(user.setor_id)
-        if user_setor:
-            user_setor_nome = user_setor.nome
-            # Get paginated tasks that match the user's setor name
-            pagination = get_atividades_by_setor(user_setor.nome, page=page, per_page=per_page)
+    sync_versao = 0
+    estatisticas = None
+    try:
+        if user and user.tipo == 2:
+            # For tipo 2 users, only show tasks from their setor
+            if user.setor_nome:
+                user_setor_nome = user.setor_nome
+                # Version the page is at, read before the page so reconnecting clients don't miss changes
+                sync_versao = get_escopo_versao(user.setor_id)
+                estatisticas = get_estatisticas(user.setor_id)
+                # Get paginated tasks of the user's setor
+                if arquivo:
+                    pagination = get_atividades_arquivadas(user.setor_id, page=page, per_page=per_page, cursor=cursor)
+                else:
+                    pagination = get_atividades_by_setor(user.setor_id, page=page, per_page=per_page, cursor=cursor)
+            else:
+                # Create empty pagination object
+                from sqlalchemy import text
+                empty_query = db.session.query(text('1')).filter(text('1=0'))
+                pagination = empty_query.paginate(page=page, per_page=per_page, error_out=False)
         else:
-            # Create empty pagination object
-            from sqlalchemy import text
-            empty_query = db.session.query(text('1')).filter(text('1=0'))
-            pagination = empty_query.paginate(page=page, per_page=per_page, error_out=False)
-    else:
-        # For tipo 1 users, show all tasks with pagination
-        pagination = get_all_atividades(page=page, per_page=per_page)
+            # For tipo 1 users, show all tasks with pagination
+            sync_versao = get_escopo_versao()
+            estatisticas = get_estatisticas()
+            if arquivo:
+                pagination = get_atividades_arquivadas(page=page, per_page=per_page, cursor=cursor)
+            else:
+                pagination = get_all_atividades(page=page, per_page=per_page, cursor=cursor)
+    except ValueError:
+        # Invalid cursor, start over from the first page
+        return redirect(url_for('auth.index', arquivo=1 if arquivo else None))
     
     atividades = pagination.items
     
     return render_template('index.html', 
                          atividades=atividades, 
                          pagination=pagination,
+                         keyset=isinstance(pagination, CursorPagination),
+                         last_cursor=encode_cursor('prev'),
+                         offset_pages=offset_pages,
+                         sync_versao=sync_versao,
+                         arquivo=1 if arquivo else None,
+                         arquivo_dias=current_app.config.get('ARCHIVE_AFTER_DAYS', 90),
+                         estatisticas=estatisticas,
                          user=user, 
                          user_setor=user_setor_nome)
 
@@ -134,28 +193,29 @@ def new_task():
         descricao = request.form['descricao']
         prioridade = request.form['prioridade']
         local = request.form.get('local')
-        setor = request.form.get('setor')
+        setor_id = request.form.get('setor_id', type=int)
         solicitante = request.form.get('solicitante')
         
-        # Get current user to check tipo and setor_id
-        from models import User, Setor
-        current_user = User.query.get(session['user_id'])
+        # Get current user to check tipo and setor
+        current_user = current_identity()
         
-        # If user tipo is 2, force setor to be the user's setor name
-        if current_user and getattr(current_user, 'tipo', None) == 2:
-            user_setor = Setor.query.get(current_user.setor_id)
-            expected_setor = user_setor.nome if user_setor else None
-            
+        # If user tipo is 2, force setor to be the user's setor
+        if current_user and current_user.tipo == 2:
             # Validate that tipo 2 users can only create tasks in their own sector
-            if setor and setor.strip() != expected_setor:
+            if setor_id and setor_id != current_user.setor_id:
                 flash('Você só pode criar atividades no seu próprio setor.', 'error')
                 return redirect(url_for('auth.new_task'))
             
             # Force correct values for tipo 2 users
-            setor = expected_setor
+            setor_id = current_user.setor_id
             local = "CAM 2"
             solicitante = current_user.username
         
+        setor = get_setor_nome(setor_id) if setor_id else None
+        if setor_id and setor is None:
+            flash('Setor não encontrado.', 'error')
+            return redirect(url_for('auth.new_task'))
+        
         # Basic validation
         if not descricao or not prioridade or not local:
             flash('Descrição, Prioridade e Local são obrigatórios', 'warning')
@@ -168,36 +228,25 @@ def new_task():
                 prioridade=prioridade,
                 user_id=session['user_id'],
                 local=local.strip() if local else None,
-                setor=setor.strip() if setor else None,
+                setor_id=setor_id,
                 solicitante=solicitante.strip() if solicitante else None
             )
             
-            # Emit notification to admin users (tipo==1) if task was created by tipo==2 user
-            if current_user and getattr(current_user, 'tipo', None) == 2:
-                try:
-                    # Import here to avoid circular imports
-                    from flask import current_app
-                    socketio = current_app.extensions.get('socketio')
-                    if socketio:
-                        # Send complete data including the new activity ID
-                        from datetime import datetime
-                        socketio.emit('new_task_notification', {
-                            'atividade_id': new_atividade.id,
-                            'descricao': descricao,
-                            'local': local.strip() if local else 'Não especificado',
-                            'setor': setor.strip() if setor else '-',
-                            'criado_por_nome': current_user.username,
-                            'solicitante': solicitante.strip() if solicitante else 'Não atribuído',
-                            'atendente': '-',
-                            'prioridade': prioridade,
-                            'data_criada': datetime.now().strftime('%d/%m/%Y'),
-                            'prazo': 'Não definido',
-                            'status': 'Pendente',
-                            'message': f'Nova tarefa criada por {solicitante} no setor {setor}'
-                        }, room='admin_room')
-                except Exception as socket_error:
-                    from flask import current_app
-                    current_app.logger.warning(f"Error sending WebSocket notification: {socket_error}")
+            # Notify admin users (tipo==1) if task was created by tipo==2 user
+            if current_user and current_user.tipo == 2:
+                notifications.publish('new', 'admin_room', new_atividade.id, {
+                    'descricao': descricao,
+                    'local': local.strip() if local else 'Não especificado',
+                    'setor': setor if setor else '-',
+                    'criado_por_nome': current_user.username,
+                    'solicitante': solicitante.strip() if solicitante else 'Não atribuído',
+                    'atendente': '-',
+                    'prioridade': prioridade,
+                    'data_criada': new_atividade.data_criada.strftime('%d/%m/%Y'),
+                    'prazo': 'Não definido',
+                    'status': 'Pendente',
+                    'message': f'Nova tarefa criada por {solicitante} no setor {setor}'
+                })
             
             flash('Atividade criada com sucesso!', 'success')
             return redirect(url_for('auth.index'))
@@ -205,11 +254,8 @@ def new_task():
             flash(f'Erro ao criar atividade: {str(e)}', 'error')
             return redirect(url_for('auth.new_task'))
     
-    # Get current user to pass to template
-    from models import User
-    current_user = User.query.get(session['user_id'])
-    
-    return render_template('newtask.html', username=session.get('username'), user=current_user)
+    return render_template('newtask.html', username=session.get('username'), user=current_identity(),
+                           setores=get_setores())
 
 @auth_blueprint.route('/update-status/<int:atividade_id>/<new_status>')
 def update_status(atividade_id, new_status):
@@ -218,53 +264,34 @@ def update_status(atividade_id, new_status):
         return redirect(url_for('auth.login'))
     try:
         atividade = Atividade.query.get_or_404(atividade_id)
-        from models import User
-        user = User.query.get(session['user_id'])
-        if user and getattr(user, 'tipo', None) == 2:
+        user = current_identity()
+        if user and user.tipo == 2:
             flash('Você não tem permissão para atualizar atividades.', 'warning')
             return redirect(url_for('auth.index'))
         # Set prazo when moving from Pendente to Em andamento
         if atividade.status == 'Pendente' and new_status == 'Em andamento':
             from datetime import datetime, timedelta
             # Set prazo based on prioridade
-            if atividade.prioridade == 'Baixa':
-                atividade.prazo = datetime.now() + timedelta(days=15)
-            elif atividade.prioridade == 'Média':
-                atividade.prazo = datetime.now() + timedelta(days=10)
-            elif atividade.prioridade == 'Alta':
-                atividade.prazo = datetime.now() + timedelta(days=5)
-            elif atividade.prioridade == 'Crítica':
-                atividade.prazo = datetime.now() + timedelta(days=2)
+            if atividade.prioridade in PRAZO_DIAS:
+                atividade.prazo = datetime.now() + timedelta(days=PRAZO_DIAS[atividade.prioridade])
             # Set atendente to current user's username
-            current_user = User.query.get(session['user_id'])
-            if current_user:
-                atividade.atendente = current_user.username
+            if user:
+                atividade.atendente = user.username
         atividade.status = new_status
         db.session.commit()
         
-        # Emit notification to tipo==2 users when their activities are updated
-        try:
-            # Import here to avoid circular imports
-            from flask import current_app
-            socketio = current_app.extensions.get('socketio')
-            if socketio:
-                # Get the setor of the updated activity
-                setor_room = f"setor_{atividade.setor}" if atividade.setor else None
-                
-                if setor_room:
-                    socketio.emit('activity_update_notification', {
-                        'atividade_id': atividade.id,
-                        'descricao': atividade.descricao,
-                        'status': new_status,
-                        'prioridade': atividade.prioridade,
-                        'setor': atividade.setor,
-                        'atendente': atividade.atendente,
-                        'prazo': atividade.prazo.strftime('%d/%m/%Y') if atividade.prazo else 'Não definido',
-                        'message': f'Atividade "{atividade.descricao[:50]}..." foi atualizada para "{new_status}"'
-                    }, room=setor_room)
-        except Exception as socket_error:
-            from flask import current_app
-            current_app.logger.warning(f"Error sending WebSocket notification: {socket_error}")
+        # Notify tipo==2 users when their activities are updated
+        setor_nome = get_setor_nome(atividade.setor_id) if atividade.setor_id else None
+        if setor_nome:
+            notifications.publish('update', f"setor_{setor_nome}", atividade.id, {
+                'descricao': atividade.descricao,
+                'status': new_status,
+                'prioridade': atividade.prioridade,
+                'setor': setor_nome,
+                'atendente': atividade.atendente,
+                'prazo': atividade.prazo.strftime('%d/%m/%Y') if atividade.prazo else 'Não definido',
+                'message': f'Atividade "{atividade.descricao[:50]}..." foi atualizada para "{new_status}"'
+            })
         
         flash(f'Status da atividade atualizado para "{new_status}" com sucesso!', 'success')
     except Exception as e:
@@ -278,9 +305,8 @@ def delete_atividade(atividade_id):
         return redirect(url_for('auth.login'))
     try:
         atividade = Atividade.query.get_or_404(atividade_id)
-        from models import User
-        user = User.query.get(session['user_id'])
-        if user and getattr(user, 'tipo', None) == 2:
+        user = current_identity()
+        if user and user.tipo == 2:
             flash('Você não tem permissão para excluir atividades.', 'warning')
             return redirect(url_for('auth.index'))
         # Only restrict tipo==2 users, tipo==1 can delete any task
@@ -292,6 +318,241 @@ def delete_atividade(atividade_id):
         flash(f'Erro ao excluir atividade: {str(e)}', 'error')
     return redirect(url_for('auth.index'))
 
+def _selected_ids():
+    """Atividade ids checked in the dashboard, without repetitions"""
+    return list(dict.fromkeys(request.form.getlist('atividade_ids', type=int)))
+
+def _notify_setores(kind, rows, payload):
+    """Publish one event per setor room for rows changed by a bulk operation"""
+    by_setor = {}
+    for row in rows:
+        by_setor.setdefault(row['setor_id'], []).append(row)
+    for setor_id, setor_rows in by_setor.items():
+        setor_nome = get_setor_nome(setor_id) if setor_id else None
+        if setor_nome:
+            notifications.publish_many(kind, f"setor_{setor_nome}",
+                                       [(row['id'], payload(row, setor_nome)) for row in setor_rows])
+
+@auth_blueprint.route('/bulk/update-status', methods=['POST'])
+def bulk_status():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if user and user.tipo == 2:
+        flash('Você não tem permissão para atualizar atividades.', 'warning')
+        return redirect(url_for('auth.index'))
+    
+    new_status = request.form.get('status')
+    if new_status not in Atividade.status.type.enums:
+        flash('Status inválido.', 'error')
+        return redirect(url_for('auth.index'))
+    atividade_ids = _selected_ids()
+    limit = current_app.config.get('BULK_MAX_ATIVIDADES', 500)
+    if not atividade_ids:
+        flash('Selecione ao menos uma atividade.', 'warning')
+        return redirect(url_for('auth.index'))
+    if len(atividade_ids) > limit:
+        flash(f'Selecione no máximo {limit} atividades por vez.', 'warning')
+        return redirect(url_for('auth.index'))
+    
+    try:
+        changed = bulk_update_status(atividade_ids, new_status, atendente=user.username if user else None)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao atualizar status: {str(e)}', 'error')
+        return redirect(url_for('auth.index'))
+    
+    # Notify tipo==2 users of the affected setores, one batch per setor
+    _notify_setores('update', changed, lambda row, setor_nome: {
+        'descricao': row['descricao'],
+        'status': new_status,
+        'prioridade': row['prioridade'],
+        'setor': setor_nome,
+        'atendente': row['atendente'],
+        'prazo': row['prazo'].strftime('%d/%m/%Y') if row['prazo'] else 'Não definido',
+        'message': f'Atividade "{row["descricao"][:50]}..." foi atualizada para "{new_status}"'
+    })
+    
+    flash(f'{len(changed)} atividade(s) atualizada(s) para "{new_status}" com sucesso!', 'success')
+    return redirect(url_for('auth.index'))
+
+@auth_blueprint.route('/bulk/delete-atividades', methods=['POST'])
+def bulk_delete():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if user and user.tipo == 2:
+        flash('Você não tem permissão para excluir atividades.', 'warning')
+        return redirect(url_for('auth.index'))
+    
+    atividade_ids = _selected_ids()
+    limit = current_app.config.get('BULK_MAX_ATIVIDADES', 500)
+    if not atividade_ids:
+        flash('Selecione ao menos uma atividade.', 'warning')
+        return redirect(url_for('auth.index'))
+    if len(atividade_ids) > limit:
+        flash(f'Selecione no máximo {limit} atividades por vez.', 'warning')
+        return redirect(url_for('auth.index'))
+    
+    try:
+        deleted = bulk_delete_atividades(atividade_ids)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao excluir atividades: {str(e)}', 'error')
+        return redirect(url_for('auth.index'))
+    
+    # Remove the rows from open dashboards
+    _notify_setores('delete', deleted, lambda row, setor_nome: {'descricao': row['descricao']})
+    notifications.publish_many('delete', 'admin_room', [(row['id'], {'descricao': row['descricao']}) for row in deleted])
+    
+    flash(f'{len(deleted)} atividade(s) excluída(s) com sucesso!', 'success')
+    return redirect(url_for('auth.index'))
+
+@auth_blueprint.route('/import-atividades', methods=['GET', 'POST'])
+def import_tasks():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if not user or user.tipo != 1:
+        flash('Você não tem permissão para acessar esta página.', 'warning')
+        return redirect(url_for('auth.index'))
+    
+    resultado = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo CSV ou JSONL.', 'warning')
+            return redirect(url_for('auth.import_tasks'))
+        formato = request.form.get('formato') or (
+            'jsonl' if arquivo.filename.lower().endswith(('.jsonl', '.json')) else 'csv')
+        if formato not in ('csv', 'jsonl'):
+            flash('Formato inválido.', 'error')
+            return redirect(url_for('auth.import_tasks'))
+        
+        # The upload is read as a stream, one row at a time
+        resultado = import_atividades(arquivo.stream, formato, user.id,
+                                      batch_size=current_app.config.get('IMPORT_BATCH_SIZE', 500))
+        if resultado.importadas:
+            # One summary for the whole import instead of one notification per task
+            notifications.announce('import_summary', 'admin_room', dict(
+                resultado.summary(),
+                message=f'{resultado.importadas} atividade(s) importada(s) por {user.username}'
+            ))
+        category = 'success' if not resultado.rejeitadas and not resultado.interrompida else 'warning'
+        flash(f'{resultado.importadas} atividade(s) importada(s), {resultado.rejeitadas} linha(s) rejeitada(s).', category)
+        if resultado.interrompida:
+            linha, mensagem = resultado.interrompida
+            flash(f'Importação interrompida na linha {linha}: {mensagem}. '
+                  f'As linhas anteriores foram importadas.', 'error')
+    
+    return render_template('import_tasks.html', user=user, resultado=resultado)
+
+@auth_blueprint.route('/export-atividades')
+def export_tasks():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    
+    formato = request.args.get('formato', 'csv')
+    status = request.args.get('status') or None
+    setor_id = request.args.get('setor_id', type=int)
+    if formato not in FORMATS or (status and status not in Atividade.status.type.enums):
+        flash('Parâmetros de exportação inválidos.', 'error')
+        return redirect(url_for('auth.index'))
+    try:
+        desde = parse_date(request.args.get('desde'))
+        ate = parse_date(request.args.get('ate'))
+    except ValueError:
+        flash('Datas devem estar no formato AAAA-MM-DD.', 'error')
+        return redirect(url_for('auth.index'))
+    
+    # tipo 2 users can only export their own setor
+    if user and user.tipo == 2:
+        setor_id = user.setor_id
+    
+    from datetime import datetime
+    chunks = export_atividades(formato, chunk_size=current_app.config.get('EXPORT_CHUNK_SIZE', 1000),
+                               setor_id=setor_id, status=status, desde=desde, ate=ate)
+    filename = f"atividades-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{formato}"
+    return current_app.response_class(
+        stream_with_context(chunk.encode('utf-8') for chunk in chunks),
+        mimetype=FORMATS[formato][1],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@auth_blueprint.route('/busca')
+def search():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    
+    busca = (request.args.get('q') or '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    pagination = None
+    terms = parse_terms(busca)
+    if busca and not terms:
+        flash('Digite ao menos uma palavra para buscar.', 'warning')
+    elif terms:
+        # Same visibility as the dashboard: tipo 2 users only see their setor
+        if user and user.tipo == 2:
+            if user.setor_nome:
+                pagination = search_atividades(terms, user.setor_id, page=page, per_page=10)
+        else:
+            pagination = search_atividades(terms, page=page, per_page=10)
+    
+    return render_template('busca.html', busca=busca, pagination=pagination, user=user)
+
+@auth_blueprint.route('/admin/cache-stats')
+def cache_stats():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if not user or user.tipo != 1:
+        flash('Você não tem permissão para acessar esta página.', 'warning')
+        return redirect(url_for('auth.index'))
+    return jsonify(dashboard_cache.stats())
+
+@auth_blueprint.route('/admin/mail-stats')
+def mail_stats():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if not user or user.tipo != 1:
+        flash('Você não tem permissão para acessar esta página.', 'warning')
+        return redirect(url_for('auth.index'))
+    return jsonify(mail_queue.stats())
+
+@auth_blueprint.route('/admin/pool-stats')
+def pool_stats():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if not user or user.tipo != 1:
+        flash('Você não tem permissão para acessar esta página.', 'warning')
+        return redirect(url_for('auth.index'))
+    return jsonify(pool_monitor.stats())
+
+@auth_blueprint.route('/admin/slow-queries')
+def slow_queries():
+    if 'user_id' not in session:
+        flash('Por favor, faça login para acessar esta página', 'warning')
+        return redirect(url_for('auth.login'))
+    user = current_identity()
+    if not user or user.tipo != 1:
+        flash('Você não tem permissão para acessar esta página.', 'warning')
+        return redirect(url_for('auth.index'))
+    if request.args.get('format') == 'json':
+        return jsonify(stats=slow_query_log.stats(), top=slow_query_log.top())
+    return render_template('slow_queries.html', stats=slow_query_log.stats(), top=slow_query_log.top(), user=user)
+
 @auth_blueprint.route('/change-password', methods=['GET', 'POST'])
 def change_password():
     if 'user_id' not in session:
@@ -309,7 +570,12 @@ def change_password():
             flash('Sessão expirada. Faça login novamente.', 'warning')
             return redirect(url_for('auth.login'))
         
-        if not check_password_hash(user.password, current_password):
+        try:
+            valid = password_hasher.check(user.password, current_password)
+        except HashBusy:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return redirect(url_for('auth.change_password'))
+        if not valid:
             flash('Senha atual incorreta', 'error')
             return redirect(url_for('auth.change_password'))
         
@@ -321,7 +587,11 @@ def change_password():
             flash('A senha deve ter pelo menos 6 caracteres', 'error')
             return redirect(url_for('auth.change_password'))
         
-        update_user_password(user, new_password)
+        try:
+            update_user_password(user, new_password)
+        except HashBusy:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return redirect(url_for('auth.change_password'))
         flash('Senha alterada com sucesso!', 'success')
         return redirect(url_for('auth.index'))
     
@@ -335,6 +605,9 @@ def forgot_password():
     
     if request.method == 'POST':
         email = request.form['email']
+        if not throttle.allow(email, request.remote_addr):
+            flash('Muitas tentativas. Aguarde alguns minutos e tente novamente.', 'error')
+            return redirect(url_for('auth.forgot_password'))
         user = get_user_by_email(email)
         
         if user:
@@ -368,24 +641,25 @@ def reset_password(token):
             flash('A senha deve ter pelo menos 6 caracteres', 'error')
             return redirect(url_for('auth.reset_password', token=token))
         
-        update_user_password(user, new_password)
+        try:
+            update_user_password(user, new_password)
+        except HashBusy:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return redirect(url_for('auth.reset_password', token=token))
         flash('Senha redefinida com sucesso! Faça o login.', 'success')
         return redirect(url_for('auth.login'))
     
     return render_template('reset_password.html', token=token)
 
 def send_reset_email(email, token):
-    """Send password reset email"""
+    """Queue the password reset email"""
     from flask import current_app
     
     # Get logger
     logger = current_app.logger
     
     try:
-        logger.info(f"Attempting to send password reset email to: {email}")
-        logger.debug(f"SMTP Server: {current_app.config['MAIL_SERVER']}")
-        logger.debug(f"SMTP Port: {current_app.config['MAIL_PORT']}")
-        logger.debug("SMTP configuration loaded successfully")
+        logger.info(f"Queueing password reset email to: {email}")
 
         msg = Message(
             subject='Password Reset Request',
@@ -413,15 +687,13 @@ def send_reset_email(email, token):
         <p>If you did not make this request, please ignore this email.</p>
         """
         
-        logger.debug("Testing SMTP connection...")
-        with mail.connect() as conn:
-            logger.debug("SMTP connection successful, sending email...")
-            conn.send(msg)
-        logger.info(f"Password reset email sent successfully to: {email}")
+        # Delivery happens on the mail queue workers, off the request thread
+        email_id = mail_queue.enqueue(msg.subject, msg.recipients, body=msg.body, html=msg.html)
+        logger.info(f"Password reset email to {email} queued as {email_id}")
         # Password reset URL logging removed for security
         return True
     except Exception as e:
-        logger.error(f"Error sending password reset email to {email}: {e}")
+        logger.error(f"Error queueing password reset email to {email}: {e}")
         logger.debug(f"Error type: {type(e).__name__}")
         # For security reasons, password reset URLs are not logged to console in production
         # If email fails, users should use the forgot password form again
@@ -0,0 +1,63 @@
+"""
+Backup size and time per compression (gzip, zstd when zstandard is installed,
+none) of a seeded database: the SQLite online backup, or mysqldump when
+BENCH_DATABASE_URI points at MySQL
+
+    python bench/bench_backup.py --rows 1000000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import common
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--jobs', type=int, default=1, help='Tables dumped in parallel (MySQL)')
+    args = parser.parse_args()
+
+    app = common.setup()
+    common.reset(app)
+    common.seed_atividades(app, args.rows)
+
+    import backup
+    from sqlalchemy.engine import make_url
+    from models import db
+    with app.app_context():
+        url = db.engine.url
+        db.engine.dispose()
+    if url.get_backend_name() == 'sqlite':
+        raw = os.path.getsize(url.database)
+    else:
+        url = make_url(os.environ['SQLALCHEMY_DATABASE_URI'])  # with the password
+        raw = None
+
+    compressions = [('none', 0), ('gzip', 6), ('gzip', 1)]
+    if backup.zstandard is not None:
+        compressions += [('zstd', 3), ('zstd', 10)]
+    results = []
+    for compression, level in compressions:
+        directory = tempfile.mkdtemp(dir=common.TMP)
+        with common.Timer() as timer:
+            if url.get_backend_name() == 'sqlite':
+                files, _, _ = backup.backup_sqlite(url, directory, compression, level)
+            else:
+                files, _, _ = backup.backup_mysql(url, directory, compression, level, args.jobs)
+        size = sum(entry['size'] for entry in files)
+        results.append({
+            'compression': compression if compression == 'none' else f'{compression} -{level}',
+            'MB': round(size / 2 ** 20, 1),
+            'ratio': round(raw / size, 2) if raw else '',
+            'seconds': round(timer.elapsed, 2),
+        })
+        shutil.rmtree(directory)
+
+    print(f"Backup of {args.rows} atividades ({url.get_backend_name()}"
+          + (f", {raw / 2 ** 20:.1f} MB database)" if raw else ")"))
+    common.table(results, list(results[0]))
+
+if __name__ == '__main__':
+    main()
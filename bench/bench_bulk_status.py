@@ -0,0 +1,96 @@
+"""
+Status change and deletion of many atividades: one GET per atividade (the
+per-row routes) against the bulk routes, which change a whole selection in
+one transaction and emit one batch per setor room
+
+    python bench/bench_bulk_status.py --atividades 500 --table-rows 20000
+"""
+
+import argparse
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import common
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(Engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+def prepare(app, table_rows, selected):
+    """Fresh table of table_rows Pendente atividades; returns the ids to change"""
+    from models import Atividade, db
+    common.reset(app)
+    common.seed_atividades(app, table_rows, statuses=('Pendente',))
+    with app.app_context():
+        return [id for (id,) in db.session.query(Atividade.id).order_by(Atividade.id).limit(selected)]
+
+def per_row(client, ids, action):
+    for atividade_id in ids:
+        if action == 'status':
+            url = f'/update-status/{atividade_id}/Em andamento'
+        else:
+            url = f'/delete-atividade/{atividade_id}'
+        assert client.get(url).status_code == 302
+
+def bulk(client, ids, action, batch_size):
+    for start in range(0, len(ids), batch_size):
+        data = {'atividade_ids': [str(id) for id in ids[start:start + batch_size]]}
+        if action == 'status':
+            data['status'] = 'Em andamento'
+            url = '/bulk/update-status'
+        else:
+            url = '/bulk/delete-atividades'
+        assert client.post(url, data=data).status_code == 302
+
+def check(app, ids, action):
+    from models import Atividade, db
+    with app.app_context():
+        query = db.session.query(Atividade).filter(Atividade.id.in_(ids))
+        if action == 'status':
+            assert query.filter(Atividade.status == 'Em andamento').count() == len(ids)
+        else:
+            assert query.count() == 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--atividades', type=int, default=500, help='Atividades changed per run')
+    parser.add_argument('--table-rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=500, help='Ids per bulk request (BULK_MAX_ATIVIDADES)')
+    args = parser.parse_args()
+
+    app = common.setup(BULK_MAX_ATIVIDADES=str(args.batch_size))
+    from notifications import notifications
+    counter = StatementCounter()
+
+    rows = []
+    for action in ('status', 'delete'):
+        for mode in ('per-row', 'bulk'):
+            ids = prepare(app, args.table_rows, args.atividades)
+            client = common.login(app.test_client())
+            statements, batches = counter.count, notifications.batches
+            with common.Timer() as timer:
+                if mode == 'per-row':
+                    per_row(client, ids, action)
+                else:
+                    bulk(client, ids, action, args.batch_size)
+                notifications.drain()
+            check(app, ids, action)
+            rows.append({
+                'action': action,
+                'mode': mode,
+                'seconds': round(timer.elapsed, 3),
+                'atividades/s': round(len(ids) / timer.elapsed, 1),
+                'sql_statements': counter.count - statements,
+                'socketio_batches': notifications.batches - batches,
+            })
+
+    print(f"{args.atividades} atividades of {args.table_rows}, bulk requests of {args.batch_size}")
+    common.table(rows, list(rows[0]))
+
+if __name__ == '__main__':
+    main()
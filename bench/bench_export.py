@@ -0,0 +1,69 @@
+"""
+Export of the atividade table: peak Python memory (tracemalloc), time to the
+first chunk and total time of /export-atividades at growing table sizes,
+against loading the same projection with .all() first
+
+    python bench/bench_export.py --rows 10000,100000,1000000
+"""
+
+import argparse
+import tracemalloc
+
+import common
+
+def streamed(client, formato):
+    """Read the streamed response chunk by chunk; returns (bytes, seconds to the first chunk)"""
+    with common.Timer() as first:
+        response = client.get(f'/export-atividades?formato={formato}', buffered=False)
+        chunks = iter(response.response)
+        size = len(next(chunks))
+    for chunk in chunks:
+        size += len(chunk)
+    response.close()
+    return size, first.elapsed
+
+def loaded(app, formato):
+    """Baseline: the whole projection in memory before encoding it"""
+    from exportacao import FORMATS, export_query
+    with app.app_context():
+        with common.Timer() as first:
+            rows = export_query().all()
+            encode = FORMATS[formato][0]
+            size = len(''.join(encode(rows)).encode('utf-8'))
+    return size, first.elapsed
+
+def measure(run):
+    tracemalloc.start()
+    with common.Timer() as timer:
+        size, first_chunk = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'MB_out': round(size / 2 ** 20, 1),
+        'peak_MB': round(peak / 2 ** 20, 1),
+        'first_chunk_s': round(first_chunk, 3),
+        'total_s': round(timer.elapsed, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000', help='Comma separated table sizes')
+    parser.add_argument('--formato', default='csv', choices=['csv', 'jsonl'])
+    parser.add_argument('--skip-baseline', action='store_true', help="Don't load everything with .all()")
+    args = parser.parse_args()
+
+    app = common.setup()
+    results = []
+    for rows in [int(value) for value in args.rows.split(',')]:
+        common.reset(app)
+        common.seed_atividades(app, rows)
+        client = common.login(app.test_client())
+        results.append({'rows': rows, 'mode': 'streamed', **measure(lambda: streamed(client, args.formato))})
+        if not args.skip_baseline:
+            results.append({'rows': rows, 'mode': '.all()', **measure(lambda: loaded(app, args.formato))})
+
+    print(f"Export of atividade as {args.formato}, chunks of {app.config['EXPORT_CHUNK_SIZE']} rows")
+    common.table(results, list(results[0]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Login flood: logins per second and login latency, and the latency of a
+dashboard request made during the flood, with the password hashes computed
+on the request threads (inline, the old behaviour) or on the bounded executor
+
+    python bench/bench_password_hash.py --logins 200 --concurrency 16
+"""
+
+import argparse
+import threading
+import time
+
+import common
+
+def flood(app, logins, concurrency):
+    """Run the logins from concurrency threads while one thread probes /api/estatisticas"""
+    login_latencies, probe_latencies = [], []
+    results = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+    remaining = iter(range(logins))
+    done = threading.Event()
+
+    def attacker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            client = app.test_client()
+            started = time.perf_counter()
+            response = client.post('/login', data={'email': 'sec@x.com', 'password': common.PASSWORD})
+            elapsed = time.perf_counter() - started
+            busy = response.headers.get('Location', '').endswith('/login')
+            with lock:
+                login_latencies.append(elapsed)
+                results['busy' if busy else 'ok'] += 1
+
+    def probe():
+        client = common.login(app.test_client())
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/api/estatisticas')
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    threads = [threading.Thread(target=attacker) for _ in range(concurrency)]
+    with common.Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    done.set()
+    prober.join()
+    return {
+        'logins/s': round(logins / timer.elapsed, 1),
+        'ok': results['ok'],
+        'busy': results['busy'],
+        **{f'login_{key}': value for key, value in common.summary(login_latencies).items() if key != 'count'},
+        **{f'dashboard_{key}': value for key, value in common.summary(probe_latencies).items() if key != 'count'},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000', help='PASSWORD_HASH_METHOD')
+    args = parser.parse_args()
+
+    # Throttling would turn most of the flood away before it hashes anything
+    app = common.setup(PASSWORD_HASH_METHOD=args.method, THROTTLE_EMAIL_CAPACITY='1000000',
+                       THROTTLE_IP_CAPACITY='1000000')
+    from security import password_hasher
+    common.reset(app)
+
+    rows = []
+    executor = password_hasher._executor
+    for mode in ('inline', 'executor'):
+        # No executor: PasswordHasher hashes on the calling (request) thread
+        password_hasher._executor = None if mode == 'inline' else executor
+        rows.append({'mode': mode, **flood(app, args.logins, args.concurrency)})
+
+    print(f"{args.logins} logins, {args.concurrency} threads, {args.method}, "
+          f"{password_hasher._slots._initial_value} executor slots")
+    common.table(rows, list(rows[0]))
+
+if __name__ == '__main__':
+    main()
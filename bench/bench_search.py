@@ -0,0 +1,78 @@
+"""
+Search latency at a large table: /api/atividades/busca (FULLTEXT on MySQL,
+FTS5 on SQLite) for a rare, a common and a two word query, as an admin and
+as a tipo 2 user, against a LIKE scan of the same columns
+
+    python bench/bench_search.py --rows 1000000 --repeat 20
+"""
+
+import argparse
+
+from sqlalchemy import or_
+
+import common
+
+def queries(rows):
+    return {
+        'rare': f'{rows // 2}',                 # the "#<n>" suffix of a single atividade
+        'common': 'impressora',                 # in about a quarter of the rows
+        'two words': 'roteador licença',
+    }
+
+def api(client, q, repeat):
+    latencies = []
+    for _ in range(repeat):
+        with common.Timer() as timer:
+            response = client.get('/api/atividades/busca', query_string={'q': q, 'per_page': 10})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        latencies.append(timer.elapsed)
+    return response.get_json()['total'], latencies
+
+def like_scan(app, q, setor_id, repeat):
+    """Baseline: every term as LIKE '%term%' on the searched columns, first page in dashboard order"""
+    from models import Atividade, _dashboard_query, _dashboard_sort_columns
+    latencies = []
+    with app.app_context():
+        for _ in range(repeat):
+            with common.Timer() as timer:
+                query = _dashboard_query(setor_id).filter(or_(*[
+                    column.like(f'%{term}%') for term in q.split()
+                    for column in (Atividade.descricao, Atividade.local, Atividade.solicitante)
+                ]))
+                total = query.count()
+                query.order_by(*_dashboard_sort_columns()).limit(10).all()
+            latencies.append(timer.elapsed)
+    return total, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--skip-like', action='store_true', help='Skip the LIKE baseline')
+    args = parser.parse_args()
+
+    app = common.setup()
+    common.reset(app)
+    with common.Timer() as seeding:
+        common.seed_atividades(app, args.rows)
+    admin = common.login(app.test_client())
+    setor_user = common.login(app.test_client(), 't2@x.com')
+
+    results = []
+    for name, q in queries(args.rows).items():
+        for user, client, setor_id in (('admin', admin, None), ('tipo 2', setor_user, 1)):
+            total, latencies = api(client, q, args.repeat)
+            stats = common.summary(latencies)
+            results.append({'query': name, 'user': user, 'mode': 'fulltext', 'matches': total,
+                            'p50_ms': stats['p50_ms'], 'p95_ms': stats['p95_ms']})
+            if not args.skip_like:
+                total, latencies = like_scan(app, q, setor_id, max(1, args.repeat // 4))
+                stats = common.summary(latencies)
+                results.append({'query': name, 'user': user, 'mode': 'LIKE', 'matches': total,
+                                'p50_ms': stats['p50_ms'], 'p95_ms': stats['p95_ms']})
+
+    print(f"{args.rows} atividades (seeded and indexed in {seeding.elapsed:.1f}s), first page of 10")
+    common.table(results, list(results[0]))
+
+if __name__ == '__main__':
+    main()
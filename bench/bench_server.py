@@ -0,0 +1,110 @@
+"""
+HTTP load on the development server (werkzeug, socketio.run) against gunicorn
+(start_production.py): requests per second and p50 / p95 latency of the
+dashboard and of /api/estatisticas from concurrent logged-in clients
+
+    python bench/bench_server.py --rows 20000 --concurrency 16 --duration 15
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+import common
+
+def start(name, port, workers, threads):
+    env = dict(os.environ, HOST='127.0.0.1', PORT=str(port), PYTHONPATH=common.ROOT)
+    if name == 'werkzeug':
+        code = ("from app import app, socketio\n"
+                f"socketio.run(app, host='127.0.0.1', port={port}, allow_unsafe_werkzeug=True)")
+        cmd = [sys.executable, '-c', code]
+    else:
+        env.update(GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads),
+                   GUNICORN_PIDFILE=os.path.join(common.TMP, 'gunicorn.pid'))
+        cmd = [sys.executable, 'start_production.py']
+    process = subprocess.Popen(cmd, cwd=common.ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/login', timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{name} did not start')
+
+def load(base, path, concurrency, duration):
+    """concurrency logged-in sessions requesting path for duration seconds"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    sessions = []
+    for _ in range(concurrency):
+        session = requests.Session()
+        response = session.post(f'{base}/login', data={'email': 'sec@x.com', 'password': common.PASSWORD},
+                                allow_redirects=False)
+        assert response.status_code == 302, response.text
+        sessions.append(session)
+    deadline = time.monotonic() + duration
+
+    def client(session):
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = session.get(base + path)
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if response.status_code == 200 else errors).append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(session,)) for session in sessions]
+    with common.Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    stats = common.summary(latencies)
+    return {'req/s': round(len(latencies) / timer.elapsed, 1), 'errors': len(errors),
+            'p50_ms': stats.get('p50_ms'), 'p95_ms': stats.get('p95_ms')}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='gunicorn workers (more than 1 needs --message-queue)')
+    parser.add_argument('--threads', type=int, default=30, help='gunicorn threads per worker')
+    parser.add_argument('--message-queue', default=None, help='SOCKETIO_MESSAGE_QUEUE for several workers')
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    # Throttling would turn the logins of the clients away
+    app = common.setup(THROTTLE_EMAIL_CAPACITY='1000000', THROTTLE_IP_CAPACITY='1000000',
+                       PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    common.reset(app)
+    common.seed_atividades(app, args.rows)
+    if args.message_queue:
+        os.environ['SOCKETIO_MESSAGE_QUEUE'] = args.message_queue
+
+    results = []
+    for name in ('werkzeug', 'gunicorn'):
+        process = start(name, args.port, args.workers, args.threads)
+        try:
+            base = f'http://127.0.0.1:{args.port}'
+            for path in ('/', '/api/estatisticas'):
+                results.append({'server': name, 'path': path, **load(base, path, args.concurrency, args.duration)})
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=60)
+
+    print(f"{args.rows} atividades, {args.concurrency} clients for {args.duration}s per path; "
+          f"gunicorn: {args.workers} worker(s) x {args.threads} threads, {os.cpu_count()} CPU(s)")
+    common.table(results, list(results[0]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Shared setup of the benchmarks: the app on a scratch SQLite database (or the
+database in BENCH_DATABASE_URI), a fast bulk seeding of atividades and the
+latency summaries printed by every script
+
+Import this module before anything that imports app.py.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix='gestor_bench_')
+PASSWORD = 'Senha123'
+
+def setup(**env):
+    """Set the environment app.py reads at import time, then import and return the app"""
+    defaults = {
+        'SQLALCHEMY_DATABASE_URI': os.getenv('BENCH_DATABASE_URI') or f'sqlite:///{TMP}/bench.db',
+        'SECRET_KEY': 'bench',
+        'MAIL_USERNAME': 'gestor@example.com',
+        'MAIL_PASSWORD': 'bench',
+        'MAIL_QUEUE_WORKERS': '0',
+        'DASHBOARD_CACHE_BACKEND': 'memory',
+        'DASHBOARD_CACHE_PATH': f'{TMP}/cache.db',
+        'LOG_DIR': f'{TMP}/logs',
+        'SLOW_QUERY_LOG_PATH': f'{TMP}/logs/slow_queries.jsonl',
+        'DEADLINE_SCAN_INTERVAL': '0',
+        'ARCHIVE_INTERVAL': '0',
+        'NOTIFY_COALESCE_WINDOW': '0.05',
+    }
+    defaults.update(env)
+    os.environ.update(defaults)
+    for name in ('SOCKETIO_MESSAGE_QUEUE', 'METRICS_ENABLED', 'SLOW_QUERY_ENABLED'):
+        os.environ.pop(name, None)
+    from app import app
+    return app
+
+def reset(app):
+    """Empty tables with the TI / RH setores, an admin (sec@x.com) and a tipo 2 user of TI"""
+    from sqlalchemy import text
+    from models import db, Setor, create_user
+    from cache import dashboard_cache, setor_cache
+    with app.app_context():
+        db.drop_all()
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP TABLE IF EXISTS atividade_fts'))
+        db.create_all()
+        dashboard_cache.clear()
+        setor_cache.invalidate()
+        db.session.add_all([Setor(id=1, nome='TI'), Setor(id=2, nome='RH')])
+        db.session.commit()
+        create_user('sec', 'sec@x.com', PASSWORD, 2, 1)
+        create_user('t2', 't2@x.com', PASSWORD, 1, 2)
+
+WORDS = ('impressora rede servidor monitor teclado cadeira projetor acesso senha email backup '
+         'telefone planilha relatório sistema licença cabo roteador câmera ponto').split()
+STATUSES = ('Pendente', 'Em andamento', 'Concluída', 'Cancelada')
+PRIORIDADES = ('Baixa', 'Média', 'Alta', 'Crítica')
+
+def seed_atividades(app, rows, batch_size=10000, seed=42, statuses=STATUSES):
+    """Insert rows atividades with multi-row INSERTs, then rebuild the counters"""
+    from models import db, Atividade, STATUS_RANK, reconcile_counters
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    table = Atividade.__table__
+    with app.app_context():
+        for start in range(0, rows, batch_size):
+            batch = []
+            for i in range(start, min(rows, start + batch_size)):
+                status = rng.choice(statuses)
+                prazo = now + timedelta(days=rng.randint(-30, 30)) if rng.random() < 0.9 else None
+                batch.append({
+                    'descricao': ' '.join(rng.choice(WORDS) for _ in range(6)) + f' #{i}',
+                    'status': status,
+                    'prioridade': rng.choice(PRIORIDADES),
+                    'data_criada': now - timedelta(minutes=rows - i),
+                    'prazo': prazo,
+                    'local': f'Sala {rng.randint(1, 300)}',
+                    'setor_id': rng.choice((1, 2)),
+                    'user_id': 1,
+                    'solicitante': rng.choice(('Maria', 'João', 'Ana', 'Pedro')),
+                    'status_rank': STATUS_RANK.get(status, 2),
+                    'prazo_null': prazo is None,
+                    'versao': 0,
+                    'atualizado_em': now - timedelta(days=rng.randint(0, 200)),
+                })
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+        reconcile_counters()
+
+def login(client, email='sec@x.com', password=PASSWORD):
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302, response.get_data(as_text=True)
+    return client
+
+def summary(latencies):
+    """count / p50 / p95 / max (milliseconds) of a list of durations in seconds"""
+    if not latencies:
+        return {'count': 0}
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+def table(rows, columns):
+    """Print a list of dicts as an aligned text table"""
+    widths = {column: max(len(column), *(len(str(row.get(column, ''))) for row in rows)) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row.get(column, '')).ljust(widths[column]) for column in columns))
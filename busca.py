@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Busca de Atividades - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Busca textual nas atividades (descrição, local e solicitante) por índice de
+texto completo: FULLTEXT no MySQL e uma tabela FTS5 mantida por triggers no
+SQLite, com resultados ordenados por relevância e paginados
+"""
+
+from sqlalchemy import event, func, text, table, column, literal_column, select
+from sqlalchemy.dialects.mysql import match
+from models import db, Atividade, _dashboard_query
+import re
+
+# Columns covered by the full-text index
+SEARCH_COLUMNS = ('descricao', 'local', 'solicitante')
+
+# Words of a search that are used, the rest is ignored
+MAX_TERMS = 10
+
+FULLTEXT_INDEX = 'ft_atividade_busca'
+
+FTS_TABLE = 'atividade_fts'
+
+# External content FTS5 table: the text is read from atividade, the triggers keep
+# the index in step with every write, set-based statements included
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "descricao, local, solicitante, content='atividade', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON atividade BEGIN "
+    f"INSERT INTO {FTS_TABLE} (rowid, descricao, local, solicitante) "
+    "VALUES (new.id, new.descricao, new.local, new.solicitante); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON atividade BEGIN "
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, descricao, local, solicitante) "
+    "VALUES ('delete', old.id, old.descricao, old.local, old.solicitante); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF descricao, local, solicitante ON atividade BEGIN "
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, descricao, local, solicitante) "
+    "VALUES ('delete', old.id, old.descricao, old.local, old.solicitante); "
+    f"INSERT INTO {FTS_TABLE} (rowid, descricao, local, solicitante) "
+    "VALUES (new.id, new.descricao, new.local, new.solicitante); END",
+]
+
+_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+def search_installed(connection):
+    """Check whether the full-text index of the current backend exists"""
+    if connection.dialect.name == 'mysql':
+        return connection.execute(text(
+            'SELECT COUNT(*) FROM information_schema.statistics '
+            'WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index'
+        ), {'table': 'atividade', 'index': FULLTEXT_INDEX}).scalar() > 0
+    if connection.dialect.name == 'sqlite':
+        return connection.execute(text(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {'name': FTS_TABLE}).scalar() > 0
+    return False
+
+def install_search(connection, rebuild=False):
+    """Create the full-text index of the current backend.
+
+    rebuild indexes the atividades that already exist, which the SQLite
+    triggers only do for rows written after they were created.
+    """
+    if connection.dialect.name == 'mysql':
+        if not search_installed(connection):
+            connection.execute(text(f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON atividade '
+                                    f'({", ".join(SEARCH_COLUMNS)})'))
+    elif connection.dialect.name == 'sqlite':
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        if rebuild:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+
+@event.listens_for(Atividade.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search(connection)
+
+def parse_terms(busca):
+    """Words of a search string (punctuation and search operators are dropped)"""
+    return re.findall(r'\w+', busca or '')[:MAX_TERMS]
+
+def search_atividades(terms, setor_id=None, page=1, per_page=10):
+    """Atividades matching any of the terms, most relevant first, paginated.
+
+    Rows have the dashboard columns plus relevancia (higher is better); the
+    optional setor_id applies the same visibility rule as the dashboard.
+    """
+    query = _dashboard_query(setor_id)
+    if db.engine.dialect.name == 'mysql':
+        relevancia = match(*[getattr(Atividade, name) for name in SEARCH_COLUMNS],
+                           against=' '.join(terms)).in_natural_language_mode()
+        query = query.add_columns(relevancia.label('relevancia')).filter(relevancia)
+        return query.order_by(relevancia.desc(), Atividade.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False)
+
+    # FTS5 rank is bm25, lower is better; terms are quoted so nothing is read as an operator
+    matched = literal_column(FTS_TABLE).op('MATCH')(' OR '.join(f'"{term}"' for term in terms))
+    matches = select(_fts.c.rowid.label('id'), _fts.c.rank.label('rank')).where(matched)
+    if setor_id is not None:
+        # Materialized first: joined directly, the setor filter makes SQLite walk the
+        # setor index and run the MATCH again for every atividade of the setor
+        matches = matches.cte('busca').prefix_with('MATERIALIZED')
+    else:
+        matches = matches.subquery('busca')
+    pagination = query.join(matches, matches.c.id == Atividade.id).add_columns(
+        (-matches.c.rank).label('relevancia')
+    ).order_by(matches.c.rank, Atividade.id.desc()).paginate(page=page, per_page=per_page, error_out=False,
+                                                             count=False)
+
+    # Counted without the rank, so bm25 is only computed for the page query
+    ids = select(_fts.c.rowid.label('id')).where(matched).cte('busca_ids').prefix_with('MATERIALIZED')
+    total = select(func.count()).select_from(ids).join(Atividade, Atividade.id == ids.c.id)
+    if setor_id is not None:
+        total = total.where(Atividade.setor_id == setor_id)
+    pagination.total = db.session.execute(total).scalar()
+    return pagination
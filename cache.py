@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Cache do Painel - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Cache de resultados das consultas do painel de tarefas, com tamanho limitado
+(LRU) e invalidação por escopo quando atividades são alteradas, e cache da
+tabela de setores
+"""
+
+from collections import OrderedDict
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+class MemoryBackend:
+    """In-process LRU store, for a single worker"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        """Store a value, returning how many entries were evicted"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+# Seconds between two last_used updates of a SQLite cache entry
+LAST_USED_RESOLUTION = 60
+
+class SQLiteBackend:
+    """LRU store in a local SQLite file, shared by every worker on the host"""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entry '
+                         '(key TEXT PRIMARY KEY, value BLOB NOT NULL, last_used REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_entry_last_used ON cache_entry (last_used)')
+
+    def after_fork(self):
+        # Connections opened before a fork can't be used by the child
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT value, last_used FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > LAST_USED_RESOLUTION:
+            # Reads only write now and then, so hits of several workers don't queue on the write lock
+            try:
+                conn.execute('UPDATE cache_entry SET last_used = ? WHERE key = ?', (now, key))
+            except sqlite3.OperationalError:
+                pass
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        """Store a value, returning how many entries were evicted"""
+        conn = self._connection()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO cache_entry (key, value, last_used) VALUES (?, ?, ?)',
+                         (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time()))
+            excess = conn.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM cache_entry WHERE key IN '
+                             '(SELECT key FROM cache_entry ORDER BY last_used LIMIT ?)', (excess,))
+                return excess
+        return 0
+
+    def clear(self):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM cache_entry')
+
+    def size(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+
+class DashboardCache:
+    """Cache for dashboard pages, keyed by scope ('all' or 'setor:<id>'), version and page or cursor.
+
+    The version is the scope's escopo_versao, read by the caller in the same
+    transaction as the rows it loads and bumped by every write in the write's
+    own transaction, so a change made by any process (other workers, CLI
+    commands) moves readers to new keys. Stale entries are never read again and
+    fall out of the LRU.
+
+    Backend errors (e.g. a locked SQLite file) count as a miss or a skipped
+    store: the page is served from the database instead.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        backend = app.config.get('DASHBOARD_CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('DASHBOARD_CACHE_SIZE', 512)
+        if backend == 'memory':
+            self.backend = MemoryBackend(max_entries)
+        elif backend == 'sqlite':
+            self.backend = SQLiteBackend(app.config.get('DASHBOARD_CACHE_PATH', 'cache/dashboard.db'), max_entries)
+        elif backend in ('none', '', None):
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown DASHBOARD_CACHE_BACKEND: {backend}')
+        app.extensions['dashboard_cache'] = self
+
+    def after_fork(self):
+        """Drop the backend connections inherited from the parent process (preloaded servers)"""
+        if hasattr(self.backend, 'after_fork'):
+            self.backend.after_fork()
+
+    def _count(self, attr, amount=1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + amount)
+
+    def get_or_load(self, scope, versao, params, loader):
+        """Return the cached value for (scope, versao, params), calling loader on a miss.
+
+        versao must be read before loader runs, in the same transaction.
+        """
+        if self.backend is None:
+            return loader()
+
+        key = f'{scope}:{versao}:{params!r}'
+        try:
+            value = self.backend.get(key)
+        except sqlite3.Error:
+            self._count('errors')
+            value = None
+        if value is not None:
+            self._count('hits')
+            return value
+
+        self._count('misses')
+        value = loader()
+        try:
+            self._count('evictions', self.backend.set(key, value))
+        except sqlite3.Error:
+            self._count('errors')
+        return value
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters of this process and the current number of entries"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'entries': self.backend.size() if self.backend else 0,
+            'max_entries': self.backend.max_entries if self.backend else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+class SetorCache:
+    """Process-wide copy of the (small) setor table, reloaded after ttl seconds
+    or as soon as a setor is changed in this process"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._setores = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('SETOR_CACHE_TTL', self.ttl)
+        self.invalidate()
+
+    def get(self, loader):
+        """Return the cached setores, calling loader when they are missing or expired"""
+        with self._lock:
+            if self._setores is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._setores = loader()
+                self._loaded_at = time.monotonic()
+            return self._setores
+
+    def invalidate(self):
+        with self._lock:
+            self._setores = None
+
+dashboard_cache = DashboardCache()
+setor_cache = SetorCache()
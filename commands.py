@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Comandos de Manutenção - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Comandos de linha de comando (flask --app app <comando>) para manutenção
+do banco de dados e verificação de desempenho
+"""
+
+import sys
+import click
+from models import (db, reconcile_counters, get_user_by_email, AtividadeArquivada,
+                    _dashboard_query, _dashboard_sort_columns)
+from mail_queue import mail_queue
+from notifications import notifications
+from importacao import import_atividades
+from exportacao import export_atividades, parse_date, FORMATS
+from arquivamento import archive_finished
+from prazos import deadline_scanner
+
+def explain(query):
+    """Run EXPLAIN on an ORM query and return the plan as a list of strings"""
+    engine = db.engine
+    compiled = query.statement.compile(dialect=engine.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+    return [' | '.join(str(value) for value in row) for row in rows]
+
+def uses_filesort(plan):
+    """Check whether a plan sorts rows instead of reading them in index order"""
+    return any('Using filesort' in line or 'TEMP B-TREE FOR ORDER BY' in line for line in plan)
+
+def register_commands(app):
+    """Register the maintenance commands on the app CLI"""
+
+    @app.cli.command('check-indexes')
+    @click.option('--setor-id', default=1, type=int, help='Setor usado na consulta filtrada')
+    def check_indexes(setor_id):
+        """Fail if a dashboard query falls back to a filesort."""
+        queries = {
+            'get_all_atividades': (_dashboard_query(), None),
+            'get_atividades_by_setor': (_dashboard_query(setor_id), None),
+            'get_atividades_arquivadas': (_dashboard_query(setor_id, model=AtividadeArquivada), AtividadeArquivada),
+        }
+
+        failed = False
+        for name, (query, model) in queries.items():
+            plan = explain(query.order_by(*_dashboard_sort_columns(model)).limit(10))
+            click.echo(f"{name}:")
+            for line in plan:
+                click.echo(f"   {line}")
+            if uses_filesort(plan):
+                click.echo(f"❌ {name} is sorting rows instead of using an index")
+                failed = True
+
+        if failed:
+            sys.exit(1)
+        click.echo("✅ Dashboard queries are served from indexes")
+
+    @app.cli.command('reconcile-counters')
+    def reconcile_counters_command():
+        """Repair drift in the atividade counters."""
+        drift = reconcile_counters()
+        for key, stored, actual in drift:
+            click.echo(f"   {' / '.join(str(part) for part in key)}: {stored} -> {actual}")
+        if drift:
+            click.echo(f"✅ Repaired {len(drift)} counter(s)")
+        else:
+            click.echo("✅ Counters are consistent")
+
+    @app.cli.command('drain-mail')
+    def drain_mail():
+        """Send the due emails of the outbox (retries included) and exit."""
+        processed = mail_queue.drain()
+        stats = mail_queue.stats()
+        click.echo(f"✅ Processed {processed} email(s): {stats['sent']} sent, "
+                   f"{stats['retried']} to retry, {stats['failed']} failed")
+
+    @app.cli.command('archive-atividades')
+    @click.option('--days', default=None, type=int,
+                  help='Idade mínima, em dias, das atividades concluídas ou canceladas (padrão: ARCHIVE_AFTER_DAYS)')
+    @click.option('--batch-size', default=None, type=int, help='Atividades movidas por transação')
+    def archive_atividades_command(days, batch_size):
+        """Move old finished atividades to the archive table, in batches."""
+        days = app.config.get('ARCHIVE_AFTER_DAYS', 90) if days is None else days
+
+        def progress(total):
+            click.echo(f"   {total} archived")
+
+        total = archive_finished(days, batch_size or app.config.get('ARCHIVE_BATCH_SIZE', 500),
+                                 pause=app.config.get('ARCHIVE_BATCH_PAUSE', 0.1), on_batch=progress)
+        click.echo(f"✅ Archived {total} atividade(s) finished more than {days} day(s) ago")
+
+    @app.cli.command('scan-prazos')
+    def scan_prazos():
+        """Notify the atividades that became due soon or overdue since the last scan."""
+        notified = deadline_scanner.scan()
+        notifications.drain()
+        click.echo(f"✅ Notified {notified} atividade(s)")
+
+    @app.cli.command('import-atividades')
+    @click.argument('arquivo', type=click.File('rb'))
+    @click.option('--formato', type=click.Choice(['csv', 'jsonl']), default=None,
+                  help='Formato do arquivo (padrão: pela extensão)')
+    @click.option('--email', required=True, help='Email do usuário registrado como criador')
+    @click.option('--batch-size', default=None, type=int, help='Linhas por INSERT / commit')
+    def import_atividades_command(arquivo, formato, email, batch_size):
+        """Import atividades from a CSV or JSONL file ('-' for stdin)."""
+        user = get_user_by_email(email)
+        if not user:
+            click.echo(f"❌ No user with email {email}")
+            sys.exit(1)
+        if formato is None:
+            formato = 'jsonl' if arquivo.name.lower().endswith(('.jsonl', '.json')) else 'csv'
+
+        def progress(result):
+            click.echo(f"   {result.lidas} read, {result.importadas} imported, {result.rejeitadas} rejected")
+
+        result = import_atividades(arquivo, formato, user.id,
+                                   batch_size=batch_size or app.config.get('IMPORT_BATCH_SIZE', 500),
+                                   on_batch=progress)
+        for linha, mensagem in result.erros:
+            click.echo(f"   line {linha}: {mensagem}")
+        if result.rejeitadas > len(result.erros):
+            click.echo(f"   ... and {result.rejeitadas - len(result.erros)} more error(s)")
+        if result.interrompida:
+            click.echo(f"❌ Stopped at line {result.interrompida[0]}: {result.interrompida[1]} "
+                       f"(the rows before it were imported)")
+        if result.importadas:
+            notifications.announce('import_summary', 'admin_room', dict(
+                result.summary(),
+                message=f'{result.importadas} atividade(s) importada(s) por {user.username}'
+            ))
+            notifications.drain()
+        click.echo(f"{'⚠️ ' if result.interrompida else '✅'} Imported {result.importadas} of {result.lidas} row(s), "
+                   f"{result.rejeitadas} rejected")
+        if result.interrompida:
+            sys.exit(1)
+
+    @app.cli.command('export-atividades')
+    @click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+                  help='Arquivo de saída (padrão: stdout)')
+    @click.option('--formato', type=click.Choice(sorted(FORMATS)), default='csv')
+    @click.option('--setor-id', default=None, type=int)
+    @click.option('--status', default=None)
+    @click.option('--desde', default=None, help='Data de criação inicial (AAAA-MM-DD)')
+    @click.option('--ate', default=None, help='Data de criação final, inclusive (AAAA-MM-DD)')
+    def export_atividades_command(output, formato, setor_id, status, desde, ate):
+        """Stream atividades (dashboard projection) to a CSV or JSONL file."""
+        try:
+            desde, ate = parse_date(desde), parse_date(ate)
+        except ValueError:
+            raise click.BadParameter('dates must be YYYY-MM-DD')
+        for chunk in export_atividades(formato, chunk_size=app.config.get('EXPORT_CHUNK_SIZE', 1000),
+                                       setor_id=setor_id, status=status, desde=desde, ate=ate):
+            output.write(chunk)
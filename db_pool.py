@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Pool de Conexões - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Configuração do pool de conexões do banco de dados (tamanho, overflow,
+reciclagem e pre-ping) e métricas de uso do pool: tempo de espera por uma
+conexão, conexões em uso e em overflow
+"""
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports how long every checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except exc.TimeoutError:
+            pool_monitor.record_timeout(time.perf_counter() - started)
+            raise
+        # Includes opening a new connection when the pool grows into its overflow
+        pool_monitor.record_wait(time.perf_counter() - started, self.checkedout())
+        return entry
+
+@event.listens_for(InstrumentedQueuePool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    # Dead connections found by the pre-ping, or dropped after an error
+    pool_monitor.record_invalidated()
+
+class PoolMonitor:
+    """Engine pool settings from the app config and checkout counters of this process.
+
+    Callbacks registered with subscribe(callback) are called with the wait
+    (seconds) of every checkout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidated = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use_max = 0
+
+    def engine_options(self, app):
+        """SQLAlchemy engine options built from the DB_POOL_* settings"""
+        url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # Flask-SQLAlchemy keeps in-memory databases on a single static connection
+            return {}
+        return {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': app.config.get('DB_POOL_SIZE', 10),
+            'max_overflow': app.config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': app.config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': app.config.get('DB_POOL_RECYCLE', 3600),
+            'pool_pre_ping': app.config.get('DB_POOL_PRE_PING', True),
+        }
+
+    def init_app(self, app, db):
+        """Set SQLALCHEMY_ENGINE_OPTIONS (explicit entries win); must run before db.init_app"""
+        options = self.engine_options(app)
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        app.extensions['pool_monitor'] = self
+        self.app = app
+        self.db = db
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def record_wait(self, seconds, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use_max = max(self.in_use_max, in_use)
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+        for callback in self._listeners:
+            callback(seconds)
+
+    def record_timeout(self, seconds):
+        with self._lock:
+            self.timeouts += 1
+        self.app.logger.warning(f"No database connection available after {seconds:.1f}s: "
+                                f"raise DB_POOL_SIZE / DB_MAX_OVERFLOW or lower the threads per worker")
+
+    def record_invalidated(self):
+        with self._lock:
+            self.invalidated += 1
+
+    def stats(self):
+        """Current pool usage and the checkout counters of this process"""
+        with self.app.app_context():
+            pool = self.db.engine.pool
+        if not isinstance(pool, QueuePool):
+            return {'pool': type(pool).__name__}
+        return {
+            'pool': type(pool).__name__,
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+            'in_use_max': self.in_use_max,
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'invalidated': self.invalidated,
+            'wait_avg': round(self.wait_total / self.checkouts, 6) if self.checkouts else None,
+            'wait_max': round(self.wait_max, 6),
+        }
+
+pool_monitor = PoolMonitor()
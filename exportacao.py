@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Exportação de Atividades - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Exportação das atividades (mesma projeção do painel) em CSV ou JSONL,
+lidas do banco com cursor no servidor e enviadas em blocos, com uso de
+memória constante independente do número de linhas
+"""
+
+from datetime import datetime, timedelta
+from models import Atividade, _dashboard_query
+import csv
+import io
+import json
+
+EXPORT_COLUMNS = ['id', 'descricao', 'status', 'prioridade', 'data_criada', 'prazo',
+                  'local', 'setor', 'criado_por_nome', 'solicitante', 'atendente']
+
+# Rows fetched from the server-side cursor at a time, and rows per written chunk
+CHUNK_SIZE = 1000
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD filter value; raises ValueError"""
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+def export_query(setor_id=None, status=None, desde=None, ate=None):
+    """Dashboard projection filtered by setor, status and creation date range (both days included)"""
+    query = _dashboard_query(setor_id)
+    if status:
+        query = query.filter(Atividade.status == status)
+    if desde:
+        query = query.filter(Atividade.data_criada >= desde)
+    if ate:
+        query = query.filter(Atividade.data_criada < ate + timedelta(days=1))
+    # Primary key order streams straight from the table
+    return query.order_by(Atividade.id)
+
+def iter_rows(query, chunk_size=CHUNK_SIZE):
+    """Stream the rows of a query through a server-side cursor"""
+    return query.yield_per(chunk_size)
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+def iter_csv(rows, chunk_size=CHUNK_SIZE):
+    """Encode rows as CSV, yielding one string per chunk_size rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_value(getattr(row, column)) for column in EXPORT_COLUMNS])
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_jsonl(rows, chunk_size=CHUNK_SIZE):
+    """Encode rows as JSON lines, yielding one string per chunk_size rows"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _value(getattr(row, column)) for column in EXPORT_COLUMNS},
+                                ensure_ascii=False))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson'),
+}
+
+def export_atividades(formato, chunk_size=CHUNK_SIZE, **filters):
+    """Text chunks of the export in the given format ('csv' or 'jsonl')"""
+    encoder, _ = FORMATS[formato]
+    return encoder(iter_rows(export_query(**filters), chunk_size), chunk_size)
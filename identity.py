@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Identidade do Usuário - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Identidade do usuário logado, carregada no máximo uma vez por requisição,
+com o tipo e o nome do setor já resolvidos
+"""
+
+from flask import g, session
+from models import db, User, get_setor_nome
+
+class Identity:
+    """Logged-in user: the User columns the routes need plus the setor name"""
+
+    def __init__(self, id, username, email, tipo, setor_id, setor_nome):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.tipo = tipo
+        self.setor_id = setor_id
+        self.setor_nome = setor_nome
+
+def current_identity():
+    """Identity of the logged-in user (or None), loaded once per request"""
+    if 'identity' not in g:
+        g.identity = None
+        user_id = session.get('user_id')
+        if user_id is not None:
+            row = db.session.query(
+                User.id, User.username, User.email, User.tipo, User.setor_id
+            ).filter(User.id == user_id).first()
+            if row:
+                g.identity = Identity(row.id, row.username, row.email, row.tipo, row.setor_id,
+                                      get_setor_nome(row.setor_id))
+    return g.identity
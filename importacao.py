@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Importação de Atividades - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Importação de atividades a partir de arquivos CSV ou JSONL, lidos linha a linha
+(memória constante) e gravados em lotes com INSERTs de várias linhas
+"""
+
+from datetime import datetime
+from models import (db, Atividade, get_setores, parse_prazo, status_rank,
+                    next_versao, apply_bulk_change, counted_state)
+import codecs
+import csv
+import json
+
+# Errors kept for the report; the rest are only counted
+MAX_ERRORS = 1000
+
+class ImportFileError(ValueError):
+    """The file can't be read past a line (encoding or CSV syntax)"""
+
+    def __init__(self, linha, mensagem):
+        super().__init__(mensagem)
+        self.linha = linha
+        self.mensagem = mensagem
+
+class ImportResult:
+    """Counters and per-row errors of an import"""
+
+    def __init__(self):
+        self.lidas = 0
+        self.importadas = 0
+        self.rejeitadas = 0
+        self.erros = []  # (linha, mensagem)
+        # (linha, mensagem) when the file couldn't be read to the end; the batches
+        # before that line are already committed
+        self.interrompida = None
+
+    def error(self, linha, mensagem):
+        self.rejeitadas += 1
+        if len(self.erros) < MAX_ERRORS:
+            self.erros.append((linha, mensagem))
+
+    def summary(self):
+        return {
+            'lidas': self.lidas,
+            'importadas': self.importadas,
+            'rejeitadas': self.rejeitadas,
+        }
+
+def _lines(stream):
+    """Text lines of a binary stream, decoded one at a time so a bad byte has a line number"""
+    for number, raw in enumerate(stream, start=1):
+        if number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            # Typically a Latin-1 / Windows-1252 export from Excel
+            raise ImportFileError(number, 'O arquivo não está em UTF-8 (salve-o como "CSV UTF-8")')
+
+def read_rows(stream, formato):
+    """Yield (line number, row dict or None, error) from a binary CSV or JSONL stream.
+
+    Raises ImportFileError when the file can't be read past a line.
+    """
+    if formato == 'csv':
+        reader = csv.DictReader(_lines(stream))
+        try:
+            for row in reader:
+                yield reader.line_num, row, None
+        except csv.Error as e:
+            raise ImportFileError(reader.line_num + 1, f'CSV inválido: {e}')
+    elif formato == 'jsonl':
+        for number, line in enumerate(_lines(stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, None, f'JSON inválido: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield number, None, 'Cada linha deve ser um objeto JSON'
+                continue
+            yield number, row, None
+    else:
+        raise ValueError(f'Formato desconhecido: {formato}')
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def validate_row(row, setores_by_id, setores_by_nome):
+    """Column values for one input row, validated like the new task form.
+
+    Raises ValueError with the message shown to the user.
+    """
+    descricao = _text(row, 'descricao')
+    prioridade = _text(row, 'prioridade')
+    local = _text(row, 'local')
+    if not descricao or not prioridade or not local:
+        raise ValueError('Descrição, Prioridade e Local são obrigatórios')
+    if prioridade not in Atividade.prioridade.type.enums:
+        raise ValueError(f'Prioridade inválida: {prioridade}')
+
+    status = _text(row, 'status') or 'Pendente'
+    if status not in Atividade.status.type.enums:
+        raise ValueError(f'Status inválido: {status}')
+
+    # Setor by id (setor_id) or by name (setor)
+    setor_id = _text(row, 'setor_id')
+    setor_nome = _text(row, 'setor')
+    if setor_id:
+        try:
+            setor_id = int(setor_id)
+        except ValueError:
+            raise ValueError('Setor não encontrado.')
+        if setor_id not in setores_by_id:
+            raise ValueError('Setor não encontrado.')
+    elif setor_nome:
+        setor_id = setores_by_nome.get(setor_nome)
+        if setor_id is None:
+            raise ValueError('Setor não encontrado.')
+    else:
+        setor_id = None
+
+    prazo = parse_prazo(_text(row, 'prazo'))
+    return {
+        'descricao': descricao,
+        'status': status,
+        'prioridade': prioridade,
+        'prazo': prazo,
+        'local': local,
+        'setor_id': setor_id,
+        'solicitante': _text(row, 'solicitante'),
+        'atendente': _text(row, 'atendente'),
+        'status_rank': status_rank(status),
+        'prazo_null': prazo is None,
+    }
+
+def _insert_batch(batch, user_id, result):
+    """Insert a batch of validated rows with one multi-row INSERT and commit it"""
+    lines = [line for line, _ in batch]
+    try:
+        connection = db.session.connection()
+        versao = next_versao(connection)
+        now = datetime.utcnow()
+        values = [dict(row, user_id=user_id, data_criada=now, versao=versao, atualizado_em=now)
+                  for _, row in batch]
+        connection.execute(Atividade.__table__.insert().values(values))
+        apply_bulk_change(connection, versao, [], [
+            counted_state(row['setor_id'], row['status'], row['prioridade'], row['prazo']) for _, row in batch
+        ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for line in lines:
+            result.error(line, f'Erro ao gravar o lote: {e}')
+        return
+    result.importadas += len(batch)
+
+def import_atividades(stream, formato, user_id, batch_size=500, on_batch=None):
+    """Import atividades from a CSV or JSONL stream, committing every batch_size valid rows.
+
+    Invalid rows are reported in the result and skipped. A file that can't be
+    read to the end stops the import at that line (result.interrompida); the
+    rows before it are imported. on_batch(result) is called after every batch,
+    for progress reporting.
+    """
+    setores = get_setores()
+    setores_by_id = {setor.id for setor in setores}
+    setores_by_nome = {setor.nome: setor.id for setor in setores}
+
+    result = ImportResult()
+    batch = []
+    try:
+        for line, row, error in read_rows(stream, formato):
+            result.lidas += 1
+            if error:
+                result.error(line, error)
+                continue
+            try:
+                batch.append((line, validate_row(row, setores_by_id, setores_by_nome)))
+            except ValueError as e:
+                result.error(line, str(e))
+                continue
+            if len(batch) >= batch_size:
+                _insert_batch(batch, user_id, result)
+                batch = []
+                if on_batch:
+                    on_batch(result)
+    except ImportFileError as e:
+        result.interrompida = (e.linha, e.mensagem)
+
+    if batch:
+        _insert_batch(batch, user_id, result)
+        if on_batch:
+            on_batch(result)
+    return result
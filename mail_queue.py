@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Fila de Emails - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Fila de envio de emails em segundo plano: as requisições apenas gravam a
+mensagem na tabela email_outbox e um grupo de workers faz o envio, reutilizando
+conexões SMTP e tentando novamente com espera exponencial em caso de falha
+"""
+
+from datetime import datetime, timedelta
+from flask_mail import Message
+from models import db, EmailOutbox
+import queue
+import smtplib
+import threading
+import time
+
+class MailQueue:
+    """Outbound mail queue drained by a pool of worker threads.
+
+    Every message is stored in email_outbox before it is queued, so nothing is
+    lost if the process dies. Workers claim a message with a conditional UPDATE,
+    which keeps several workers (or processes) from sending it twice; a poller
+    re-queues due retries and messages whose claim has expired.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.mail = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def init_app(self, app, mail):
+        self.app = app
+        self.mail = mail
+        self.workers = app.config.get('MAIL_QUEUE_WORKERS', 2)
+        self.max_attempts = app.config.get('MAIL_QUEUE_MAX_ATTEMPTS', 5)
+        self.retry_base = app.config.get('MAIL_QUEUE_RETRY_BASE', 30)
+        self.poll_interval = app.config.get('MAIL_QUEUE_POLL_INTERVAL', 30)
+        self.idle_timeout = app.config.get('MAIL_QUEUE_IDLE_TIMEOUT', 60)
+        self.claim_timeout = app.config.get('MAIL_QUEUE_CLAIM_TIMEOUT', 600)
+        # Threads don't survive a fork, so they are started by the first request of each worker
+        app.before_request(self._ensure_started)
+        app.extensions['mail_queue'] = self
+
+    def enqueue(self, subject, recipients, body=None, html=None):
+        """Store a message in the outbox and hand it to the workers"""
+        email = EmailOutbox(
+            recipients=','.join(recipients),
+            subject=subject,
+            body=body,
+            html=html,
+            next_attempt_at=datetime.utcnow()
+        )
+        db.session.add(email)
+        db.session.commit()
+        if self.workers > 0:
+            self._ensure_started()
+            self._queue.put(email.id)
+        return email.id
+
+    def _ensure_started(self):
+        if self._started or self.workers <= 0:
+            return
+        with self._lock:
+            if self._started:
+                return
+            for number in range(self.workers):
+                threading.Thread(target=self._worker, name=f'mail-worker-{number}', daemon=True).start()
+            threading.Thread(target=self._poller, name='mail-poller', daemon=True).start()
+            self._started = True
+
+    def _worker(self):
+        """Send queued messages, keeping one SMTP connection open while there is work"""
+        conn = None
+        with self.app.app_context():
+            while True:
+                try:
+                    email_id = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    conn = self._close(conn)
+                    continue
+                try:
+                    conn = self.deliver(email_id, conn)
+                except Exception as e:
+                    self.app.logger.error(f"Mail worker error on email {email_id}: {e}")
+                    conn = self._close(conn)
+                finally:
+                    db.session.remove()
+
+    def _poller(self):
+        """Re-queue retries that became due and messages whose claim expired"""
+        with self.app.app_context():
+            while True:
+                time.sleep(self.poll_interval)
+                try:
+                    for email_id in self.due_ids():
+                        self._queue.put(email_id)
+                except Exception as e:
+                    self.app.logger.error(f"Mail poller error: {e}")
+                finally:
+                    db.session.remove()
+
+    def due_ids(self):
+        return [
+            email_id for (email_id,) in db.session.query(EmailOutbox.id).filter(
+                EmailOutbox.status.in_(('pending', 'sending')),
+                EmailOutbox.next_attempt_at <= datetime.utcnow()
+            ).order_by(EmailOutbox.next_attempt_at)
+        ]
+
+    def _claim(self, email_id):
+        """Mark a due message as being sent, returning it if this worker won the claim"""
+        now = datetime.utcnow()
+        table = EmailOutbox.__table__
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == email_id,
+                   table.c.status.in_(('pending', 'sending')),
+                   table.c.next_attempt_at <= now)
+            .values(status='sending', next_attempt_at=now + timedelta(seconds=self.claim_timeout))
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            return None
+        return db.session.get(EmailOutbox, email_id)
+
+    def deliver(self, email_id, conn=None):
+        """Send one message through conn (opened if needed); returns the connection to reuse"""
+        email = self._claim(email_id)
+        if email is None:
+            return conn
+
+        message = Message(subject=email.subject, recipients=email.recipients.split(','),
+                          body=email.body, html=email.html)
+        started = time.perf_counter()
+        try:
+            try:
+                if conn is None:
+                    conn = self.mail.connect().__enter__()
+                conn.send(message)
+            except smtplib.SMTPServerDisconnected:
+                # The server may have dropped a reused idle connection: reconnect once
+                self._close(conn)
+                conn = self.mail.connect().__enter__()
+                conn.send(message)
+        except Exception as e:
+            conn = self._close(conn)
+            email.attempts += 1
+            email.last_error = str(e)[:1000]
+            if email.attempts >= self.max_attempts:
+                email.status = 'failed'
+                self._count('failed')
+                self.app.logger.error(f"Giving up on email {email.id} after {email.attempts} attempts: {e}")
+            else:
+                email.status = 'pending'
+                email.next_attempt_at = datetime.utcnow() + timedelta(
+                    seconds=self.retry_base * 2 ** (email.attempts - 1))
+                self._count('retried')
+                self.app.logger.warning(f"Email {email.id} failed (attempt {email.attempts}), will retry: {e}")
+            db.session.commit()
+            return conn
+
+        elapsed = time.perf_counter() - started
+        email.attempts += 1
+        email.status = 'sent'
+        email.sent_at = datetime.utcnow()
+        db.session.commit()
+        with self._lock:
+            self.sent += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+        self.app.logger.info(f"Email {email.id} sent in {elapsed:.3f}s")
+        return conn
+
+    def drain(self):
+        """Send every due message on the calling thread; returns how many were processed"""
+        conn = None
+        email_ids = self.due_ids()
+        try:
+            for email_id in email_ids:
+                conn = self.deliver(email_id, conn)
+        finally:
+            self._close(conn)
+        return len(email_ids)
+
+    def _close(self, conn):
+        if conn is not None:
+            try:
+                conn.__exit__(None, None, None)
+            except Exception:
+                pass
+        return None
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self):
+        """Queue depth, outbox totals and send latency of this process"""
+        by_status = dict(
+            db.session.query(EmailOutbox.status, db.func.count(EmailOutbox.id)).group_by(EmailOutbox.status)
+        )
+        return {
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize(),
+            'outbox': by_status,
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'latency_avg': round(self.latency_total / self.sent, 4) if self.sent else None,
+            'latency_max': round(self.latency_max, 4),
+        }
+
+mail_queue = MailQueue()
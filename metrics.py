@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Métricas - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Instrumentação das requisições (latência por rota, comandos SQL e tempo de
+banco por requisição, renderização de templates e eventos Socket.IO emitidos)
+exposta em /metrics no formato texto do Prometheus
+"""
+
+from flask import Response, request, g, has_request_context, abort
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from db_pool import pool_monitor
+import hmac
+import os
+import threading
+import time
+
+# Bucket upper bounds (seconds) of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Bucket upper bounds of the SQL statements per request histogram
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, values)} {total}')
+        return lines
+
+class Histogram:
+    """Cumulative buckets, sum and count per label set, as Prometheus expects them"""
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *values):
+        with self._lock:
+            series = self._values.get(values)
+            if series is None:
+                series = self._values[values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets, counts):
+                    cumulative += bucket
+                    lines.append(f'{self.name}_bucket{_labels(self.labels, values, [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_bucket{_labels(self.labels, values, [("le", "+Inf")])} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.labels, values)} {round(total, 6)}')
+                lines.append(f'{self.name}_count{_labels(self.labels, values)} {count}')
+        return lines
+
+def _gauges(name, help, samples, kind='gauge'):
+    """Lines of a metric read at scrape time; samples are (labels dict, value) pairs"""
+    lines = [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f'{name}{_labels(list(labels), list(labels.values()))} {value}')
+    return lines
+
+class Metrics:
+    """Request, SQL, template and Socket.IO instrumentation of this process.
+
+    Disabled unless METRICS_ENABLED is set: no hook is installed and /metrics
+    is not registered. Each gunicorn worker keeps its own values, reported
+    with its pid in gestor_worker_info.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._local = threading.local()
+        self.requests = Counter('gestor_http_requests_total', 'Requests by endpoint and status',
+                                ('endpoint', 'method', 'status'))
+        self.latency = Histogram('gestor_http_request_duration_seconds', 'Request latency by endpoint',
+                                 ('endpoint', 'method'))
+        self.request_sql = Histogram('gestor_http_request_sql_statements', 'SQL statements per request',
+                                     ('endpoint',), COUNT_BUCKETS)
+        self.request_sql_time = Histogram('gestor_http_request_sql_duration_seconds',
+                                          'Time spent in SQL per request', ('endpoint',))
+        self.sql = Counter('gestor_sql_statements_total', 'SQL statements executed', ('context',))
+        self.sql_time = Counter('gestor_sql_duration_seconds_total', 'Time spent in SQL', ('context',))
+        self.templates = Histogram('gestor_template_render_seconds', 'Template render time', ('template',))
+        self.emits = Counter('gestor_socketio_emits_total', 'Socket.IO events emitted', ('event',))
+        self.pool_wait = Histogram('gestor_db_pool_checkout_wait_seconds', 'Wait for a pooled connection')
+
+    def init_app(self, app, socketio):
+        self.app = app
+        self.enabled = app.config.get('METRICS_ENABLED', False)
+        self.token = app.config.get('METRICS_TOKEN')
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        self._count_emits(socketio)
+        pool_monitor.subscribe(self.pool_wait.observe)
+        app.add_url_rule('/metrics', 'metrics', self.endpoint)
+
+    def _count_emits(self, socketio):
+        # flask_socketio.emit() inside handlers goes through socketio.emit as well
+        emit = socketio.emit
+
+        def counted_emit(event, *args, **kwargs):
+            self.emits.inc(event)
+            return emit(event, *args, **kwargs)
+        socketio.emit = counted_emit
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = 0
+        g.metrics_sql_time = 0.0
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        # Unknown URLs share one label so the number of series stays bounded
+        endpoint = request.endpoint or 'unmatched'
+        self.latency.observe(time.perf_counter() - started, endpoint, request.method)
+        self.requests.inc(endpoint, request.method, response.status_code)
+        self.request_sql.observe(g.metrics_sql, endpoint)
+        self.request_sql_time.observe(g.metrics_sql_time, endpoint)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+        if has_request_context() and 'metrics_started' in g:
+            g.metrics_sql += 1
+            g.metrics_sql_time += elapsed
+            context_label = 'request'
+        else:
+            context_label = 'background'
+        self.sql.inc(context_label)
+        self.sql_time.inc(context_label, amount=elapsed)
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('metrics_started'):
+            conn.info['metrics_started'].pop()
+
+    def _before_render(self, sender, template, context, **extra):
+        stack = getattr(self._local, 'templates', None)
+        if stack is None:
+            stack = self._local.templates = []
+        stack.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        stack = getattr(self._local, 'templates', None)
+        if stack:
+            self.templates.observe(time.perf_counter() - stack.pop(), template.name or 'string')
+
+    def endpoint(self):
+        if self.token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied, f'Bearer {self.token}'):
+                abort(403)
+        return Response('\n'.join(self.render()) + '\n', mimetype='text/plain; version=0.0.4')
+
+    def render(self):
+        lines = _gauges('gestor_worker_info', 'Process that answered this scrape', [({'pid': os.getpid()}, 1)])
+        for metric in (self.requests, self.latency, self.request_sql, self.request_sql_time,
+                       self.sql, self.sql_time, self.templates, self.emits, self.pool_wait):
+            lines += metric.render()
+        lines += self._extension_lines()
+        return lines
+
+    def _extension_lines(self):
+        """Counters kept by the other extensions of this process, read at scrape time"""
+        extensions = self.app.extensions
+        lines = []
+
+        pool = extensions['pool_monitor'].stats() if 'pool_monitor' in extensions else {}
+        if 'in_use' in pool:
+            lines += _gauges('gestor_db_pool_connections', 'Pooled connections by state', [
+                ({'state': 'in_use'}, pool['in_use']),
+                ({'state': 'idle'}, pool['idle']),
+                ({'state': 'overflow'}, pool['overflow']),
+            ])
+            lines += _gauges('gestor_db_pool_size', 'Configured pool size', [({}, pool['size'])])
+            lines += _gauges('gestor_db_pool_timeouts_total', 'Checkouts that timed out',
+                             [({}, pool['timeouts'])], 'counter')
+            lines += _gauges('gestor_db_pool_invalidated_total', 'Connections invalidated',
+                             [({}, pool['invalidated'])], 'counter')
+
+        if 'dashboard_cache' in extensions:
+            cache = extensions['dashboard_cache']
+            lines += _gauges('gestor_dashboard_cache_lookups_total', 'Dashboard cache lookups', [
+                ({'result': 'hit'}, cache.hits),
+                ({'result': 'miss'}, cache.misses),
+            ], 'counter')
+            lines += _gauges('gestor_dashboard_cache_evictions_total', 'Dashboard cache evictions',
+                             [({}, cache.evictions)], 'counter')
+
+        if 'notifications' in extensions:
+            notifications = extensions['notifications']
+            lines += _gauges('gestor_notifications_published_total', 'Task events published',
+                             [({}, notifications.published)], 'counter')
+            lines += _gauges('gestor_notifications_batches_total', 'Task batches emitted',
+                             [({}, notifications.batches)], 'counter')
+            lines += _gauges('gestor_notifications_queue_depth', 'Task events waiting to be emitted',
+                             [({}, notifications._queue.qsize())])
+
+        if 'mail_queue' in extensions:
+            mail_queue = extensions['mail_queue']
+            lines += _gauges('gestor_mail_total', 'Emails by result', [
+                ({'result': 'sent'}, mail_queue.sent),
+                ({'result': 'retried'}, mail_queue.retried),
+                ({'result': 'failed'}, mail_queue.failed),
+            ], 'counter')
+            lines += _gauges('gestor_mail_queue_depth', 'Emails waiting for a worker',
+                             [({}, mail_queue._queue.qsize())])
+        return lines
+
+metrics = Metrics()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Migração do Banco de Dados - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Aplica as alterações de esquema em bancos já existentes.
+db.create_all() só cria tabelas novas, então colunas e índices adicionados
+aos modelos são criados aqui. Pode ser executado mais de uma vez.
+"""
+
+from sqlalchemy import inspect, text, update, case, select, func
+from app import app
+from busca import search_installed, install_search
+from models import (db, Atividade, AtividadeArquivada, AtividadeContador, AtividadePrazo, EscopoVersao, STATUS_RANK, reconcile_counters,
+                    _set_versions)
+
+def add_column(table, name, ddl):
+    """Add a column to an existing table, returning True if it was created"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns(table)}
+    if name in columns:
+        return False
+    with db.engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {ddl}'))
+    print(f"✅ Added column {table}.{name}")
+    return True
+
+def drop_index(table, name):
+    """Drop an index that is no longer declared on the models"""
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(table)}
+    if name not in existing:
+        return
+    with db.engine.begin() as conn:
+        if db.engine.dialect.name == 'mysql':
+            conn.execute(text(f'DROP INDEX {name} ON {table}'))
+        else:
+            conn.execute(text(f'DROP INDEX {name}'))
+    print(f"✅ Dropped index {name}")
+
+def create_indexes(model):
+    """Create the indexes declared on a model that don't exist yet"""
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(model.__tablename__)}
+    for index in model.__table__.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            print(f"✅ Created index {index.name}")
+
+def migrate_sort_key():
+    """Persisted dashboard sort key (status_rank, prazo_null) and its indexes"""
+    added = add_column('atividade', 'status_rank', 'status_rank SMALLINT NOT NULL DEFAULT 2')
+    added = add_column('atividade', 'prazo_null', 'prazo_null BOOLEAN NOT NULL DEFAULT 1') or added
+
+    if added:
+        # Backfill existing rows
+        with db.engine.begin() as conn:
+            conn.execute(update(Atividade.__table__).values(
+                prazo_null=case((Atividade.prazo.is_(None), True), else_=False),
+                status_rank=case(
+                    *[(Atividade.status == status, rank) for status, rank in STATUS_RANK.items()],
+                    else_=2
+                )
+            ))
+        print("✅ Backfilled atividade sort key")
+
+def migrate_setor_id():
+    """Integer setor foreign key on atividade, backfilled from the old setor name column"""
+    if add_column('atividade', 'setor_id', 'setor_id INTEGER NULL'):
+        with db.engine.begin() as conn:
+            if db.engine.dialect.name == 'mysql':
+                conn.execute(text('ALTER TABLE atividade ADD CONSTRAINT fk_atividade_setor_id '
+                                  'FOREIGN KEY (setor_id) REFERENCES setor (id)'))
+            conn.execute(text('UPDATE atividade SET setor_id = '
+                              '(SELECT MIN(setor.id) FROM setor WHERE setor.nome = atividade.setor) '
+                              'WHERE atividade.setor IS NOT NULL'))
+            unmatched = conn.execute(text("SELECT DISTINCT setor FROM atividade "
+                                          "WHERE setor IS NOT NULL AND setor <> '' AND setor_id IS NULL")).fetchall()
+        print("✅ Backfilled atividade.setor_id from setor names")
+        for (nome,) in unmatched:
+            print(f"⚠️  No setor named '{nome}', its atividades were left without setor_id")
+
+    # Replaced by ix_atividade_setor_id_dashboard
+    drop_index('atividade', 'ix_atividade_setor_dashboard')
+
+    # The counters were keyed by setor name; they are rebuilt by migrate_counters
+    columns = {column['name'] for column in inspect(db.engine).get_columns('atividade_contador')}
+    if 'setor_id' not in columns:
+        AtividadeContador.__table__.drop(db.engine)
+        AtividadeContador.__table__.create(db.engine)
+        print("✅ Recreated atividade_contador keyed by setor_id")
+
+def migrate_contador_prioridade():
+    """Counters keyed by prioridade too, for the dashboard statistics"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('atividade_contador')}
+    if 'prioridade' not in columns:
+        # Rebuilt by migrate_counters
+        AtividadeContador.__table__.drop(db.engine)
+        AtividadeContador.__table__.create(db.engine)
+        print("✅ Recreated atividade_contador keyed by prioridade")
+
+def migrate_counters():
+    """Populate atividade_contador and atividade_prazo for databases created before they existed"""
+    empty = AtividadeContador.query.first() is None or AtividadePrazo.query.first() is None
+    if empty and Atividade.query.first() is not None:
+        drift = reconcile_counters()
+        print(f"✅ Populated {len(drift)} atividade counter(s)")
+
+def migrate_versao():
+    """Change version and last change time of atividade, for delta sync"""
+    added = add_column('atividade', 'versao', 'versao BIGINT NOT NULL DEFAULT 0')
+    add_column('atividade', 'atualizado_em', 'atualizado_em DATETIME NULL')
+    
+    if added:
+        # Existing rows get versions after every version already handed out
+        escopo = EscopoVersao.__table__
+        with db.engine.begin() as conn:
+            offset = conn.execute(select(escopo.c.versao).where(escopo.c.setor_id == 0)).scalar() or 0
+            conn.execute(update(Atividade.__table__).values(
+                versao=Atividade.id + offset,
+                atualizado_em=Atividade.data_criada
+            ))
+            ultima = offset + (conn.execute(select(func.max(Atividade.id))).scalar() or 0)
+            if conn.execute(escopo.update().where(escopo.c.setor_id == 0).values(versao=ultima)).rowcount == 0:
+                conn.execute(escopo.insert().values(setor_id=0, versao=ultima))
+            setor_ids = [setor_id for (setor_id,) in conn.execute(select(Atividade.setor_id).distinct())]
+            _set_versions(conn, setor_ids, ultima)
+        print(f"✅ Backfilled atividade.versao (current version {ultima})")
+
+def migrate_marca_prazo():
+    """Change version of the deadline scanner marks"""
+    add_column('marca_prazo', 'versao', 'versao BIGINT NOT NULL DEFAULT 0')
+
+def migrate_busca():
+    """Full-text index for the search (FULLTEXT on MySQL, FTS5 table and triggers on SQLite)"""
+    with db.engine.begin() as conn:
+        if conn.dialect.name not in ('mysql', 'sqlite') or search_installed(conn):
+            return
+        install_search(conn, rebuild=True)
+    print("✅ Created the full-text search index")
+
+def migrate_indexes():
+    """Indexes declared on the models"""
+    # Replaced by ix_atividade_status_atualizado_em
+    drop_index('atividade', 'ix_atividade_status')
+    create_indexes(Atividade)
+    create_indexes(AtividadeArquivada)
+
+MIGRATIONS = [
+    migrate_sort_key,
+    migrate_setor_id,
+    migrate_versao,
+    migrate_marca_prazo,
+    migrate_contador_prioridade,
+    migrate_counters,
+    migrate_indexes,
+    migrate_busca,
+]
+
+if __name__ == '__main__':
+    print("Gestor de Tarefas - Database Migration")
+    print("=" * 40)
+
+    with app.app_context():
+        db.create_all()
+        for migration in MIGRATIONS:
+            migration()
+
+    print("\nMigration completed!")
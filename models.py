@@ -9,10 +9,16 @@ Inclui os modelos User, Setor, Atividade e funções relacionadas
 """
 
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy.orm import Session
 from markupsafe import escape
+from cache import dashboard_cache, setor_cache
+from security import password_hasher
+from collections import namedtuple, Counter
 from datetime import datetime, timedelta
 import secrets
+import base64
+import json
 import re
 
 db = SQLAlchemy()
@@ -59,29 +65,159 @@ class Atividade(db.Model):
     data_criada = db.Column(db.DateTime, default=datetime.utcnow)
     prazo = db.Column(db.DateTime, nullable=True)
     local = db.Column(db.String(255), nullable=False)
-    setor = db.Column(db.String(100), nullable=True)
+    setor_id = db.Column(db.Integer, db.ForeignKey('setor.id'), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     solicitante = db.Column(db.String(100), nullable=True)
     atendente = db.Column(db.String(100), nullable=True)
+    # Dashboard sort key, kept in sync with status/prazo (see _update_sort_key)
+    status_rank = db.Column(db.SmallInteger, nullable=False, default=2)
+    prazo_null = db.Column(db.Boolean, nullable=False, default=True)
+    # Global change version and last change, for delta sync (see _stamp_versao)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=True)
+    
+    # Both dashboard queries are read in index order: (prazo_null, prazo, status_rank, id)
+    __table_args__ = (
+        db.Index('ix_atividade_dashboard', 'prazo_null', 'prazo', 'status_rank', 'id'),
+        db.Index('ix_atividade_setor_id_dashboard', 'setor_id', 'prazo_null', 'prazo', 'status_rank', 'id'),
+        # Also finds finished atividades by age for the archival job
+        db.Index('ix_atividade_status_atualizado_em', 'status', 'atualizado_em'),
+        db.Index('ix_atividade_user_id', 'user_id'),
+        db.Index('ix_atividade_versao', 'versao'),
+        db.Index('ix_atividade_setor_id_versao', 'setor_id', 'versao'),
+    )
     
     # Relationships
     criado_por = db.relationship('User', foreign_keys=[user_id], backref='atividade_criadas')
 
+class AtividadeArquivada(db.Model):
+    """Finished atividade moved out of the atividade table by the archival job (see arquivamento.py)"""
+    __tablename__ = 'atividade_archive'
+    
+    # Same columns as atividade, so rows are copied with INSERT ... SELECT
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    descricao = db.Column(db.Text, nullable=False)
+    status = db.Column(db.Enum('Pendente', 'Em andamento', 'Concluída', 'Cancelada', name='status_enum'), default='Pendente')
+    prioridade = db.Column(db.Enum('Baixa', 'Média', 'Alta', 'Crítica', name='prioridade_enum'), default='Média')
+    data_criada = db.Column(db.DateTime)
+    prazo = db.Column(db.DateTime, nullable=True)
+    local = db.Column(db.String(255), nullable=False)
+    setor_id = db.Column(db.Integer, db.ForeignKey('setor.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    solicitante = db.Column(db.String(100), nullable=True)
+    atendente = db.Column(db.String(100), nullable=True)
+    status_rank = db.Column(db.SmallInteger, nullable=False, default=2)
+    prazo_null = db.Column(db.Boolean, nullable=False, default=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=True)
+    arquivada_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # The archive view is paginated like the dashboard
+    __table_args__ = (
+        db.Index('ix_atividade_archive_dashboard', 'prazo_null', 'prazo', 'status_rank', 'id'),
+        db.Index('ix_atividade_archive_setor_id_dashboard', 'setor_id', 'prazo_null', 'prazo', 'status_rank', 'id'),
+    )
+
+class AtividadeContador(db.Model):
+    """Number of atividades per setor, status and prioridade, kept in the same transaction as every change"""
+    __tablename__ = 'atividade_contador'
+    
+    setor_id = db.Column(db.Integer, primary_key=True)  # 0 for atividades without setor
+    status = db.Column(db.String(20), primary_key=True)
+    prioridade = db.Column(db.String(20), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+class AtividadePrazo(db.Model):
+    """Number of open atividades (Pendente / Em andamento) per setor and prazo day, kept like the counters.
+
+    Every day before today is overdue, so the overdue count only has to look at
+    the atividades of today's bucket (see count_atrasadas).
+    """
+    __tablename__ = 'atividade_prazo'
+    
+    setor_id = db.Column(db.Integer, primary_key=True)  # 0 for atividades without setor
+    dia = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_atividade_prazo_dia', 'dia'),
+    )
+
+class EscopoVersao(db.Model):
+    """Latest change version of each dashboard scope, updated in the same transaction as the change.
+
+    The row of scope 0 (every atividade) is also the global version sequence.
+    """
+    __tablename__ = 'escopo_versao'
+    
+    setor_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 for the scope with every atividade
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+
+class AtividadeRemovida(db.Model):
+    """Tombstone of a deleted atividade (or of one moved out of a setor), for delta sync"""
+    __tablename__ = 'atividade_removida'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    atividade_id = db.Column(db.Integer, nullable=False)
+    setor_id = db.Column(db.Integer, nullable=True)
+    versao = db.Column(db.BigInteger, nullable=False)
+    movida = db.Column(db.Boolean, nullable=False, default=False)  # Still exists, in another setor
+    removido_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_atividade_removida_versao', 'versao'),
+        db.Index('ix_atividade_removida_setor_id_versao', 'setor_id', 'versao'),
+    )
+
+class MarcaPrazo(db.Model):
+    """High-water mark of the deadline scanner: prazos up to marca were already notified for this alerta"""
+    __tablename__ = 'marca_prazo'
+    
+    alerta = db.Column(db.String(20), primary_key=True)  # 'vencendo' or 'atrasada'
+    marca = db.Column(db.DateTime, nullable=False)
+    # Global change version when the mark was moved: rows written after it are checked again
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+
+class EmailOutbox(db.Model):
+    """Outgoing email, kept until it is sent or gives up after the last retry"""
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)  # Comma separated
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    html = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+
 def create_user(username, email, password, setor_id, tipo):
-    hashed_password = generate_password_hash(password)
+    hashed_password = password_hasher.generate(password)
     user = User(username=username, email=email, password=hashed_password, setor_id=setor_id, tipo=tipo)
     db.session.add(user)
     db.session.commit()
     return user
 
-def create_atividade(descricao, status, prioridade, user_id, prazo=None, local=None, setor=None, solicitante=None):
-    """Create a new atividade"""
-    # Parse prazo if it's a string
+def parse_prazo(prazo):
+    """Parse a prazo given as an ISO string (as sent by datetime-local inputs); invalid values become None"""
     if prazo and isinstance(prazo, str):
         try:
-            prazo = datetime.fromisoformat(prazo.replace('T', ' '))
+            return datetime.fromisoformat(prazo.replace('T', ' '))
         except ValueError:
-            prazo = None
+            return None
+    return prazo or None
+
+def create_atividade(descricao, status, prioridade, user_id, prazo=None, local=None, setor_id=None, solicitante=None):
+    """Create a new atividade"""
+    # Parse prazo if it's a string
+    prazo = parse_prazo(prazo)
     
     atividade = Atividade(
         descricao=descricao,
@@ -90,90 +226,663 @@ def create_atividade(descricao, status, prioridade, user_id, prazo=None, local=N
         user_id=user_id,
         prazo=prazo,
         local=local,
-        setor=setor if setor else None,
+        setor_id=setor_id if setor_id else None,
         solicitante=solicitante if solicitante else None
     )
     db.session.add(atividade)
     db.session.commit()
     return atividade
 
-def get_all_atividades(page=1, per_page=10):
-    """Get all atividades with creator info, with pagination and custom ordering"""
+# Dashboard status rank: 'Em andamento' first, 'Pendente' (and others) second, 'Concluída' last
+STATUS_RANK = {
+    'Em andamento': 1,
+    'Pendente': 2,
+    'Cancelada': 2,
+    'Concluída': 3,
+}
+
+class CursorPagination:
+    """Keyset (seek) pagination result, navigated with opaque cursors instead of page numbers"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+class CachedPagination(Pagination):
+    """Page-number pagination rebuilt from a cached page"""
+
+    def _query_items(self):
+        return self._query_args['items']
+
+    def _query_count(self):
+        return self._query_args['total']
+
+def status_rank(status):
+    """Return the dashboard sort rank of a status"""
+    return STATUS_RANK.get(status, 2)
+
+def encode_cursor(direction, key=None):
+    """Encode an opaque cursor for the dashboard.
+
+    direction is 'next' (rows after key) or 'prev' (rows before key). A 'prev'
+    cursor without key points at the last page.
+    """
+    payload = {'d': direction}
+    if key is not None:
+        prazo_null, prazo, rank, atividade_id = key
+        payload['k'] = [prazo_null, prazo.isoformat() if prazo else None, rank, atividade_id]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor built by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        direction = payload['d']
+        key = payload.get('k')
+        if key is not None:
+            prazo_null, prazo, rank, atividade_id = key
+            prazo = datetime.fromisoformat(prazo) if prazo else None
+            key = (int(prazo_null), prazo, int(rank), int(atividade_id))
+            if key[0] != (1 if prazo is None else 0):
+                raise ValueError('prazo_null inconsistente')
+            if not all(-2 ** 63 <= value < 2 ** 63 for value in (key[2], key[3])):
+                # Not a database integer
+                raise ValueError('Cursor fora do intervalo')
+    except (ValueError, KeyError, TypeError, OverflowError, RecursionError) as e:
+        raise ValueError('Cursor inválido') from e
+    if direction not in ('next', 'prev'):
+        raise ValueError('Cursor inválido')
+    return direction, key
+
+def _dashboard_sort_columns(model=None):
+    """Dashboard sort key: (prazo_null, prazo, status rank, id).
+
+    The id makes the ordering total, so pages stay stable when rows are
+    inserted concurrently. model is Atividade (default) or AtividadeArquivada.
+    """
+    model = model or Atividade
+    return [
+        model.prazo_null,  # NULL prazo last
+        model.prazo,  # Order by prazo first
+        model.status_rank,  # Then by status priority
+        model.id  # Tie-breaker
+    ]
+
+@db.event.listens_for(Atividade, 'before_insert')
+@db.event.listens_for(Atividade, 'before_update')
+def _update_sort_key(mapper, connection, target):
+    """Keep the persisted sort key columns in sync with status and prazo"""
+    target.status_rank = status_rank(target.status or 'Pendente')
+    target.prazo_null = target.prazo is None
+
+def _row_sort_key(row):
+    """Sort key of a dashboard row, in the same order as _dashboard_sort_columns"""
+    return (1 if row.prazo is None else 0, row.prazo, status_rank(row.status), row.id)
+
+def _dashboard_query(setor_id=None, model=None):
+    """Build the dashboard query (atividades with creator and setor names), optionally filtered by setor.
+
+    model is Atividade (default) or AtividadeArquivada for the archive view.
+    """
     from sqlalchemy.orm import aliased
-    from sqlalchemy import case
+    model = model or Atividade
     
     # Create alias for the User table (only for creator now)
     CriadorUser = aliased(User)
     
-    # Define status priority order: 'em andamento' > 'pendente' > others, 'concluído' last
-    status_order = case(
-        (Atividade.status == 'Concluída', 3),  # Concluído always last
-        (Atividade.status == 'Em andamento', 1),  # Em andamento first
-        (Atividade.status == 'Pendente', 2),  # Pendente second
-        else_=2  # Other statuses with pendente
-    )
-    
     query = db.session.query(
-        Atividade.id,
-        Atividade.descricao,
-        Atividade.status,
-        Atividade.prioridade,
-        Atividade.data_criada,
-        Atividade.prazo,
-        Atividade.local,
-        Atividade.setor,
+        model.id,
+        model.descricao,
+        model.status,
+        model.prioridade,
+        model.data_criada,
+        model.prazo,
+        model.local,
+        Setor.nome.label('setor'),
         CriadorUser.username.label('criado_por_nome'),
-        Atividade.solicitante,
-        Atividade.atendente
+        model.solicitante,
+        model.atendente
     ).join(
-        CriadorUser, Atividade.user_id == CriadorUser.id
-    ).order_by(
-        db.func.isnull(Atividade.prazo),  # NULL prazo last
-        Atividade.prazo.asc(),  # Order by prazo first
-        status_order  # Then by status priority
+        CriadorUser, model.user_id == CriadorUser.id
+    ).outerjoin(
+        Setor, model.setor_id == Setor.id  # Only for the displayed name
     )
     
-    return query.paginate(page=page, per_page=per_page, error_out=False)
+    if setor_id is not None:
+        query = query.filter(model.setor_id == setor_id)
+    
+    return query
 
-def get_atividades_by_setor(setor_nome, page=1, per_page=10):
-    """Get all atividades filtered by setor name, with pagination and custom ordering"""
-    from sqlalchemy.orm import aliased
-    from sqlalchemy import case
+def _paginate_dashboard(query, page, per_page, cursor, count, model=None):
+    """Paginate a dashboard query by page number (OFFSET) or by cursor (keyset).
+
+    count is called for the total in page-number mode, so the paginator reads the
+    maintained counters instead of issuing a COUNT(*) over the join.
+    """
+    columns = _dashboard_sort_columns(model)
     
-    # Create alias for the User table (only for creator now)
-    CriadorUser = aliased(User)
+    if not cursor:
+        pagination = query.order_by(*columns).paginate(page=page, per_page=per_page, error_out=False, count=False)
+        pagination.total = count()
+        # Cursor to continue in keyset mode after this page
+        pagination.next_cursor = None
+        if pagination.items and pagination.has_next:
+            pagination.next_cursor = encode_cursor('next', _row_sort_key(pagination.items[-1]))
+        return pagination
+    
+    direction, key = decode_cursor(cursor)
+    
+    if key is not None:
+        from sqlalchemy import tuple_
+        seek_columns, values = list(columns), list(key)
+        if key[1] is None:
+            # Every row with prazo_null = 1 has a NULL prazo, so it can't take part in the comparison
+            del seek_columns[1]
+            del values[1]
+        if direction == 'next':
+            query = query.filter(tuple_(*seek_columns) > tuple_(*values))
+        else:
+            query = query.filter(tuple_(*seek_columns) < tuple_(*values))
+    
+    if direction == 'next':
+        query = query.order_by(*[column.asc() for column in columns])
+    else:
+        query = query.order_by(*[column.desc() for column in columns])
+    
+    # Fetch one extra row to know whether there is more in this direction
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    if direction == 'next':
+        has_next, has_prev = has_more, key is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = key is not None, has_more
+    
+    next_cursor = encode_cursor('next', _row_sort_key(rows[-1])) if rows and has_next else None
+    prev_cursor = encode_cursor('prev', _row_sort_key(rows[0])) if rows and has_prev else None
     
-    # Define status priority order: 'em andamento' > 'pendente' > others, 'concluído' last
-    status_order = case(
-        (Atividade.status == 'Concluída', 3),  # Concluído always last
-        (Atividade.status == 'Em andamento', 1),  # Em andamento first
-        (Atividade.status == 'Pendente', 2),  # Pendente second
-        else_=2  # Other statuses with pendente
+    return CursorPagination(rows, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+def _cached_dashboard(setor_id, page, per_page, cursor):
+    """Serve a dashboard page from the dashboard cache, loading it on a miss.
+
+    The scope version is read first, in the transaction that loads the page,
+    so a page is never stored under a version newer than its rows.
+    """
+    versao = get_escopo_versao(setor_id)
+    query = _dashboard_query(setor_id)
+    count = lambda: count_atividades(setor_id)
+    
+    def load():
+        pagination = _paginate_dashboard(query, page, per_page, cursor, count)
+        if isinstance(pagination, CursorPagination):
+            return pagination
+        return {
+            'page': pagination.page,
+            'items': pagination.items,
+            'total': pagination.total,
+            'next_cursor': pagination.next_cursor,
+        }
+    
+    scope = 'all' if setor_id is None else f'setor:{setor_id}'
+    cached = dashboard_cache.get_or_load(scope, versao, (page, per_page, cursor), load)
+    if isinstance(cached, CursorPagination):
+        return cached
+    
+    pagination = CachedPagination(page=cached['page'], per_page=per_page, error_out=False,
+                                  items=cached['items'], total=cached['total'])
+    pagination.next_cursor = cached['next_cursor']
+    return pagination
+
+def get_dashboard_page(setor_id=None, page=1, per_page=10, cursor=None):
+    """Dashboard page of every atividade (setor_id None) or of one setor, through the cache"""
+    return _cached_dashboard(setor_id, page, per_page, cursor)
+
+def get_all_atividades(page=1, per_page=10, cursor=None):
+    """Get all atividades with creator info, paginated by page number or by cursor"""
+    return _cached_dashboard(None, page, per_page, cursor)
+
+def get_atividades_by_setor(setor_id, page=1, per_page=10, cursor=None):
+    """Get all atividades filtered by setor id, paginated by page number or by cursor"""
+    return _cached_dashboard(setor_id, page, per_page, cursor)
+
+def get_atividades_arquivadas(setor_id=None, page=1, per_page=10, cursor=None):
+    """Archived atividades (optionally of one setor), paginated like the dashboard"""
+    def count():
+        query = db.session.query(db.func.count(AtividadeArquivada.id))
+        if setor_id is not None:
+            query = query.filter(AtividadeArquivada.setor_id == setor_id)
+        return query.scalar()
+    
+    return _paginate_dashboard(_dashboard_query(setor_id, model=AtividadeArquivada), page, per_page, cursor,
+                               count=count, model=AtividadeArquivada)
+
+# Atividades that can be overdue
+OPEN_STATUSES = ('Pendente', 'Em andamento')
+
+def _adjust_counter(connection, model, key, delta):
+    """Add delta to the counter row of model with the given key columns, creating the row if needed"""
+    table = model.__table__
+    result = connection.execute(
+        table.update()
+        .where(*[table.c[name] == value for name, value in key.items()])
+        .values(total=table.c.total + delta)
     )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(total=delta, **key))
+
+def counted_state(setor_id, status, prioridade, prazo):
+    """What the counters know about an atividade: (setor_id, status, prioridade, prazo)"""
+    return (setor_id, status or 'Pendente', prioridade or 'Média', prazo)
+
+def _apply_counts(connection, removed, added):
+    """Maintain atividade_contador and atividade_prazo for atividades leaving and entering a state.
+
+    removed and added are counted_state tuples, one per atividade.
+    """
+    counters = Counter()
+    prazos = Counter()
+    for sign, states in ((-1, removed), (1, added)):
+        for setor_id, status, prioridade, prazo in states:
+            counters[(setor_id or 0, status, prioridade)] += sign
+            if status in OPEN_STATUSES and prazo is not None:
+                prazos[(setor_id or 0, prazo.date())] += sign
     
-    query = db.session.query(
-        Atividade.id,
-        Atividade.descricao,
-        Atividade.status,
-        Atividade.prioridade,
-        Atividade.data_criada,
-        Atividade.prazo,
-        Atividade.local,
-        Atividade.setor,
-        CriadorUser.username.label('criado_por_nome'),
-        Atividade.solicitante,
-        Atividade.atendente
-    ).join(
-        CriadorUser, Atividade.user_id == CriadorUser.id
-    ).filter(
-        Atividade.setor == setor_nome
-    ).order_by(
-        db.func.isnull(Atividade.prazo),  # NULL prazo last
-        Atividade.prazo.asc(),  # Order by prazo first
-        status_order  # Then by status priority
+    # Fixed order, so concurrent transactions lock the rows in the same order
+    for (setor_id, status, prioridade), delta in sorted(counters.items()):
+        if delta:
+            _adjust_counter(connection, AtividadeContador,
+                            {'setor_id': setor_id, 'status': status, 'prioridade': prioridade}, delta)
+    for (setor_id, dia), delta in sorted(prazos.items()):
+        if delta:
+            _adjust_counter(connection, AtividadePrazo, {'setor_id': setor_id, 'dia': dia}, delta)
+
+def next_versao(connection):
+    """Take the next global change version.
+
+    The scope 0 row stays locked until the transaction ends, so versions
+    become visible in the order they were taken.
+    """
+    table = EscopoVersao.__table__
+    result = connection.execute(
+        table.update()
+        .where(table.c.setor_id == 0)
+        .values(versao=table.c.versao + 1)
     )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(setor_id=0, versao=1))
+    return connection.execute(db.select(table.c.versao).where(table.c.setor_id == 0)).scalar()
+
+def _set_versions(connection, setor_ids, versao):
+    """Record versao as the latest change of the given setores"""
+    table = EscopoVersao.__table__
+    for setor_id in {setor_id for setor_id in setor_ids if setor_id}:
+        result = connection.execute(
+            table.update()
+            .where(table.c.setor_id == setor_id)
+            .values(versao=versao)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(setor_id=setor_id, versao=versao))
+
+def _bump_versions(connection, setor_ids):
+    """Take a new version for the 'all' scope and the given setores"""
+    versao = next_versao(connection)
+    _set_versions(connection, setor_ids, versao)
+    return versao
+
+def _record_removal(connection, atividade_id, setor_id, versao, movida=False):
+    connection.execute(AtividadeRemovida.__table__.insert().values(
+        atividade_id=atividade_id, setor_id=setor_id, versao=versao, movida=movida,
+        removido_em=datetime.utcnow()
+    ))
+
+def get_escopo_versao(setor_id=None):
+    """Current version of the 'all' scope or of one setor, 0 if it never changed"""
+    versao = db.session.query(EscopoVersao.versao).filter(EscopoVersao.setor_id == (setor_id or 0)).scalar()
+    return versao or 0
+
+def get_alteracoes(desde, setor_id=None, limite=500):
+    """Atividades changed and removed after version desde, oldest change first.
+
+    Returns (rows, removidas, versao, mais): the dashboard rows (with versao and
+    atualizado_em), the removed atividade ids, the version the client has
+    reached and whether there are more changes after it.
+    """
+    def changes(*criteria, limit=None):
+        rows = _dashboard_query(setor_id).add_columns(Atividade.versao, Atividade.atualizado_em).filter(
+            *[criterion(Atividade.versao) for criterion in criteria]
+        ).order_by(Atividade.versao)
+        removidas = AtividadeRemovida.query.with_entities(
+            AtividadeRemovida.atividade_id, AtividadeRemovida.versao
+        ).filter(*[criterion(AtividadeRemovida.versao) for criterion in criteria])
+        if setor_id is not None:
+            removidas = removidas.filter(AtividadeRemovida.setor_id == setor_id)
+        else:
+            removidas = removidas.filter(AtividadeRemovida.movida.is_(False))
+        removidas = removidas.order_by(AtividadeRemovida.versao)
+        if limit is not None:
+            rows, removidas = rows.limit(limit), removidas.limit(limit)
+        return rows.all(), removidas.all()
+    
+    # Everything up to the global version read here is visible to the queries below
+    atual = get_escopo_versao()
+    rows, removidas = changes(lambda versao: versao > desde, limit=limite + 1)
+    
+    versoes = sorted([row.versao for row in rows] + [versao for _, versao in removidas])
+    mais = len(versoes) > limite
+    if not mais:
+        versao = max([atual, desde] + versoes)
+    elif versoes[0] == versoes[limite]:
+        # One change (a bulk operation) larger than the limit: it can't be split
+        versao = versoes[0]
+        rows, removidas = changes(lambda column: column == versao)
+    else:
+        # Changes left out are all at or after versoes[limite], so stop right before it
+        versao = versoes[limite] - 1
+        rows = [row for row in rows if row.versao <= versao]
+        removidas = [(atividade_id, v) for atividade_id, v in removidas if v <= versao]
     
-    return query.paginate(page=page, per_page=per_page, error_out=False)
+    return rows, [atividade_id for atividade_id, _ in removidas], versao, mais
+
+def _previous_value(target, attr):
+    """Value an attribute had before the current flush"""
+    history = db.inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+@db.event.listens_for(Atividade, 'before_insert')
+@db.event.listens_for(Atividade, 'before_update')
+def _stamp_versao(mapper, connection, target):
+    """Give every inserted or changed atividade a new global version"""
+    session = db.inspect(target).session
+    if target.id is not None and session is not None and not session.is_modified(target):
+        return
+    target.versao = next_versao(connection)
+    target.atualizado_em = datetime.utcnow()
+
+def _target_state(target, previous=False):
+    value = (lambda attr: _previous_value(target, attr)) if previous else (lambda attr: getattr(target, attr))
+    return counted_state(value('setor_id'), value('status'), value('prioridade'), value('prazo'))
+
+@db.event.listens_for(Atividade, 'after_insert')
+def _count_insert(mapper, connection, target):
+    _apply_counts(connection, [], [_target_state(target)])
+    _set_versions(connection, [target.setor_id], target.versao)
+
+@db.event.listens_for(Atividade, 'after_update')
+def _count_update(mapper, connection, target):
+    old_setor_id = _previous_value(target, 'setor_id')
+    old_state = _target_state(target, previous=True)
+    new_state = _target_state(target)
+    if old_state != new_state:
+        _apply_counts(connection, [old_state], [new_state])
+    if db.inspect(target).attrs.versao.history.has_changes():
+        _set_versions(connection, [old_setor_id, target.setor_id], target.versao)
+        if old_setor_id != target.setor_id:
+            # Clients syncing the old setor must drop it
+            _record_removal(connection, target.id, old_setor_id, target.versao, movida=True)
+
+@db.event.listens_for(Atividade, 'before_delete')
+def _stamp_versao_delete(mapper, connection, target):
+    # Taken before the row is deleted, so every write locks the version row first
+    target.versao = next_versao(connection)
+
+@db.event.listens_for(Atividade, 'after_delete')
+def _count_delete(mapper, connection, target):
+    _apply_counts(connection, [_target_state(target)], [])
+    _set_versions(connection, [target.setor_id], target.versao)
+    _record_removal(connection, target.id, target.setor_id, target.versao)
+
+# Days until the prazo when an atividade is started, by prioridade
+PRAZO_DIAS = {
+    'Baixa': 15,
+    'Média': 10,
+    'Alta': 5,
+    'Crítica': 2,
+}
+
+def _lock_atividades(atividade_ids):
+    """Read (and lock) the atividades a bulk operation will change"""
+    return db.session.query(
+        Atividade.id, Atividade.setor_id, Atividade.status, Atividade.prioridade, Atividade.descricao,
+        Atividade.prazo, Atividade.atendente
+    ).filter(Atividade.id.in_(atividade_ids)).order_by(Atividade.id).with_for_update().all()
+
+def apply_bulk_change(connection, versao, removed, added):
+    """Maintain the counters and scope versions for rows changed with set-based statements.
+
+    For code that writes atividade with Core INSERT / UPDATE / DELETE (bulk
+    actions, import, archive), which the ORM events don't see: take versao
+    with next_versao() in the same transaction, stamp it on the rows and pass
+    the counted_state of every row before (removed) and after (added) the
+    change.
+    """
+    _apply_counts(connection, removed, added)
+    
+    setor_ids = {state[0] for state in removed} | {state[0] for state in added}
+    _set_versions(connection, setor_ids, versao)
+
+def bulk_update_status(atividade_ids, new_status, atendente=None):
+    """Change the status of many atividades in one transaction, with set-based UPDATEs.
+
+    Atividades moving from Pendente to Em andamento get their prazo from
+    PRAZO_DIAS and the given atendente, like a single status update. Returns
+    the changed rows with their new values.
+    """
+    # The version row is locked first, in the same order as single-row changes
+    connection = db.session.connection()
+    versao = next_versao(connection)
+    rows = [row for row in _lock_atividades(atividade_ids) if row.status != new_status]
+    if not rows:
+        db.session.rollback()
+        return []
+    
+    table = Atividade.__table__
+    now = datetime.now()
+    values = {
+        'status': new_status,
+        'status_rank': status_rank(new_status),
+        'versao': versao,
+        'atualizado_em': datetime.utcnow(),
+    }
+    
+    # One statement per prazo (rows being started, by prioridade) and one for the rest
+    groups = {}
+    for row in rows:
+        starting = row.status == 'Pendente' and new_status == 'Em andamento'
+        groups.setdefault(row.prioridade if starting else None, []).append(row)
+    
+    changed = []
+    for prioridade, group in groups.items():
+        group_values = dict(values)
+        if prioridade is not None:
+            if prioridade in PRAZO_DIAS:
+                group_values.update(prazo=now + timedelta(days=PRAZO_DIAS[prioridade]), prazo_null=False)
+            if atendente:
+                group_values['atendente'] = atendente
+        connection.execute(
+            table.update()
+            .where(table.c.id.in_([row.id for row in group]))
+            .values(**group_values)
+        )
+        for row in group:
+            changed.append(dict(
+                id=row.id, setor_id=row.setor_id, descricao=row.descricao, prioridade=row.prioridade,
+                status=new_status, prazo=group_values.get('prazo', row.prazo),
+                atendente=group_values.get('atendente', row.atendente)
+            ))
+    
+    apply_bulk_change(connection, versao,
+                      [counted_state(row.setor_id, row.status, row.prioridade, row.prazo) for row in rows],
+                      [counted_state(row['setor_id'], row['status'], row['prioridade'], row['prazo'])
+                       for row in changed])
+    db.session.commit()
+    # Loaded instances don't know about the set-based changes
+    db.session.expire_all()
+    return changed
+
+def bulk_delete_atividades(atividade_ids):
+    """Delete many atividades in one transaction, recording their tombstones. Returns the deleted rows."""
+    connection = db.session.connection()
+    versao = next_versao(connection)
+    rows = _lock_atividades(atividade_ids)
+    if not rows:
+        db.session.rollback()
+        return []
+    apply_bulk_change(connection, versao,
+                      [counted_state(row.setor_id, row.status, row.prioridade, row.prazo) for row in rows], [])
+    
+    table = Atividade.__table__
+    connection.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+    removido_em = datetime.utcnow()
+    connection.execute(AtividadeRemovida.__table__.insert(), [
+        {'atividade_id': row.id, 'setor_id': row.setor_id, 'versao': versao, 'movida': False,
+         'removido_em': removido_em}
+        for row in rows
+    ])
+    
+    db.session.commit()
+    db.session.expire_all()
+    return [dict(id=row.id, setor_id=row.setor_id, descricao=row.descricao) for row in rows]
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('setores_changed', None)
+
+def count_atividades(setor_id=None):
+    """Total atividades (optionally of one setor), read from the maintained counters"""
+    query = db.session.query(db.func.coalesce(db.func.sum(AtividadeContador.total), 0))
+    if setor_id is not None:
+        query = query.filter(AtividadeContador.setor_id == setor_id)
+    return int(query.scalar())
+
+def _reconcile(model, key_columns, actual):
+    """Replace the rows of a counter table with the actual totals, returning the drifted (key, stored, actual)"""
+    stored = {
+        tuple(getattr(counter, name) for name in key_columns): counter.total
+        for counter in model.query.with_for_update()
+    }
+    drift = []
+    for key in sorted(set(actual) | set(stored)):
+        if actual.get(key, 0) != stored.get(key, 0):
+            drift.append((key, stored.get(key, 0), actual.get(key, 0)))
+    
+    if drift:
+        model.query.delete()
+        db.session.add_all(
+            model(total=total, **dict(zip(key_columns, key)))
+            for key, total in actual.items()
+        )
+    return drift
+
+def reconcile_counters():
+    """Rebuild atividade_contador and atividade_prazo from the atividade table.
+
+    Returns the (key, stored, actual) rows that had drifted.
+    """
+    counters = {
+        (setor_id or 0, status, prioridade): total
+        for setor_id, status, prioridade, total in db.session.query(
+            Atividade.setor_id, Atividade.status, Atividade.prioridade, db.func.count(Atividade.id)
+        ).group_by(Atividade.setor_id, Atividade.status, Atividade.prioridade)
+    }
+    dia = db.func.date(Atividade.prazo, type_=db.Date)
+    prazos = {
+        (setor_id or 0, prazo_dia): total
+        for setor_id, prazo_dia, total in db.session.query(
+            Atividade.setor_id, dia, db.func.count(Atividade.id)
+        ).filter(
+            Atividade.status.in_(OPEN_STATUSES), Atividade.prazo.isnot(None)
+        ).group_by(Atividade.setor_id, dia)
+    }
+    
+    drift = _reconcile(AtividadeContador, ('setor_id', 'status', 'prioridade'), counters)
+    drift += _reconcile(AtividadePrazo, ('setor_id', 'dia'), prazos)
+    if drift:
+        # Cached pages and statistics of every process carry the old totals
+        _bump_versions(db.session.connection(), {key[0] for key, _, _ in drift})
+    db.session.commit()
+    return drift
+
+def _atrasadas_hoje(setor_id, agora):
+    """Open atividades whose prazo passed earlier today, read from the prazo index"""
+    query = db.session.query(db.func.count(Atividade.id)).filter(
+        Atividade.prazo_null == False,
+        Atividade.prazo >= datetime.combine(agora.date(), datetime.min.time()),
+        Atividade.prazo < agora,
+        Atividade.status.in_(OPEN_STATUSES)
+    )
+    if setor_id is not None:
+        query = query.filter(Atividade.setor_id == setor_id)
+    return query.scalar()
+
+def get_estatisticas(setor_id=None, agora=None):
+    """Totals per status, prioridade and setor and the overdue count (optionally of one setor).
+
+    Everything but today's overdue atividades comes from the maintained
+    counters and is cached with the dashboard pages; the overdue count adds up
+    the prazo days before today and counts the rest of today from the index.
+    """
+    agora = agora or datetime.now()
+    
+    def load():
+        query = db.session.query(AtividadeContador.setor_id, AtividadeContador.status,
+                                 AtividadeContador.prioridade, AtividadeContador.total)
+        atrasadas = db.session.query(db.func.coalesce(db.func.sum(AtividadePrazo.total), 0)).filter(
+            AtividadePrazo.dia < agora.date())
+        if setor_id is not None:
+            query = query.filter(AtividadeContador.setor_id == setor_id)
+            atrasadas = atrasadas.filter(AtividadePrazo.setor_id == setor_id)
+        
+        por_status = dict.fromkeys(Atividade.status.type.enums, 0)
+        por_prioridade = dict.fromkeys(Atividade.prioridade.type.enums, 0)
+        por_setor = Counter()
+        for counter_setor_id, status, prioridade, total in query:
+            por_status[status] = por_status.get(status, 0) + total
+            por_prioridade[prioridade] = por_prioridade.get(prioridade, 0) + total
+            por_setor[counter_setor_id] += total
+        return {
+            'total': sum(por_status.values()),
+            'por_status': por_status,
+            'por_prioridade': por_prioridade,
+            'por_setor': dict(por_setor),
+            'atrasadas_antes_de_hoje': int(atrasadas.scalar()),
+        }
+    
+    # Read before the counters, in the same transaction (see _cached_dashboard)
+    versao = get_escopo_versao(setor_id)
+    scope = 'all' if setor_id is None else f'setor:{setor_id}'
+    cached = dashboard_cache.get_or_load(scope, versao, ('estatisticas', agora.date()), load)
+    
+    nomes = {setor.id: setor.nome for setor in get_setores()}
+    return {
+        'total': cached['total'],
+        'por_status': cached['por_status'],
+        'por_prioridade': cached['por_prioridade'],
+        'por_setor': [
+            {'setor_id': counter_setor_id or None, 'setor': nomes.get(counter_setor_id, 'Sem setor'), 'total': total}
+            for counter_setor_id, total in sorted(cached['por_setor'].items())
+            if total
+        ],
+        'atrasadas': cached['atrasadas_antes_de_hoje'] + _atrasadas_hoje(setor_id, agora),
+    }
 
 def get_user_by_username(username):
     return User.query.filter_by(username=username).first()
@@ -185,7 +894,7 @@ def get_user_by_reset_token(token):
     return User.query.filter_by(reset_token=token).first()
 
 def update_user_password(user, new_password):
-    user.password = generate_password_hash(new_password)
+    user.password = password_hasher.generate(new_password)
     user.clear_reset_token()
     db.session.commit()
 
@@ -223,4 +932,34 @@ class Setor(db.Model):
     __tablename__ = 'setor'
     
     id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(150))
\ No newline at end of file
+    nome = db.Column(db.String(150))
+
+SetorInfo = namedtuple('SetorInfo', ['id', 'nome'])
+
+def get_setores():
+    """All setores as SetorInfo tuples, served from the process-wide setor cache"""
+    return setor_cache.get(
+        lambda: [SetorInfo(setor.id, setor.nome) for setor in Setor.query.order_by(Setor.nome)]
+    )
+
+def get_setor_nome(setor_id):
+    """Name of a setor, or None if it doesn't exist"""
+    for setor in get_setores():
+        if setor.id == setor_id:
+            return setor.nome
+    return None
+
+@db.event.listens_for(Setor, 'after_insert')
+@db.event.listens_for(Setor, 'after_update')
+@db.event.listens_for(Setor, 'after_delete')
+def _setor_changed(mapper, connection, target):
+    # The setor name is part of the rows served under these scopes
+    _bump_versions(connection, [target.id])
+    session = db.inspect(target).session
+    if session is not None:
+        session.info['setores_changed'] = True
+
+@db.event.listens_for(Session, 'after_commit')
+def _invalidate_setores_after_commit(session):
+    if session.info.pop('setores_changed', False):
+        setor_cache.invalidate()
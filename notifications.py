@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Notificações - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Envio das notificações de tarefas em segundo plano: as requisições apenas
+publicam o evento e um despachante agrupa os eventos de cada sala dentro de
+uma janela curta, emitindo um único evento 'task_batch' com as alterações
+"""
+
+import queue
+import secrets
+import threading
+import time
+
+class NotificationDispatcher:
+    """Coalesces task events per room and emits them off the request path.
+
+    Events published within `window` seconds of the first one are grouped by
+    room; several events for the same atividade are merged into a single delta.
+    Each room gets a monotonically increasing sequence number per dispatcher,
+    sent with the dispatcher's source id, so clients can drop batches they have
+    already applied even when several workers emit to the same room.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.socketio = None
+        self.window = 0.25
+        self.max_batch = 200
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._sequences = {}
+        self.source = None
+        self.published = 0
+        self.batches = 0
+
+    def init_app(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+        self.window = app.config.get('NOTIFY_COALESCE_WINDOW', self.window)
+        self.max_batch = app.config.get('NOTIFY_MAX_BATCH', self.max_batch)
+        app.extensions['notifications'] = self
+
+    def publish(self, kind, room, atividade_id, data):
+        """Queue a task event ('new', 'update' or 'delete') for a room"""
+        self.publish_many(kind, room, [(atividade_id, data)])
+
+    def publish_many(self, kind, room, tasks):
+        """Queue the same kind of event for several (atividade_id, data) pairs, delivered in one batch"""
+        if self.socketio is None or not room or not tasks:
+            return
+        self._ensure_started()
+        self._queue.put((kind, room, tasks))
+        with self._lock:
+            self.published += len(tasks)
+
+    def announce(self, event, room, data):
+        """Queue a single event (e.g. an import summary) to be emitted as is"""
+        if self.socketio is None or not room:
+            return
+        self._ensure_started()
+        self._queue.put((None, room, (event, data)))
+
+    def _ensure_started(self):
+        # Threads don't survive a fork, so the dispatcher starts with the first event of each worker
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self.source = secrets.token_hex(4)
+            threading.Thread(target=self._run, name='notification-dispatcher', daemon=True).start()
+            self._started = True
+
+    def _run(self):
+        while True:
+            events = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(events) < self.max_batch and events[-1] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    events.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.flush([event for event in events if event is not None])
+            except Exception as e:
+                self.app.logger.warning(f"Error sending WebSocket notification: {e}")
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+    def drain(self, timeout=5):
+        """Emit the queued events now and wait until they were sent (for short-lived processes such as CLI commands)"""
+        if self._started:
+            # Ends the current window instead of waiting for it
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def flush(self, events):
+        """Merge the events per room and atividade and emit one batch per room"""
+        rooms = {}
+        for kind, room, published in events:
+            if kind is None:
+                # Sent by announce(), not coalesced
+                event, data = published
+                self.socketio.emit(event, data, room=room)
+                continue
+            tasks = rooms.setdefault(room, {})
+            for atividade_id, data in published:
+                task = tasks.get(atividade_id)
+                if task is None:
+                    tasks[atividade_id] = dict(data, kind=kind, atividade_id=atividade_id)
+                else:
+                    # A later event only changes the fields it carries; a delete wins
+                    task.update(data)
+                    if kind == 'delete' or task['kind'] != 'new':
+                        task['kind'] = kind
+
+        for room, tasks in rooms.items():
+            with self._lock:
+                seq = self._sequences.get(room, 0) + 1
+                self._sequences[room] = seq
+                self.batches += 1
+            self.socketio.emit('task_batch', {'source': self.source, 'seq': seq, 'tasks': list(tasks.values())}, room=room)
+
+    def stats(self):
+        return {
+            'window': self.window,
+            'queue_depth': self._queue.qsize(),
+            'published': self.published,
+            'batches': self.batches,
+        }
+
+notifications = NotificationDispatcher()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Alertas de Prazo - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Verificação periódica dos prazos: a cada ciclo, as atividades em aberto cujo
+prazo entrou na janela "vence em 24h" ou passou do prazo desde o ciclo anterior,
+ou que foram gravadas desde então com um prazo já vencido, são notificadas em um
+único evento por sala
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, Atividade, MarcaPrazo, OPEN_STATUSES, get_setor_nome, get_escopo_versao
+from notifications import notifications
+import threading
+import time
+
+class DeadlineScanner:
+    """Notifies atividades crossing the "due soon" and "overdue" thresholds.
+
+    For each alerta the last notified prazo (the high-water mark) and the
+    global change version at that point are kept in marca_prazo. A tick claims
+    the window (mark, now + offset] by moving both with a conditional UPDATE,
+    so with several workers or processes only one of them notifies a window.
+    Open atividades written since the previous tick (created, imported, edited
+    or reopened) whose prazo is already behind the mark are notified again by
+    the next tick.
+
+    Delivery is at most once: the mark is committed before the batches are
+    announced, so a process that dies in between loses that window instead of
+    notifying it twice.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._started = False
+        self.notified = 0
+        self.last_run = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('DEADLINE_SCAN_INTERVAL', 60)
+        self.due_soon = timedelta(hours=app.config.get('DEADLINE_DUE_SOON_HOURS', 24))
+        # Threads don't survive a fork, so the thread is started by the first request of each worker
+        app.before_request(self._ensure_started)
+        app.extensions['deadline_scanner'] = self
+
+    def alertas(self):
+        """(alerta, offset from now): prazos up to now + offset have crossed the threshold"""
+        return [('vencendo', self.due_soon), ('atrasada', timedelta(0))]
+
+    def _ensure_started(self):
+        if self._started or self.interval <= 0:
+            return
+        with self._lock:
+            if self._started:
+                return
+            threading.Thread(target=self._run, name='deadline-scanner', daemon=True).start()
+            self._started = True
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.scan()
+                except Exception as e:
+                    self.app.logger.error(f"Deadline scanner error: {e}")
+                finally:
+                    db.session.remove()
+
+    def _claim(self, alerta, ate):
+        """Move the mark of an alerta up to ate.
+
+        Returns the previous (marca, versao), or None if there is nothing to do.
+        """
+        table = MarcaPrazo.__table__
+        marca = db.session.query(MarcaPrazo.marca, MarcaPrazo.versao).filter(MarcaPrazo.alerta == alerta).first()
+        atual = get_escopo_versao()
+        if marca is None:
+            # First run: start from now instead of notifying every past prazo
+            try:
+                db.session.execute(table.insert().values(alerta=alerta, marca=ate, versao=atual))
+                db.session.commit()
+            except IntegrityError:
+                # Another worker created it first
+                db.session.rollback()
+            return None
+        if marca.marca >= ate and marca.versao >= atual:
+            return None
+        claimed = db.session.execute(
+            table.update().where(
+                table.c.alerta == alerta, table.c.marca == marca.marca, table.c.versao == marca.versao
+            ).values(marca=max(marca.marca, ate), versao=atual)
+        ).rowcount
+        db.session.commit()
+        # Another worker moved the mark first and notifies this window
+        return (marca.marca, marca.versao) if claimed else None
+
+    def scan(self, agora=None):
+        """Run one tick; returns the number of atividades notified"""
+        agora = agora or datetime.now()
+        total = 0
+        for alerta, offset in self.alertas():
+            ate = agora + offset
+            claimed = self._claim(alerta, ate)
+            if claimed is None:
+                continue
+            desde, versao = claimed
+            columns = (Atividade.id, Atividade.descricao, Atividade.prazo, Atividade.setor_id,
+                       Atividade.status, Atividade.prioridade)
+            # Range scan on the dashboard index (prazo_null, prazo, ...)
+            rows = db.session.query(*columns).filter(
+                Atividade.prazo_null == False,
+                Atividade.prazo > desde,
+                Atividade.prazo <= ate,
+                Atividade.status.in_(OPEN_STATUSES)
+            ).all()
+            # Rows written since the previous tick with a prazo the mark already passed,
+            # read through the versao index
+            late = db.session.query(*columns).filter(
+                Atividade.versao > versao,
+                Atividade.prazo_null == False,
+                Atividade.prazo <= min(desde, ate),
+                Atividade.status.in_(OPEN_STATUSES)
+            )
+            if offset:
+                # Already overdue ones belong to the "atrasada" alert
+                late = late.filter(Atividade.prazo > agora)
+            rows = sorted(rows + late.all(), key=lambda row: (row.prazo, row.id))
+            db.session.commit()
+            total += self.notify(alerta, rows)
+        with self._lock:
+            self.notified += total
+            self.last_run = agora
+        return total
+
+    def notify(self, alerta, rows):
+        """Announce one batch per setor room and one with everything to the admin room"""
+        if not rows:
+            return 0
+        by_setor = {}
+        tasks = []
+        for row in rows:
+            setor_nome = get_setor_nome(row.setor_id) if row.setor_id else None
+            task = {
+                'atividade_id': row.id,
+                'descricao': row.descricao,
+                'prazo': row.prazo.strftime('%d/%m/%Y %H:%M'),
+                'status': row.status,
+                'prioridade': row.prioridade,
+                'setor': setor_nome,
+            }
+            tasks.append(task)
+            if setor_nome:
+                by_setor.setdefault(setor_nome, []).append(task)
+        for setor_nome, setor_tasks in by_setor.items():
+            notifications.announce('deadline_batch', f"setor_{setor_nome}", {'alerta': alerta, 'tasks': setor_tasks})
+        notifications.announce('deadline_batch', 'admin_room', {'alerta': alerta, 'tasks': tasks})
+        return len(rows)
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'notified': self.notified,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+        }
+
+deadline_scanner = DeadlineScanner()
@@ -0,0 +1,251 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from backup import (CHUNK_SIZE, zstandard, mysql_options_file, mysql_tables, mysql_row_counts,
+                    sqlite_row_counts)
+
+class CountingReader:
+    """File wrapper that counts the bytes read, for the restore throughput"""
+
+    def __init__(self, f):
+        self.f = f
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.size += len(data)
+        return data
+
+def open_decompressed(path, compression):
+    """Binary file object with the decompressed content of a backup file"""
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstd backups need the zstandard package (pip install zstandard)')
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+def load_manifest(directory):
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        return json.load(f)
+
+def latest_backup(output_dir='backups'):
+    """Most recent backup directory with a manifest"""
+    candidates = sorted(
+        name for name in os.listdir(output_dir)
+        if name.startswith('backup_') and os.path.exists(os.path.join(output_dir, name, 'manifest.json'))
+    ) if os.path.isdir(output_dir) else []
+    return os.path.join(output_dir, candidates[-1]) if candidates else None
+
+def sha256_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def verify_checksums(directory, manifest, jobs=1):
+    """Names of the files whose size or SHA-256 differ from the manifest"""
+    def check(entry):
+        path = os.path.join(directory, entry['name'])
+        if not os.path.exists(path) or os.path.getsize(path) != entry['size'] or sha256_file(path) != entry['sha256']:
+            return entry['name']
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return [name for name in executor.map(check, manifest['files']) if name]
+
+def restore_sqlite(directory, manifest, target):
+    """Decompress a SQLite backup into the target file; returns the bytes written"""
+    entry = manifest['files'][0]
+    with open_decompressed(os.path.join(directory, entry['name']), manifest['compression']) as source:
+        reader = CountingReader(source)
+        with open(target, 'wb') as f:
+            shutil.copyfileobj(reader, f, CHUNK_SIZE)
+    return reader.size
+
+def restore_mysql(directory, manifest, url, jobs=1):
+    """Load the dump files into the database of url, several files at a time for split dumps.
+
+    Returns the bytes loaded.
+    """
+    options_file = mysql_options_file(url)
+    try:
+        subprocess.run(['mysql', f'--defaults-extra-file={options_file}', '-e',
+                        f'CREATE DATABASE IF NOT EXISTS `{url.database}`'],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        def load(entry):
+            # stderr goes to a file, so warnings can't fill a pipe nobody reads while we feed stdin
+            with tempfile.TemporaryFile() as stderr:
+                process = subprocess.Popen(['mysql', f'--defaults-extra-file={options_file}', url.database],
+                                           stdin=subprocess.PIPE, stderr=stderr)
+                with open_decompressed(os.path.join(directory, entry['name']), manifest['compression']) as source:
+                    reader = CountingReader(source)
+                    try:
+                        shutil.copyfileobj(reader, process.stdin, CHUNK_SIZE)
+                    finally:
+                        process.stdin.close()
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    raise RuntimeError(f"{entry['name']}: {stderr.read().decode(errors='replace').strip()}")
+            return reader.size
+
+        # Largest files first, so the longest loads start first
+        entries = sorted(manifest['files'], key=lambda entry: entry['size'], reverse=True)
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            return sum(executor.map(load, entries))
+    finally:
+        os.remove(options_file)
+
+def compare_rows(expected, actual, tolerance=0.0):
+    """(table, expected, actual, tolerated) for every table whose row count differs.
+
+    A difference is tolerated when it is at most tolerance (a fraction of the
+    larger count); a table missing or empty in the restore is never tolerated
+    when the manifest had rows for it.
+    """
+    mismatches = []
+    for table in sorted(set(expected) | set(actual)):
+        want, got = expected.get(table), actual.get(table)
+        if want == got:
+            continue
+        if want and not got:
+            tolerated = False
+        else:
+            tolerated = abs((got or 0) - (want or 0)) <= tolerance * max(got or 0, want or 0)
+        mismatches.append((table, want, got, tolerated))
+    return mismatches
+
+def restore_backup(directory, target=None, jobs=1, keep=False, row_tolerance=0.01):
+    """Verify the checksums of a backup and restore it into a scratch database.
+
+    target is a SQLite file for SQLite backups, or a MySQL URI whose database
+    is created if needed. Without a target the backup is restored into a
+    scratch SQLite file or a throwaway schema on the configured MySQL server,
+    removed at the end unless keep is set. row_tolerance is the fraction the
+    row counts may differ by when the manifest counts are approximate (MySQL);
+    exact counts must match. Returns the report, which is also saved as
+    verify.json in the backup.
+    """
+    from sqlalchemy.engine import make_url
+
+    manifest = load_manifest(directory)
+    report = {
+        'backup': os.path.basename(os.path.normpath(directory)),
+        'verified_at': datetime.now().isoformat(),
+        'ok': False,
+    }
+
+    started = time.monotonic()
+    report['checksum_errors'] = verify_checksums(directory, manifest, jobs)
+    report['checksum_seconds'] = round(time.monotonic() - started, 3)
+    if report['checksum_errors']:
+        return save_report(directory, report)
+
+    started = time.monotonic()
+    drop_after = target is None and not keep
+    if manifest['backend'] == 'sqlite':
+        if target is None:
+            fd, target = tempfile.mkstemp(suffix='.db', prefix='restore_')
+            os.close(fd)
+        report['target'] = target
+        try:
+            report['bytes'] = restore_sqlite(directory, manifest, target)
+            report['restore_seconds'] = round(time.monotonic() - started, 3)
+            rows = sqlite_row_counts(target)
+        finally:
+            if drop_after:
+                os.remove(target)
+    else:
+        if target is None:
+            url = make_url(os.getenv('SQLALCHEMY_DATABASE_URI')).set(
+                database=f"{manifest['database']}_verify_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        else:
+            url = make_url(target)
+        report['target'] = url.render_as_string(hide_password=True)
+        options_file = mysql_options_file(url)
+        try:
+            report['bytes'] = restore_mysql(directory, manifest, url, jobs)
+            report['restore_seconds'] = round(time.monotonic() - started, 3)
+            # Only the tables that were restored, so a missing one is reported instead of failing the count
+            rows = mysql_row_counts(options_file, url.database, mysql_tables(url, options_file))
+        finally:
+            if drop_after:
+                subprocess.run(['mysql', f'--defaults-extra-file={options_file}', '-e',
+                                f'DROP DATABASE IF EXISTS `{url.database}`'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            os.remove(options_file)
+
+    seconds = report['restore_seconds'] or 0.001
+    report['rows'] = sum(rows.values())
+    report['mb_per_second'] = round(report['bytes'] / seconds / 1024 / 1024, 2)
+    report['rows_per_second'] = round(report['rows'] / seconds)
+    # Counts of MySQL backups are taken next to the dump, so a live database may differ slightly
+    tolerance = 0.0 if manifest.get('rows_exact', False) else row_tolerance
+    report['row_tolerance'] = tolerance
+    report['row_mismatches'] = compare_rows(manifest.get('rows', {}), rows, tolerance)
+    report['ok'] = all(tolerated for *_, tolerated in report['row_mismatches'])
+    return save_report(directory, report)
+
+def save_report(directory, report):
+    with open(os.path.join(directory, 'verify.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def print_report(report):
+    if report['checksum_errors']:
+        print(f"❌ Checksum mismatch: {', '.join(report['checksum_errors'])}")
+        return
+    print(f"   Restored into {report['target']}")
+    print(f"   {report['bytes']:,} bytes, {report['rows']:,} rows in {report['restore_seconds']}s "
+          f"({report['mb_per_second']} MB/s, {report['rows_per_second']:,} rows/s)")
+    for table, expected, actual, tolerated in report['row_mismatches']:
+        print(f"   {'⚠️ ' if tolerated else '❌'} {table}: {expected} rows in the manifest, {actual} restored")
+    if report['ok']:
+        print(f"✅ Backup {report['backup']} verified")
+    else:
+        print(f"❌ Backup {report['backup']} failed verification")
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Gestor de Tarefas - Database Restore')
+    parser.add_argument('backup', nargs='?', help='Diretório do backup (padrão: o mais recente)')
+    parser.add_argument('--target', default=None,
+                        help='Arquivo SQLite ou URI MySQL de destino (padrão: banco temporário, removido ao final)')
+    parser.add_argument('--jobs', type=int, default=int(os.getenv('BACKUP_JOBS', 1)),
+                        help='Arquivos carregados em paralelo')
+    parser.add_argument('--output-dir', default='backups')
+    parser.add_argument('--keep', action='store_true', help='Manter o banco temporário restaurado')
+    parser.add_argument('--row-tolerance', type=float, default=float(os.getenv('RESTORE_ROW_TOLERANCE', 0.01)),
+                        help='Diferença aceita nas contagens aproximadas do MySQL (fração, padrão: 0.01)')
+    args = parser.parse_args()
+
+    print("Gestor de Tarefas - Database Restore")
+    print("=" * 40)
+
+    directory = args.backup or latest_backup(args.output_dir)
+    if not directory:
+        print("Error: No backup found")
+        raise SystemExit(1)
+
+    print(f"Verifying {directory}")
+    try:
+        report = restore_backup(directory, args.target, args.jobs, keep=args.keep, row_tolerance=args.row_tolerance)
+    except Exception as e:
+        print(f"❌ Restore failed with error: {e}")
+        raise SystemExit(1)
+    print_report(report)
+    raise SystemExit(0 if report['ok'] else 1)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Segurança de Senhas - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Cálculo de hashes de senha em um executor dedicado e limitado, e controle de
+tentativas (token bucket) por email e por IP
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+import threading
+import time
+
+class HashBusy(Exception):
+    """The password hash executor is saturated"""
+
+class PasswordHasher:
+    """Runs password hashing on a bounded thread pool.
+
+    Hashing is CPU bound (hashlib releases the GIL while it works), so a burst
+    of logins could otherwise take every core away from the rest of the app.
+    At most workers + queue_limit hashes are in flight; beyond that HashBusy
+    is raised instead of queueing without limit. HashBusy is also raised when
+    a queued hash isn't done within the timeout.
+    """
+
+    def __init__(self):
+        self.method = 'pbkdf2:sha256:600000'
+        self.timeout = 10
+        self._executor = None
+        self._slots = None
+        self._method_prefix = None
+
+    def init_app(self, app):
+        workers = app.config.get('PASSWORD_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2)
+        queue_limit = app.config.get('PASSWORD_HASH_QUEUE', 16)
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._method_prefix = None
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            # Not initialized (scripts, shell): hash inline
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # (not the builtin TimeoutError before Python 3.11)
+            # The hash keeps its slot until it finishes; only the caller stops waiting
+            raise HashBusy()
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with other parameters than the configured method"""
+        if self._method_prefix is None:
+            # werkzeug fills in the defaults (e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000')
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
+
+class TokenBucket:
+    """In-process token buckets, one per key (e.g. 'email:...' or 'ip:...')"""
+
+    def __init__(self, capacity, refill_rate, max_keys=10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate  # Tokens per second
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, tokens=1):
+        """Take tokens from the key's bucket, returning False if there aren't enough"""
+        now = time.monotonic()
+        with self._lock:
+            available, updated = self._buckets.get(key, (self.capacity, now))
+            available = min(self.capacity, available + (now - updated) * self.refill_rate)
+            allowed = available >= tokens
+            if allowed:
+                available -= tokens
+            self._buckets[key] = (available, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return allowed
+
+    def _prune(self, now):
+        # Buckets that would be full again carry no information
+        full_after = self.capacity / self.refill_rate if self.refill_rate else float('inf')
+        for key, (_, updated) in list(self._buckets.items()):
+            if now - updated >= full_after:
+                del self._buckets[key]
+
+class Throttle:
+    """Per-account and per-IP throttling for the login and password reset forms"""
+
+    def __init__(self):
+        self.by_email = TokenBucket(5, 5 / 300)
+        self.by_ip = TokenBucket(20, 20 / 60)
+
+    def init_app(self, app):
+        self.by_email = TokenBucket(app.config.get('THROTTLE_EMAIL_CAPACITY', 5),
+                                    app.config.get('THROTTLE_EMAIL_REFILL', 5 / 300))
+        self.by_ip = TokenBucket(app.config.get('THROTTLE_IP_CAPACITY', 20),
+                                 app.config.get('THROTTLE_IP_REFILL', 20 / 60))
+
+    def allow(self, email, ip):
+        """Consume one attempt for the email and the client IP"""
+        ip_allowed = self.by_ip.consume(f'ip:{ip}')
+        email_allowed = self.by_email.consume(f'email:{(email or "").strip().lower()}')
+        return ip_allowed and email_allowed
+
+password_hasher = PasswordHasher()
+throttle = Throttle()
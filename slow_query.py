@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Consultas Lentas - Gestor de Tarefas
+Desenvolvido por Lucas Brito Marinho
+Copyright (c) 2025
+
+Registro das consultas SQL acima de um limite de tempo: comando, parâmetros,
+duração e rota de origem, com o plano (EXPLAIN) de uma amostra, mantidos em
+um buffer circular e em um arquivo JSONL rotativo
+"""
+
+from collections import deque
+from datetime import datetime
+from flask import request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from logging.handlers import RotatingFileHandler
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+# Longest statement / parameter text kept per entry
+MAX_STATEMENT_LENGTH = 4000
+MAX_PARAMETER_LENGTH = 100
+
+# Expanded IN lists, so "IN (?, ?)" and "IN (?, ?, ?)" are the same query
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s)\s*,)+\s*(?:\?|%s|%\(\w+\)s)\s*\)')
+
+def fingerprint(statement):
+    """Statement text with whitespace and IN lists normalized, to group the same query"""
+    return _IN_LIST.sub('(...)', ' '.join(statement.split()))
+
+def _short(value):
+    text = repr(value)
+    return text if len(text) <= MAX_PARAMETER_LENGTH else text[:MAX_PARAMETER_LENGTH] + '...'
+
+def _masked(value):
+    """Type (and length) of a parameter without its value, e.g. <str len=12>"""
+    if value is None:
+        return 'None'
+    if isinstance(value, (str, bytes, bytearray)):
+        return f'<{type(value).__name__} len={len(value)}>'
+    return f'<{type(value).__name__}>'
+
+class SlowQueryLog:
+    """Records statements slower than SLOW_QUERY_THRESHOLD_MS in this process.
+
+    Off unless SLOW_QUERY_ENABLED is set. Timing runs in the cursor-execute
+    events; the EXPLAIN and the file writes run in a background thread on
+    its own connection, so the request that ran the query doesn't wait for them.
+    Parameters (reset tokens, emails, password hashes) are recorded as their
+    type and length only, unless SLOW_QUERY_LOG_PARAMETERS is set.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.log_parameters = False
+        self._queue = queue.Queue(maxsize=1000)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = False
+        self._explained = set()
+        self.entries = deque(maxlen=500)
+        self.recorded = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('SLOW_QUERY_ENABLED', False)
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+        self.explain_sample = app.config.get('SLOW_QUERY_EXPLAIN_SAMPLE', 0.1)
+        self.log_parameters = app.config.get('SLOW_QUERY_LOG_PARAMETERS', False)
+        self.entries = deque(maxlen=app.config.get('SLOW_QUERY_BUFFER_SIZE', 500))
+        app.extensions['slow_query_log'] = self
+        if not self.enabled:
+            return
+
+        path = app.config.get('SLOW_QUERY_LOG_PATH', 'logs/slow_queries.jsonl')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 1024 * 1024),
+                                      backupCount=5)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger = logging.getLogger('gestor_tarefas.slow_query')
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('slow_query_started'):
+            conn.info['slow_query_started'].pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['slow_query_started'].pop()
+        if duration < self.threshold or getattr(self._local, 'explaining', False):
+            return
+        entry = {
+            'at': datetime.utcnow().isoformat(timespec='seconds'),
+            'duration_ms': round(duration * 1000, 2),
+            'statement': statement[:MAX_STATEMENT_LENGTH],
+            'parameters': [] if executemany else self._parameters(parameters),
+            'route': request.endpoint if has_request_context() else threading.current_thread().name,
+            'fingerprint': fingerprint(statement),
+            'plan': None,
+            'explain_error': None,
+        }
+        # Only reads are explained, and only single statements
+        explain = (not executemany and statement.lstrip()[:6].upper() == 'SELECT'
+                   and (entry['fingerprint'] not in self._explained or random.random() < self.explain_sample))
+        self._ensure_started()
+        try:
+            # The EXPLAIN needs the whole statement, not the text truncated for the log
+            self._queue.put_nowait((entry, conn.engine, statement if explain else None,
+                                    parameters if explain else None))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _parameters(self, parameters):
+        show = _short if self.log_parameters else _masked
+        if isinstance(parameters, dict):
+            return {name: show(value) for name, value in parameters.items()}
+        return [show(value) for value in parameters or ()]
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            # Started by the first slow query of each worker (threads don't survive a fork)
+            threading.Thread(target=self._run, name='slow-query-log', daemon=True).start()
+            self._started = True
+
+    def _run(self):
+        self._local.explaining = True
+        while True:
+            entry, engine, statement, parameters = self._queue.get()
+            try:
+                if statement is not None:
+                    self._explained.add(entry['fingerprint'])
+                    try:
+                        entry['plan'] = self.explain(engine, statement, parameters)
+                    except Exception as e:
+                        # The slow query is still recorded, without its plan
+                        entry['explain_error'] = str(e)
+                with self._lock:
+                    self.entries.append(entry)
+                    self.recorded += 1
+                self.logger.info(json.dumps(entry, default=str, ensure_ascii=False))
+            except Exception as e:
+                self.app.logger.error(f"Slow query log error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def explain(self, engine, statement, parameters):
+        """Plan of a statement as a list of strings, on a separate connection"""
+        prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+        return [' | '.join(str(value) for value in row) for row in rows]
+
+    def top(self, limit=20):
+        """Queries of the buffer grouped by fingerprint, the largest total time first"""
+        with self._lock:
+            entries = list(self.entries)
+        groups = {}
+        for entry in entries:
+            group = groups.get(entry['fingerprint'])
+            if group is None:
+                group = groups[entry['fingerprint']] = {
+                    'fingerprint': entry['fingerprint'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'routes': set(), 'plan': None, 'last': None,
+                }
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+            group['routes'].add(entry['route'] or '-')
+            group['last'] = entry
+            group['plan'] = entry['plan'] or group['plan']
+        for group in groups.values():
+            group['avg_ms'] = round(group['total_ms'] / group['count'], 2)
+            group['total_ms'] = round(group['total_ms'], 2)
+            group['routes'] = sorted(group['routes'])
+        return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)[:limit]
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'threshold_ms': round(self.threshold * 1000, 2) if self.app else None,
+            'recorded': self.recorded,
+            'dropped': self.dropped,
+            'buffered': len(self.entries),
+            'queue_depth': self._queue.qsize(),
+        }
+
+slow_query_log = SlowQueryLog()
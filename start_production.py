@@ -2,28 +2,36 @@
 """
 Production startup script for Gestor de Tarefas
 Run this file to start the application in production mode
+
+    python start_production.py            # start gunicorn
+    python start_production.py reload     # rolling restart of the workers
+    python start_production.py upgrade    # zero-downtime restart with new code
+    python start_production.py stop       # graceful shutdown
 """
 
 import os
 import sys
+import time
+import signal
+import multiprocessing
 from dotenv import load_dotenv
 
 def check_environment():
     """Check if all required environment variables are set"""
     load_dotenv()
-    
+
     required_vars = [
         'SECRET_KEY',
         'SQLALCHEMY_DATABASE_URI',
         'MAIL_USERNAME',
         'MAIL_PASSWORD'
     ]
-    
+
     missing_vars = []
     for var in required_vars:
         if not os.getenv(var):
             missing_vars.append(var)
-    
+
     if missing_vars:
         print("❌ Missing required environment variables:")
         for var in missing_vars:
@@ -31,47 +39,177 @@ def check_environment():
         print("\nPlease update your .env file with the required variables.")
         print("See .env.example for reference.")
         return False
-    
+
     return True
 
+def worker_count():
+    """Workers from GUNICORN_WORKERS, or sized from the CPU count.
+
+    Socket.IO clients of one worker only see the emits of another worker
+    through SOCKETIO_MESSAGE_QUEUE, so without it a single worker is used.
+    """
+    configured = int(os.getenv('GUNICORN_WORKERS', 0))
+    if not os.getenv('SOCKETIO_MESSAGE_QUEUE'):
+        if configured > 1:
+            print("⚠️  GUNICORN_WORKERS ignored: several workers need SOCKETIO_MESSAGE_QUEUE")
+        return 1
+    if configured > 0:
+        return configured
+    return min(multiprocessing.cpu_count() * 2 + 1, int(os.getenv('GUNICORN_MAX_WORKERS', 8)))
+
+def worker_environment(workers):
+    """Settings several workers need, set before the app is loaded"""
+    if workers <= 1:
+        return
+    if not os.getenv('DASHBOARD_CACHE_BACKEND'):
+        # The in-memory cache is per process; workers on a host share the SQLite one
+        os.environ['DASHBOARD_CACHE_BACKEND'] = 'sqlite'
+    elif os.getenv('DASHBOARD_CACHE_BACKEND') == 'memory':
+        print("⚠️  DASHBOARD_CACHE_BACKEND=memory with several workers: each worker fills its own cache")
+    if os.getenv('SOCKETIO_WEBSOCKET_ONLY', 'False').lower() != 'true':
+        # The long-polling requests of one client must all reach the worker that holds
+        # its session, which needs sticky sessions; WebSockets stay on one connection
+        print("⚠️  Several workers: Socket.IO restricted to WebSockets (SOCKETIO_WEBSOCKET_ONLY)")
+        os.environ['SOCKETIO_WEBSOCKET_ONLY'] = 'True'
+
+def thread_count():
+    """Threads per worker: GUNICORN_THREADS, at most the connections of the database pool.
+
+    Every request thread may hold a pooled connection; more threads than
+    DB_POOL_SIZE + DB_MAX_OVERFLOW just wait on the pool until DB_POOL_TIMEOUT.
+    """
+    pool = int(os.getenv('DB_POOL_SIZE', 10)) + int(os.getenv('DB_MAX_OVERFLOW', 20))
+    configured = int(os.getenv('GUNICORN_THREADS') or 0)
+    if configured > pool:
+        print(f"⚠️  GUNICORN_THREADS capped at {pool} (DB_POOL_SIZE + DB_MAX_OVERFLOW)")
+    return min(configured, pool) if configured > 0 else pool
+
+def post_fork(server, worker):
+    """Give each worker its own database and cache connections (the app is loaded before the fork)"""
+    from app import app
+    from models import db
+    from cache import dashboard_cache
+    with app.app_context():
+        # close=False leaves the parent's sockets alone, the pool just forgets them
+        db.engine.dispose(close=False)
+    dashboard_cache.after_fork()
+
+def gunicorn_options(host, port, workers):
+    """Gunicorn settings, overridable through GUNICORN_* environment variables"""
+    return {
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        # gthread works with Flask-SocketIO's threading mode (WebSockets through simple-websocket);
+        # each open WebSocket holds one thread, so threads bounds the connections per worker
+        'worker_class': os.getenv('GUNICORN_WORKER_CLASS', 'gthread'),
+        'threads': thread_count(),
+        # Import the app once in the master, workers share the loaded code
+        'preload_app': True,
+        'post_fork': post_fork,
+        'timeout': int(os.getenv('GUNICORN_TIMEOUT', 60)),
+        'graceful_timeout': int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30)),
+        'keepalive': int(os.getenv('GUNICORN_KEEPALIVE', 5)),
+        # Workers are recycled one at a time after this many requests (0 = never)
+        'max_requests': int(os.getenv('GUNICORN_MAX_REQUESTS', 0)),
+        'max_requests_jitter': int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0)),
+        'pidfile': os.getenv('GUNICORN_PIDFILE', 'gunicorn.pid'),
+        'accesslog': os.getenv('GUNICORN_ACCESS_LOG') or None,
+        'errorlog': '-',
+    }
+
+def read_pid(pidfile):
+    try:
+        with open(pidfile) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def signal_master(action):
+    """Send a control signal to the running gunicorn master"""
+    load_dotenv()
+    pidfile = os.getenv('GUNICORN_PIDFILE', 'gunicorn.pid')
+    pid = read_pid(pidfile)
+    if pid is None:
+        print(f"❌ No running server found ({pidfile})")
+        sys.exit(1)
+
+    if action == 'reload':
+        # New workers are started before the old ones are stopped gracefully.
+        # The master keeps the preloaded code; use upgrade to load new code.
+        os.kill(pid, signal.SIGHUP)
+        print(f"🔄 Workers of {pid} are being restarted")
+    elif action == 'stop':
+        os.kill(pid, signal.SIGTERM)
+        print(f"🛑 Server {pid} is shutting down gracefully")
+    elif action == 'upgrade':
+        # A new master (with the new code) starts next to the old one, which then
+        # finishes its requests and exits
+        os.kill(pid, signal.SIGUSR2)
+        # The new master writes its pid to <pidfile>.2 until the old one exits
+        deadline = time.monotonic() + 60
+        while read_pid(f'{pidfile}.2') is None:
+            if time.monotonic() > deadline:
+                print("❌ The new server did not start, the old one is still running")
+                sys.exit(1)
+            time.sleep(0.5)
+        new_pid = read_pid(f'{pidfile}.2')
+        os.kill(pid, signal.SIGTERM)
+        print(f"✅ Server upgraded: {pid} -> {new_pid}")
+
 def start_production():
     """Start the production server"""
     print("🚀 Starting Gestor de Tarefas - Production Mode")
     print("=" * 50)
-    
+
     # Check environment variables
     if not check_environment():
         sys.exit(1)
-    
+
     # Get server configuration
     host = os.getenv('HOST', '0.0.0.0')
     port = int(os.getenv('PORT', 5000))
-    
+    workers = worker_count()
+    worker_environment(workers)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ gunicorn is not installed (pip install -r requirements.txt)")
+        sys.exit(1)
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    options = gunicorn_options(host, port, workers)
     print(f"📡 Server will start on: http://{host}:{port}")
+    print(f"⚙️  {workers} {options['worker_class']} worker(s), {options['threads']} thread(s) each")
     print("🔒 Running in production mode (DEBUG=False)")
     print("📁 Logs will be saved to: logs/gestor_tarefas.log")
     print("\n⚠️  Security Notes:")
     print("   - Make sure your firewall is properly configured")
     print("   - Ensure strong passwords are used")
     print("   - Regular backups are recommended")
-    print("\n🛑 Press Ctrl+C to stop the server")
+    print("\n🔄 python start_production.py reload | upgrade | stop")
+    print("🛑 Press Ctrl+C to stop the server")
     print("=" * 50)
-    
-    try:
-        from app import app
-        app.run(
-            host=host,
-            port=port,
-            debug=False,
-            threaded=True,
-            use_reloader=False
-        )
-    except KeyboardInterrupt:
-        print("\n\n🛑 Server stopped by user")
-        sys.exit(0)
-    except Exception as e:
-        print(f"\n❌ Failed to start server: {e}")
-        sys.exit(1)
+
+    ProductionServer(options).run()
 
 if __name__ == '__main__':
-    start_production()
+    if len(sys.argv) > 1:
+        if sys.argv[1] not in ('reload', 'upgrade', 'stop'):
+            print("Usage: python start_production.py [reload | upgrade | stop]")
+            sys.exit(1)
+        signal_master(sys.argv[1])
+    else:
+        start_production()
@@ -0,0 +1,132 @@
+"""
+Minimal stand-in for a Redis server, with just the pub/sub commands the
+Socket.IO message queue uses (HELLO, SUBSCRIBE, UNSUBSCRIBE, PUBLISH, PING), so the
+multi-process tests don't need a real broker
+"""
+
+import socket
+import socketserver
+import threading
+
+def _bulk(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+def _array(*items, kind=b'*'):
+    parts = [kind + b'%d\r\n' % len(items)]
+    for item in items:
+        parts.append(b':%d\r\n' % item if isinstance(item, int) else _bulk(item))
+    return b''.join(parts)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker = self.server.broker
+        channels = set()
+        lock = threading.Lock()
+        # RESP3 clients (HELLO 3) get pub/sub messages as push replies
+        push = [b'*']
+
+        def send(data):
+            with lock:
+                self.wfile.write(data)
+                self.wfile.flush()
+
+        def deliver(channel, message):
+            send(_array(b'message', channel, message, kind=push[0]))
+
+        try:
+            while True:
+                command = self._read_command()
+                if command is None:
+                    break
+                name = command[0].upper()
+                if name == b'HELLO':
+                    if command[1:2] == [b'3']:
+                        push[0] = b'>'
+                        send(b'%1\r\n' + _bulk(b'proto') + b':3\r\n')
+                    else:
+                        send(_array(b'proto', 2))
+                elif name == b'SUBSCRIBE':
+                    for channel in command[1:]:
+                        channels.add(channel)
+                        broker.subscribe(channel, deliver)
+                        send(_array(b'subscribe', channel, len(channels), kind=push[0]))
+                elif name == b'UNSUBSCRIBE':
+                    for channel in command[1:] or list(channels):
+                        channels.discard(channel)
+                        broker.unsubscribe(channel, deliver)
+                        send(_array(b'unsubscribe', channel, len(channels), kind=push[0]))
+                elif name == b'PUBLISH':
+                    send(b':%d\r\n' % broker.publish(command[1], command[2]))
+                elif name == b'PING':
+                    send(_array(b'pong', b'') if channels else b'+PONG\r\n')
+                else:
+                    # CLIENT SETINFO, SELECT, ... are accepted and ignored
+                    send(b'+OK\r\n')
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            for channel in channels:
+                broker.unsubscribe(channel, deliver)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()
+        items = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            items.append(self.rfile.read(length + 2)[:-2])
+        return items
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class RedisStandIn:
+    """Pub/sub broker on 127.0.0.1, in a background thread"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.broker = self
+        self.port = self._server.server_address[1]
+        self.url = f'redis://127.0.0.1:{self.port}/0'
+        self.published = 0
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def subscribe(self, channel, deliver):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(deliver)
+
+    def unsubscribe(self, channel, deliver):
+        with self._lock:
+            if deliver in self._subscribers.get(channel, []):
+                self._subscribers[channel].remove(deliver)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+            self.published += 1
+        for deliver in subscribers:
+            try:
+                deliver(channel, message)
+            except OSError:
+                pass
+        return len(subscribers)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
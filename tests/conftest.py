@@ -0,0 +1,101 @@
+"""
+Test setup: the app is imported once, on a scratch SQLite database, with the
+environment below; every test starts from empty tables with two setores and
+two users (sec@x.com, tipo 1, and t2@x.com, tipo 2 of setor TI)
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix='gestor_tests_')
+
+# app.py reads its configuration at import time
+os.environ.update({
+    'SQLALCHEMY_DATABASE_URI': f'sqlite:///{TMP}/test.db',
+    'SECRET_KEY': 'test',
+    'MAIL_USERNAME': 'gestor@example.com',
+    'MAIL_PASSWORD': 'test',
+    'MAIL_SERVER': '127.0.0.1',
+    'MAIL_USE_TLS': 'False',
+    'DASHBOARD_CACHE_BACKEND': 'memory',
+    'DASHBOARD_CACHE_PATH': f'{TMP}/cache.db',
+    # The app and the CLI subprocesses run in the repository; their logs stay out of it
+    'LOG_DIR': f'{TMP}/logs',
+    'SLOW_QUERY_LOG_PATH': f'{TMP}/logs/slow_queries.jsonl',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'DEADLINE_SCAN_INTERVAL': '0',
+    'ARCHIVE_INTERVAL': '0',
+    'NOTIFY_COALESCE_WINDOW': '0.05',
+})
+for name in ('SOCKETIO_MESSAGE_QUEUE', 'METRICS_ENABLED', 'SLOW_QUERY_ENABLED', 'GUNICORN_WORKERS'):
+    os.environ.pop(name, None)
+
+PASSWORD = 'Senha123'
+
+@pytest.fixture(scope='session')
+def app():
+    from flask import g
+    from app import app
+    app.config['TESTING'] = True
+
+    # Requests made while a test holds an app context share its g, so the
+    # identity cached by current_identity() would leak from one client to the next
+    @app.before_request
+    def _forget_identity():
+        g.pop('identity', None)
+    return app
+
+@pytest.fixture(autouse=True)
+def database(app):
+    """Empty tables, the TI / RH setores and the two users"""
+    from sqlalchemy import text
+    from models import db, Setor, create_user
+    from cache import dashboard_cache, setor_cache
+    from security import throttle
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        with db.engine.begin() as conn:
+            # Not in the metadata: the full-text table created with atividade
+            conn.execute(text('DROP TABLE IF EXISTS atividade_fts'))
+        db.create_all()
+        dashboard_cache.clear()
+        setor_cache.invalidate()
+        throttle.by_email._buckets.clear()
+        throttle.by_ip._buckets.clear()
+
+        db.session.add_all([Setor(id=1, nome='TI'), Setor(id=2, nome='RH')])
+        db.session.commit()
+        create_user('sec', 'sec@x.com', PASSWORD, 2, 1)
+        create_user('t2', 't2@x.com', PASSWORD, 1, 2)
+        yield db
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login(client, email='sec@x.com', password=PASSWORD):
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302, response.get_data(as_text=True)
+    return client
+
+def subprocess_env(**extra):
+    """Environment for a child process running the app on the test database"""
+    env = dict(os.environ, PYTHONPATH=ROOT, **extra)
+    return env
+
+def run_cli(*args, **extra_env):
+    """Run a flask CLI command in its own process, as cron or an operator would"""
+    import subprocess
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *args], cwd=ROOT,
+                            env=subprocess_env(**extra_env), capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
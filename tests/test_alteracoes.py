@@ -0,0 +1,129 @@
+"""
+Delta sync (get_alteracoes and /api/atividades/alteracoes): a client that
+pages through the changes with a small limit ends up with the server's rows,
+seeing every update and every tombstone once, also when a bulk change is
+larger than the limit
+"""
+
+from conftest import login
+
+class Replica:
+    """Client side of the sync: rows by id and every (id, versao) received"""
+
+    def __init__(self, setor_id=None):
+        self.setor_id = setor_id
+        self.versao = 0
+        self.rows = {}
+        self.updates = []
+        self.tombstones = []
+        self.pages = 0
+
+    def sync(self, limite):
+        from models import get_alteracoes
+        while True:
+            rows, removidas, versao, mais = get_alteracoes(self.versao, self.setor_id, limite)
+            assert versao >= self.versao
+            self.pages += 1
+            for row in rows:
+                self.updates.append((row.id, row.versao))
+                self.rows[row.id] = row.versao
+            for atividade_id in removidas:
+                self.tombstones.append(atividade_id)
+                self.rows.pop(atividade_id, None)
+            self.versao = versao
+            if not mais:
+                return
+
+def _server(setor_id=None):
+    from models import Atividade
+    query = Atividade.query
+    if setor_id is not None:
+        query = query.filter(Atividade.setor_id == setor_id)
+    return {atividade.id: atividade.versao for atividade in query}
+
+def _nova(descricao, setor_id=1, status='Pendente'):
+    from models import create_atividade
+    return create_atividade(descricao, status, 'Média', 1, local='Sala', setor_id=setor_id).id
+
+def _assert_once(replica):
+    assert len(replica.updates) == len(set(replica.updates))
+    assert len(replica.tombstones) == len(set(replica.tombstones))
+    assert replica.rows == _server(replica.setor_id)
+
+def test_paging_delivers_every_update_and_tombstone_once(app):
+    from models import db, Atividade, bulk_update_status, bulk_delete_atividades
+    from arquivamento import archive_finished
+    replicas = [Replica(), Replica(1), Replica(2)]
+
+    ti = [_nova(f'ti {i}') for i in range(10)]
+    rh = [_nova(f'rh {i}', setor_id=2) for i in range(3)]
+    for replica in replicas:
+        replica.sync(limite=3)
+        _assert_once(replica)
+
+    # One bulk change of 7 rows, larger than the limit, between single changes
+    _nova('antes')
+    bulk_update_status(ti[:7], 'Em andamento')
+    _nova('depois', setor_id=2)
+    # ORM delete, bulk delete, a move to another setor and the archive
+    db.session.delete(db.session.get(Atividade, ti[7]))
+    db.session.commit()
+    bulk_delete_atividades([ti[8], rh[0]])
+    movida = db.session.get(Atividade, ti[9])
+    movida.setor_id = 2
+    db.session.commit()
+    bulk_update_status(ti[:3], 'Concluída')
+    assert archive_finished(0) == 3
+
+    for replica in replicas:
+        replica.sync(limite=3)
+        _assert_once(replica)
+
+    geral, setor_ti, setor_rh = replicas
+    assert sorted(geral.tombstones) == sorted([ti[7], ti[8], rh[0], *ti[:3]])
+    # The move is a removal for the old setor only
+    assert sorted(setor_ti.tombstones) == sorted([ti[7], ti[8], ti[9], *ti[:3]])
+    assert setor_rh.tombstones == [rh[0]]
+    assert setor_rh.rows[ti[9]] == db.session.get(Atividade, ti[9]).versao
+
+def test_a_bulk_change_larger_than_the_limit_comes_whole(app):
+    from models import bulk_update_status, get_alteracoes, get_escopo_versao
+    ids = [_nova(f'tarefa {i}') for i in range(6)]
+    desde = get_escopo_versao()
+    bulk_update_status(ids, 'Em andamento')
+    _nova('depois')
+
+    rows, removidas, versao, mais = get_alteracoes(desde, limite=2)
+    assert sorted(row.id for row in rows) == ids
+    assert {row.versao for row in rows} == {versao}
+    assert mais
+    rows, removidas, versao, mais = get_alteracoes(versao, limite=2)
+    assert [row.descricao for row in rows] == ['depois']
+    assert not mais
+
+def test_limit_stops_before_a_version_group(app):
+    from models import bulk_delete_atividades, get_alteracoes
+    ids = [_nova(f'tarefa {i}') for i in range(5)]
+    bulk_delete_atividades(ids[3:])
+
+    # Three single inserts, then one version with the two left and two tombstones: 4 > limite
+    rows, removidas, versao, mais = get_alteracoes(0, limite=4)
+    assert [row.id for row in rows] == ids[:3]
+    assert removidas == []
+    assert mais
+    rows, removidas, versao, mais = get_alteracoes(versao, limite=4)
+    assert rows == [] and sorted(removidas) == ids[3:]
+    assert not mais
+
+def test_api_pages_with_the_returned_version(client):
+    ids = [_nova(f'tarefa {i}') for i in range(5)]
+    login(client)
+    seen, desde = [], 0
+    while True:
+        body = client.get(f'/api/atividades/alteracoes?desde={desde}&limite=2').get_json()
+        seen += [row[body['columns'].index('id')] for row in body['rows']]
+        desde = body['versao']
+        if not body['mais']:
+            break
+    assert seen == ids
+    assert client.get(f'/api/atividades/alteracoes?desde={desde}').get_json()['rows'] == []
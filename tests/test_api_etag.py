@@ -0,0 +1,74 @@
+"""
+/api/atividades conditional requests: a matching If-None-Match gets a 304,
+and the ETag moves as soon as a write changes what the user can see, whatever
+process or setor it comes from
+"""
+
+from conftest import login, run_cli
+
+def _nova(descricao, setor_id):
+    from models import create_atividade
+    return create_atividade(descricao, 'Pendente', 'Média', 1, local='Sala', setor_id=setor_id).id
+
+def _get(client, etag=None, **params):
+    headers = {'If-None-Match': etag} if etag else {}
+    return client.get('/api/atividades', query_string=params, headers=headers)
+
+def test_if_none_match_gets_304(client):
+    _nova('ti', 1)
+    login(client)
+    response = _get(client)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    cached = _get(client, etag)
+    assert cached.status_code == 304
+    assert cached.get_data() == b''
+    assert cached.headers['ETag'] == etag
+    # Another page is another representation
+    assert _get(client, etag, page=2).status_code == 200
+
+def test_write_in_another_setor_changes_the_admin_etag(client):
+    from models import db, Atividade
+    _nova('ti', 1)
+    login(client)
+    etag = _get(client).headers['ETag']
+
+    atividade_id = _nova('rh', 2)
+    response = _get(client, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [row[1] for row in response.get_json()['rows']] == ['ti', 'rh']
+
+    etag = response.headers['ETag']
+    db.session.get(Atividade, atividade_id).status = 'Em andamento'
+    db.session.commit()
+    assert _get(client, etag).status_code == 200
+
+def test_setor_user_etag_follows_its_setor(client):
+    from models import db, Atividade
+    _nova('ti', 1)
+    outra = _nova('rh', 2)
+    login(client, email='t2@x.com')
+    etag = _get(client).headers['ETag']
+
+    # Writes in other setores don't touch what a TI user sees
+    _nova('rh 2', 2)
+    assert _get(client, etag).status_code == 304
+
+    # A row moved into the setor does
+    db.session.get(Atividade, outra).setor_id = 1
+    db.session.commit()
+    response = _get(client, etag)
+    assert response.status_code == 200
+    assert [row[1] for row in response.get_json()['rows']] == ['ti', 'rh']
+
+def test_write_from_the_cli_changes_the_etag(client, tmp_path):
+    login(client)
+    etag = _get(client).headers['ETag']
+    path = tmp_path / 'lote.csv'
+    path.write_text('descricao,prioridade,local,setor\nimportada,Alta,Sala,RH\n', encoding='utf-8')
+    run_cli('import-atividades', str(path), '--email', 'sec@x.com')
+    response = _get(client, etag)
+    assert response.status_code == 200
+    assert [row[1] for row in response.get_json()['rows']] == ['importada']
@@ -0,0 +1,58 @@
+"""
+archive-atividades run from cron: the atividades it moves disappear from
+the dashboard and the statistics of an already running app at once
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from conftest import login, run_cli
+
+def _atividades(db, finished, active):
+    from models import Atividade, create_atividade
+    for i in range(finished):
+        create_atividade(f'antiga {i}', 'Concluída', 'Baixa', 1, local='Sala', setor_id=1)
+    for i in range(active):
+        create_atividade(f'aberta {i}', 'Pendente', 'Alta', 1, local='Sala', setor_id=1)
+    # Core UPDATE: no ORM event stamps a new atualizado_em
+    db.session.execute(update(Atividade).where(Atividade.status == 'Concluída')
+                       .values(atualizado_em=datetime.utcnow() - timedelta(days=120)))
+    db.session.commit()
+
+def test_cli_archive_is_seen_by_running_app(client, database):
+    _atividades(database, finished=15, active=5)
+    login(client)
+    stats = client.get('/api/estatisticas').get_json()
+    assert stats['total'] == 20
+    assert client.get('/api/atividades').get_json()['total'] == 20
+
+    output = run_cli('archive-atividades', '--days', '90', '--batch-size', '4',
+                     ARCHIVE_BATCH_PAUSE='0')
+    assert 'Archived 15 atividade(s)' in output
+
+    assert client.get('/api/estatisticas').get_json()['total'] == 5
+    assert client.get('/api/atividades').get_json()['total'] == 5
+    assert 'antiga 0' not in client.get('/').get_data(as_text=True)
+
+def test_recent_finished_atividades_stay(client, database):
+    from models import create_atividade
+    create_atividade('recente', 'Concluída', 'Baixa', 1, local='Sala', setor_id=1)
+    output = run_cli('archive-atividades', '--days', '90')
+    assert 'Archived 0 atividade(s)' in output
+
+def test_archive_view_lists_only_the_archive(client, database):
+    from arquivamento import archive_finished
+    _atividades(database, finished=2, active=1)
+    archive_finished(90)
+    login(client)
+
+    dashboard = client.get('/').get_data(as_text=True)
+    assert 'aberta 0' in dashboard and 'antiga 0' not in dashboard
+    assert 'Ver arquivo' in dashboard
+
+    arquivo = client.get('/?arquivo=1').get_data(as_text=True)
+    assert 'antiga 0' in arquivo and 'antiga 1' in arquivo
+    assert 'aberta 0' not in arquivo
+    assert 'apenas as atividades concluídas ou canceladas há mais de' in arquivo
+    assert 'Voltar ao painel' in arquivo
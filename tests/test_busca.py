@@ -0,0 +1,51 @@
+"""
+Full-text search (FTS5 on the test database): relevance order, the setor
+visibility rule and the plan of the setor-filtered search
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from conftest import login
+
+def _atividades():
+    from models import create_atividade
+    create_atividade('impressora sem toner', 'Pendente', 'Alta', 1, local='Sala 1', setor_id=1)
+    create_atividade('impressora impressora travada', 'Pendente', 'Alta', 1, local='Sala 2', setor_id=1)
+    create_atividade('trocar impressora', 'Pendente', 'Alta', 1, local='Sala 3', setor_id=2)
+    create_atividade('rede lenta', 'Pendente', 'Alta', 1, local='Sala 4', setor_id=1)
+
+def test_search_ranks_and_respects_setor(client, app):
+    _atividades()
+    login(client)
+    body = client.get('/api/atividades/busca?q=impressora').get_json()
+    assert body['total'] == 3
+    assert body['rows'][0][1] == 'impressora impressora travada'
+
+    body = login(app.test_client(), 't2@x.com').get('/api/atividades/busca?q=impressora').get_json()
+    assert body['total'] == 2
+    assert all(row[7] == 'TI' for row in body['rows'])
+
+def test_setor_search_runs_the_match_once(app):
+    from busca import search_atividades
+    _atividades()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'MATCH' in statement and not statement.startswith('EXPLAIN'):
+            statements.append((statement, parameters))
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        assert search_atividades(['impressora'], setor_id=1).total == 2
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+
+    # The page and the total; only the page computes the bm25 rank
+    assert len(statements) == 2
+    assert sum('rank' in statement for statement, _ in statements) == 1
+    for statement, parameters in statements:
+        with app.extensions['sqlalchemy'].engine.connect() as conn:
+            details = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        # The matches are read once into the CTE, not probed per atividade of the setor
+        assert any('MATERIALIZE' in detail for detail in details), details
+        assert not any('INDEX 0:=' in detail for detail in details), details
@@ -0,0 +1,122 @@
+"""
+Dashboard cache: every write moves the global and setor versions so the next
+read misses, setor renames and deletes reach the cached pages, and the SQLite
+backend is shared by separate processes
+"""
+
+import subprocess
+import sys
+
+from conftest import ROOT, TMP, subprocess_env
+
+def _nova(descricao, setor_id=1):
+    from models import create_atividade
+    return create_atividade(descricao, 'Pendente', 'Média', 1, local='Sala', setor_id=setor_id).id
+
+def _descricoes(pagination):
+    return [row.descricao for row in pagination.items]
+
+def test_write_bumps_versions_and_next_read_misses(app):
+    from models import db, Atividade, get_escopo_versao, get_all_atividades, get_atividades_by_setor
+    from cache import dashboard_cache
+    atividade_id = _nova('primeira')
+    _nova('rh', setor_id=2)
+    assert _descricoes(get_all_atividades()) == ['primeira', 'rh']
+    assert _descricoes(get_atividades_by_setor(1)) == ['primeira']
+    assert _descricoes(get_atividades_by_setor(2)) == ['rh']
+    versoes = {setor_id: get_escopo_versao(setor_id) for setor_id in (None, 1, 2)}
+
+    misses = dashboard_cache.misses
+    get_all_atividades()
+    get_atividades_by_setor(1)
+    get_atividades_by_setor(2)
+    assert dashboard_cache.misses == misses
+
+    atividade = db.session.get(Atividade, atividade_id)
+    atividade.descricao = 'editada'
+    db.session.commit()
+    assert get_escopo_versao() > versoes[None]
+    assert get_escopo_versao(1) > versoes[1]
+    assert get_escopo_versao(2) == versoes[2]
+
+    hits, misses = dashboard_cache.hits, dashboard_cache.misses
+    assert _descricoes(get_all_atividades()) == ['editada', 'rh']
+    assert _descricoes(get_atividades_by_setor(1)) == ['editada']
+    assert dashboard_cache.misses == misses + 2
+    # The other setor didn't change: still served from the cache
+    assert _descricoes(get_atividades_by_setor(2)) == ['rh']
+    assert dashboard_cache.hits == hits + 1
+
+def test_bulk_change_bumps_every_setor_it_touches(app):
+    from models import bulk_update_status, get_escopo_versao, get_all_atividades
+    ids = [_nova('ti'), _nova('rh', setor_id=2)]
+    get_all_atividades()
+    versoes = [get_escopo_versao(), get_escopo_versao(1), get_escopo_versao(2)]
+    bulk_update_status(ids, 'Em andamento')
+    assert [get_escopo_versao(), get_escopo_versao(1), get_escopo_versao(2)] == [versoes[0] + 1] * 3
+    assert {row.status for row in get_all_atividades().items} == {'Em andamento'}
+
+def test_setor_rename_and_delete_reach_cached_pages(app):
+    from models import db, Setor, get_all_atividades, get_atividades_by_setor, get_setor_nome
+    db.session.add(Setor(id=3, nome='Manutenção'))
+    db.session.commit()
+    _nova('ti')
+    _nova('manutencao', setor_id=3)
+    assert [row.setor for row in get_all_atividades().items] == ['TI', 'Manutenção']
+    assert [row.setor for row in get_atividades_by_setor(1).items] == ['TI']
+
+    db.session.get(Setor, 1).nome = 'Informática'
+    db.session.commit()
+    assert get_setor_nome(1) == 'Informática'
+    assert [row.setor for row in get_all_atividades().items] == ['Informática', 'Manutenção']
+    assert [row.setor for row in get_atividades_by_setor(1).items] == ['Informática']
+
+    db.session.delete(db.session.get(Setor, 3))
+    db.session.commit()
+    assert get_setor_nome(3) is None
+    assert [row.setor for row in get_all_atividades().items] == ['Informática', None]
+
+CHILD = """
+import sys
+from cache import SQLiteBackend
+backend = SQLiteBackend(sys.argv[1], 10)
+assert backend.get('pai') == {'linhas': [1, 2, 3]}, backend.get('pai')
+backend.set('filho', ('ok', 42))
+"""
+
+def test_sqlite_backend_is_shared_between_processes(tmp_path):
+    from cache import SQLiteBackend
+    path = str(tmp_path / 'cache' / 'dashboard.db')
+    backend = SQLiteBackend(path, 10)
+    backend.set('pai', {'linhas': [1, 2, 3]})
+    subprocess.run([sys.executable, '-c', CHILD, path], cwd=ROOT, env=subprocess_env(), check=True, timeout=60)
+    assert backend.get('filho') == ('ok', 42)
+    assert backend.size() == 2
+
+WORKER = """
+from app import app
+from cache import dashboard_cache
+from models import get_all_atividades
+with app.app_context():
+    print([row.descricao for row in get_all_atividades().items], dashboard_cache.hits, dashboard_cache.misses)
+"""
+
+def test_pages_cached_by_one_worker_are_hits_in_another(app, monkeypatch):
+    from models import get_all_atividades
+    from cache import dashboard_cache, SQLiteBackend
+    path = f'{TMP}/shared_cache.db'
+    monkeypatch.setattr(dashboard_cache, 'backend', SQLiteBackend(path, 100))
+    dashboard_cache.clear()
+    _nova('primeira')
+
+    def worker():
+        env = subprocess_env(DASHBOARD_CACHE_BACKEND='sqlite', DASHBOARD_CACHE_PATH=path)
+        result = subprocess.run([sys.executable, '-c', WORKER], cwd=ROOT, env=env, capture_output=True, text=True,
+                                check=True, timeout=120)
+        return result.stdout.strip().splitlines()[-1]
+
+    assert _descricoes(get_all_atividades()) == ['primeira']
+    assert worker() == "['primeira'] 1 0"
+    # A write in this process moves the other one to a new key
+    _nova('segunda')
+    assert worker() == "['primeira', 'segunda'] 0 1"
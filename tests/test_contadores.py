@@ -0,0 +1,90 @@
+"""
+Maintained counters (atividade_contador, atividade_prazo): after every path
+that writes atividades the counters match a full recount, so
+reconcile_counters() has no drift to repair
+"""
+
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+PRAZO = datetime(2025, 6, 2, 15, 0)
+
+def _nova(descricao, setor_id=1, status='Pendente', prioridade='Média', prazo=PRAZO):
+    from models import create_atividade
+    return create_atividade(descricao, status, prioridade, 1, prazo=prazo, local='Sala', setor_id=setor_id).id
+
+@pytest.fixture
+def ids(app):
+    """A mix of setores, statuses and prazos (with and without)"""
+    from models import reconcile_counters
+    created = [
+        _nova('a'),
+        _nova('b', status='Em andamento', prioridade='Alta'),
+        _nova('c', setor_id=2, prazo=PRAZO + timedelta(days=1)),
+        _nova('d', setor_id=None, prazo=None),
+        _nova('e', status='Concluída', prioridade='Baixa'),
+    ]
+    assert reconcile_counters() == []
+    return created
+
+def _orm_update(ids):
+    from models import db, Atividade
+    atividade = db.session.get(Atividade, ids[0])
+    atividade.status = 'Concluída'
+    atividade.prioridade = 'Alta'
+    outra = db.session.get(Atividade, ids[1])
+    outra.setor_id = 2
+    outra.prazo = PRAZO + timedelta(days=3)
+    sem_prazo = db.session.get(Atividade, ids[3])
+    sem_prazo.prazo = PRAZO
+    reaberta = db.session.get(Atividade, ids[4])
+    reaberta.status = 'Pendente'
+    db.session.commit()
+
+def _orm_delete(ids):
+    from models import db, Atividade
+    db.session.delete(db.session.get(Atividade, ids[2]))
+    db.session.commit()
+
+def _bulk_status(ids):
+    from models import bulk_update_status
+    bulk_update_status(ids, 'Cancelada')
+    bulk_update_status(ids[:2], 'Em andamento', atendente='Ana')
+
+def _bulk_delete(ids):
+    from models import bulk_delete_atividades
+    bulk_delete_atividades(ids[1:4])
+
+def _import(ids):
+    from importacao import import_atividades
+    content = ('descricao,prioridade,status,local,setor,prazo\n'
+               'i1,Alta,Pendente,Sala,TI,2025-06-02 10:00\n'
+               'i2,Baixa,Concluída,Sala,RH,2025-06-03 10:00\n'
+               'i3,Média,Em andamento,Sala,,\n'
+               ',Média,Pendente,Sala,TI,\n')
+    result = import_atividades(io.BytesIO(content.encode('utf-8')), 'csv', 1, batch_size=2)
+    assert result.importadas == 3
+
+def _archive(ids):
+    from models import bulk_update_status
+    from arquivamento import archive_finished
+    bulk_update_status(ids[:3], 'Concluída')
+    assert archive_finished(0, batch_size=2) == 4
+
+@pytest.mark.parametrize('mutation', [_orm_update, _orm_delete, _bulk_status, _bulk_delete, _import, _archive])
+def test_mutation_leaves_no_drift(ids, mutation):
+    from models import reconcile_counters, count_atividades, Atividade
+    mutation(ids)
+    assert reconcile_counters() == []
+    assert count_atividades() == Atividade.query.count()
+    assert count_atividades(2) == Atividade.query.filter_by(setor_id=2).count()
+
+def test_reconcile_repairs_drift(ids):
+    from models import db, AtividadeContador, reconcile_counters
+    contador = AtividadeContador.query.filter_by(setor_id=1, status='Pendente', prioridade='Média').one()
+    contador.total += 5
+    db.session.commit()
+    assert reconcile_counters() == [((1, 'Pendente', 'Média'), 6, 1)]
+    assert reconcile_counters() == []
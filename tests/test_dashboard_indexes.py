@@ -0,0 +1,44 @@
+"""
+The dashboard queries are read in index order: their plans never sort rows
+(MySQL "Using filesort", SQLite "USE TEMP B-TREE FOR ORDER BY")
+"""
+
+import pytest
+from sqlalchemy import text
+
+from commands import explain, uses_filesort
+from conftest import run_cli
+
+def _queries():
+    from models import AtividadeArquivada, _dashboard_query, _dashboard_sort_columns
+    return {
+        'all': _dashboard_query().order_by(*_dashboard_sort_columns()).limit(10),
+        'setor': _dashboard_query(1).order_by(*_dashboard_sort_columns()).limit(10),
+        'arquivadas': _dashboard_query(1, model=AtividadeArquivada)
+                      .order_by(*_dashboard_sort_columns(AtividadeArquivada)).limit(10),
+    }
+
+@pytest.fixture
+def atividades(database):
+    from models import create_atividade
+    for i, status in enumerate(['Pendente', 'Em andamento', 'Concluída'] * 10):
+        create_atividade(f'atividade {i}', status, 'Média', 1, local='Sala', setor_id=1 + i % 2)
+    # Planner statistics, as on a database that has been running for a while
+    database.session.execute(text('ANALYZE'))
+    database.session.commit()
+
+@pytest.mark.parametrize('name', ['all', 'setor', 'arquivadas'])
+def test_dashboard_query_has_no_filesort(atividades, name):
+    plan = explain(_queries()[name])
+    assert not uses_filesort(plan), plan
+    assert any('ix_atividade' in line for line in plan), plan
+
+def test_filesort_is_detected_without_index(atividades, database):
+    database.session.execute(text('DROP INDEX ix_atividade_dashboard'))
+    database.session.commit()
+    # Other pooled connections may hold the statement prepared with the old schema
+    database.engine.dispose()
+    assert uses_filesort(explain(_queries()['all']))
+
+def test_check_indexes_command(atividades):
+    assert 'Dashboard queries are served from indexes' in run_cli('check-indexes')
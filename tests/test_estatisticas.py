@@ -0,0 +1,96 @@
+"""
+Statistics (get_estatisticas): the counters, the cached overdue days and the
+overdue count of today agree with a direct query on atividade after status
+changes and as prazos pass, for every setor and for all of them
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import login
+
+HOJE = datetime(2025, 6, 2)
+
+def _setor_key(row):
+    return row[0] or 0
+
+def _esperado(setor_id, agora):
+    """The statistics computed straight from the atividade table"""
+    from models import Atividade, OPEN_STATUSES
+    query = Atividade.query
+    if setor_id is not None:
+        query = query.filter(Atividade.setor_id == setor_id)
+    atividades = query.all()
+    por_setor = Counter(atividade.setor_id for atividade in atividades)
+    return {
+        'total': len(atividades),
+        'por_status': {status: sum(a.status == status for a in atividades) for status in Atividade.status.type.enums},
+        'por_prioridade': {prioridade: sum(a.prioridade == prioridade for a in atividades)
+                           for prioridade in Atividade.prioridade.type.enums},
+        'por_setor': sorted(((setor_id or None, total) for setor_id, total in por_setor.items()), key=_setor_key),
+        'atrasadas': sum(1 for a in atividades if a.prazo and a.prazo < agora and a.status in OPEN_STATUSES),
+    }
+
+def _assert_estatisticas(agora):
+    from models import get_estatisticas
+    for setor_id in (None, 1, 2):
+        stats = get_estatisticas(setor_id, agora=agora)
+        stats['por_setor'] = sorted(((row['setor_id'], row['total']) for row in stats['por_setor']), key=_setor_key)
+        assert stats == _esperado(setor_id, agora), (setor_id, agora)
+
+@pytest.fixture
+def ids(app):
+    from models import create_atividade
+    specs = [
+        ('Pendente', 'Alta', HOJE - timedelta(days=2), 1),
+        ('Em andamento', 'Média', HOJE - timedelta(days=1, hours=-3), 2),
+        ('Pendente', 'Baixa', HOJE + timedelta(hours=8), 1),
+        ('Pendente', 'Alta', HOJE + timedelta(hours=15), 2),
+        ('Em andamento', 'Alta', HOJE + timedelta(days=1, hours=10), 1),
+        ('Concluída', 'Média', HOJE + timedelta(hours=1), 1),
+        ('Cancelada', 'Baixa', HOJE - timedelta(days=3), 2),
+        ('Pendente', 'Média', None, 1),
+        ('Pendente', 'Alta', HOJE + timedelta(hours=9), None),
+    ]
+    return [create_atividade(f'tarefa {i}', status, prioridade, 1, prazo=prazo, local='Sala', setor_id=setor_id).id
+            for i, (status, prioridade, prazo, setor_id) in enumerate(specs)]
+
+def test_matches_a_direct_query_after_status_changes(ids):
+    from models import db, Atividade, bulk_update_status
+    agora = HOJE + timedelta(hours=12)
+    _assert_estatisticas(agora)
+
+    # Closing overdue ones (bulk and ORM) and reopening a finished one
+    bulk_update_status([ids[0], ids[2]], 'Concluída')
+    _assert_estatisticas(agora)
+    atividade = db.session.get(Atividade, ids[1])
+    atividade.status = 'Cancelada'
+    db.session.commit()
+    _assert_estatisticas(agora)
+    bulk_update_status([ids[5], ids[6]], 'Pendente')
+    _assert_estatisticas(agora)
+
+def test_matches_a_direct_query_as_prazos_pass(ids):
+    from models import db, Atividade, get_estatisticas
+    _assert_estatisticas(HOJE + timedelta(hours=7))
+    # Same day, same cached counters: only today's part moves
+    _assert_estatisticas(HOJE + timedelta(hours=8, minutes=1))
+    _assert_estatisticas(HOJE + timedelta(hours=16))
+    # The next days read the prazo days from the counters
+    _assert_estatisticas(HOJE + timedelta(days=1, hours=11))
+    _assert_estatisticas(HOJE + timedelta(days=5))
+
+    # A prazo moved into the past
+    atividade = db.session.get(Atividade, ids[4])
+    atividade.prazo = HOJE - timedelta(days=4)
+    db.session.commit()
+    _assert_estatisticas(HOJE + timedelta(hours=7))
+    assert get_estatisticas(agora=HOJE + timedelta(hours=7))['atrasadas'] == 3
+
+def test_api_serves_the_user_scope(client, ids):
+    login(client, email='t2@x.com')
+    body = client.get('/api/estatisticas').get_json()
+    assert body['total'] == 5
+    assert [row['setor'] for row in body['por_setor']] == ['TI']
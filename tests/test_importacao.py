@@ -0,0 +1,87 @@
+"""
+import-atividades run as a separate process: the dashboard and the
+statistics served by an already running app see the imported rows at once;
+files that can't be read to the end are reported with the line they stop at
+"""
+
+import io
+import subprocess
+import sys
+
+from conftest import ROOT, login, run_cli, subprocess_env
+
+def _csv(path, rows):
+    lines = ['descricao,prioridade,status,local,setor,solicitante']
+    lines += [f'importada {i},Alta,Pendente,Sala {i},TI,Maria' for i in range(rows)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return path
+
+def test_cli_import_is_seen_by_running_app(client, tmp_path):
+    from models import create_atividade
+    create_atividade('existente', 'Pendente', 'Média', 1, local='Sala', setor_id=1)
+    login(client)
+    # Both reads are now cached in this process
+    assert client.get('/api/estatisticas').get_json()['total'] == 1
+    assert client.get('/api/atividades').get_json()['total'] == 1
+
+    output = run_cli('import-atividades', str(_csv(tmp_path / 'lote.csv', 20)), '--email', 'sec@x.com')
+    assert 'Imported 20 of 20' in output
+
+    assert client.get('/api/estatisticas').get_json()['total'] == 21
+    assert client.get('/api/atividades').get_json()['total'] == 21
+    page = client.get('/')
+    assert page.status_code == 200
+    assert 'importada 0' in page.get_data(as_text=True)
+
+def test_rejected_rows_are_reported(client, tmp_path):
+    path = _csv(tmp_path / 'lote.csv', 3)
+    with path.open('a', encoding='utf-8') as f:
+        f.write(',Alta,Pendente,Sala,TI,Maria\n')
+    output = run_cli('import-atividades', str(path), '--email', 'sec@x.com')
+    assert 'Imported 3 of 4 row(s), 1 rejected' in output
+
+def _upload(client, content):
+    return client.post('/import-atividades', data={'arquivo': (io.BytesIO(content), 'lote.csv'), 'formato': 'csv'},
+                       content_type='multipart/form-data')
+
+def test_non_utf8_upload_reports_the_line(client, app):
+    from models import Atividade
+    login(client)
+    # A Windows-1252 export: the first two rows are ASCII, the third has "ç"
+    content = ('descricao,prioridade,status,local,setor,solicitante\r\n'
+               'primeira,Alta,Pendente,Sala 1,TI,Maria\r\n'
+               'segunda,Alta,Pendente,Sala 2,TI,Maria\r\n'
+               'manutenção,Alta,Pendente,Sala 3,TI,João\r\n'
+               'quarta,Alta,Pendente,Sala 4,TI,Maria\r\n').encode('cp1252')
+    app.config['IMPORT_BATCH_SIZE'] = 1
+    try:
+        response = _upload(client, content)
+    finally:
+        app.config['IMPORT_BATCH_SIZE'] = 500
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Importação interrompida na linha <strong>4</strong>' in page
+    assert 'não está em UTF-8' in page
+    # The committed batches are reported and kept
+    assert '2 atividade(s) importada(s)' in page
+    assert sorted(a.descricao for a in Atividade.query.all()) == ['primeira', 'segunda']
+
+def test_csv_syntax_error_reports_the_line(client):
+    login(client)
+    content = ('descricao,prioridade,status,local,setor,solicitante\n'
+               'primeira,Alta,Pendente,Sala 1,TI,Maria\n'
+               f'{"x" * 200000},Alta,Pendente,Sala 2,TI,Maria\n').encode('utf-8')
+    page = _upload(client, content).get_data(as_text=True)
+    assert 'Importação interrompida na linha <strong>3</strong>' in page
+    assert 'CSV inválido' in page
+    assert '1 atividade(s) importada(s)' in page
+
+def test_cli_stops_on_non_utf8_file(tmp_path):
+    path = tmp_path / 'lote.csv'
+    path.write_bytes('descricao,prioridade,status,local,setor,solicitante\nmanutenção,Alta,Pendente,Sala,TI,Ana\n'
+                     .encode('latin-1'))
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'import-atividades', str(path),
+                             '--email', 'sec@x.com'], cwd=ROOT, env=subprocess_env(), capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 1
+    assert 'Stopped at line 2' in result.stdout
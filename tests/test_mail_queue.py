@@ -0,0 +1,94 @@
+"""
+Outbox delivery against a real SMTP server (aiosmtpd on 127.0.0.1): messages
+are sent once, over a reused connection, and failures are retried later
+"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from broker import free_port
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+class Inbox:
+    """aiosmtpd handler keeping every accepted message; refuse=True answers 451"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.refuse = False
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.refuse:
+            return '451 Try again later'
+        self.messages.append(envelope)
+        return '250 OK'
+
+@pytest.fixture
+def smtp(app):
+    inbox = Inbox()
+    controller = Controller(inbox, hostname='127.0.0.1', port=free_port(), auth_require_tls=False,
+                            authenticator=lambda *args: AuthResult(success=True))
+    controller.start()
+    state = app.extensions['mail']
+    previous = state.server, state.port
+    state.server, state.port = '127.0.0.1', controller.port
+    yield inbox
+    state.server, state.port = previous
+    controller.stop()
+
+def _outbox(db, count):
+    from models import EmailOutbox
+    for i in range(count):
+        db.session.add(EmailOutbox(recipients=f'user{i}@x.com', subject=f'Aviso {i}', body='corpo',
+                                   next_attempt_at=datetime.utcnow()))
+    db.session.commit()
+
+def test_drain_sends_each_message_once_over_one_connection(smtp, database):
+    from mail_queue import mail_queue
+    from models import EmailOutbox
+    _outbox(database, 3)
+
+    assert mail_queue.drain() == 3
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp.messages) == ['user0@x.com', 'user1@x.com',
+                                                                         'user2@x.com']
+    assert smtp.connections == 1
+    assert {email.status for email in EmailOutbox.query} == {'sent'}
+    # Nothing is due any more
+    assert mail_queue.drain() == 0
+    assert len(smtp.messages) == 3
+
+def test_refused_message_is_retried_later(smtp, database):
+    from mail_queue import mail_queue
+    from models import EmailOutbox
+    _outbox(database, 1)
+    smtp.refuse = True
+
+    mail_queue.drain()
+    email = EmailOutbox.query.one()
+    assert (email.status, email.attempts) == ('pending', 1)
+    assert email.next_attempt_at > datetime.utcnow()
+    assert '451' in email.last_error
+    assert mail_queue.drain() == 0
+
+def test_password_reset_email_is_sent_by_the_workers(smtp, client, database):
+    from models import EmailOutbox
+    response = client.post('/forgot-password', data={'email': 't2@x.com'})
+    assert response.status_code == 302
+
+    deadline = time.monotonic() + 10
+    while not smtp.messages and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [envelope.rcpt_tos for envelope in smtp.messages] == [['t2@x.com']]
+    assert b'/reset-password/' in smtp.messages[0].content
+    database.session.expire_all()
+    assert EmailOutbox.query.one().status == 'sent'
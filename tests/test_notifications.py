@@ -0,0 +1,102 @@
+"""
+Notification dispatcher: events published to a room within the window leave
+as one task_batch, merged per atividade and in publish order, with a sequence
+number per room; drain() returns once everything queued was emitted
+"""
+
+import threading
+
+import pytest
+
+class FakeSocketIO:
+    """Records the emits of the dispatcher thread"""
+
+    def __init__(self):
+        self.emitted = []
+        self._lock = threading.Lock()
+
+    def emit(self, event, data, room=None):
+        with self._lock:
+            self.emitted.append((event, room, data))
+
+@pytest.fixture
+def dispatcher(app):
+    from notifications import NotificationDispatcher
+    dispatcher = NotificationDispatcher()
+    dispatcher.init_app(app, FakeSocketIO())
+    dispatcher.window = 0.2
+    return dispatcher
+
+def _batches(dispatcher, room):
+    return [data for event, emitted_room, data in dispatcher.socketio.emitted
+            if event == 'task_batch' and emitted_room == room]
+
+def test_events_within_the_window_become_one_batch(dispatcher):
+    dispatcher.publish('new', 'setor_TI', 1, {'descricao': 'um', 'status': 'Pendente'})
+    dispatcher.publish('update', 'setor_TI', 2, {'status': 'Em andamento'})
+    dispatcher.publish('new', 'setor_TI', 3, {'descricao': 'três'})
+    dispatcher.publish('update', 'setor_TI', 1, {'status': 'Concluída'})
+    dispatcher.publish_many('delete', 'setor_TI', [(3, {}), (4, {'descricao': 'quatro'})])
+    dispatcher.drain()
+
+    [batch] = _batches(dispatcher, 'setor_TI')
+    assert batch['seq'] == 1
+    assert batch['source'] == dispatcher.source
+    # One delta per atividade, in the order they were first published
+    assert batch['tasks'] == [
+        {'kind': 'new', 'atividade_id': 1, 'descricao': 'um', 'status': 'Concluída'},
+        {'kind': 'update', 'atividade_id': 2, 'status': 'Em andamento'},
+        {'kind': 'delete', 'atividade_id': 3, 'descricao': 'três'},
+        {'kind': 'delete', 'atividade_id': 4, 'descricao': 'quatro'},
+    ]
+    assert dispatcher.stats()['published'] == 6
+    assert dispatcher.stats()['batches'] == 1
+
+def test_sequence_numbers_per_room(dispatcher):
+    for seq in range(1, 4):
+        dispatcher.publish('update', 'setor_TI', seq, {'status': 'Pendente'})
+        dispatcher.publish('update', 'admin_room', seq, {'status': 'Pendente'})
+        dispatcher.drain()
+    dispatcher.publish('update', 'setor_RH', 9, {'status': 'Pendente'})
+    dispatcher.drain()
+
+    assert [batch['seq'] for batch in _batches(dispatcher, 'setor_TI')] == [1, 2, 3]
+    assert [[task['atividade_id'] for task in batch['tasks']] for batch in _batches(dispatcher, 'setor_TI')] \
+        == [[1], [2], [3]]
+    assert [batch['seq'] for batch in _batches(dispatcher, 'admin_room')] == [1, 2, 3]
+    assert [batch['seq'] for batch in _batches(dispatcher, 'setor_RH')] == [1]
+
+def test_drain_flushes_before_the_window_ends(dispatcher):
+    dispatcher.window = 30
+    dispatcher.publish('new', 'admin_room', 1, {})
+    dispatcher.publish('update', 'admin_room', 2, {})
+    dispatcher.drain(timeout=5)
+    assert [[task['atividade_id'] for task in batch['tasks']] for batch in _batches(dispatcher, 'admin_room')] \
+        == [[1, 2]]
+    assert dispatcher.stats()['queue_depth'] == 0
+
+def test_full_batches_leave_before_the_window_ends(dispatcher):
+    dispatcher.window = 30
+    dispatcher.max_batch = 3
+    for atividade_id in range(6):
+        dispatcher.publish('new', 'admin_room', atividade_id, {})
+    dispatcher.drain(timeout=5)
+    assert [[task['atividade_id'] for task in batch['tasks']] for batch in _batches(dispatcher, 'admin_room')] \
+        == [[0, 1, 2], [3, 4, 5]]
+
+def test_announce_is_emitted_as_is(dispatcher):
+    dispatcher.announce('import_summary', 'admin_room', {'importadas': 3})
+    dispatcher.announce('import_summary', 'admin_room', {'importadas': 4})
+    dispatcher.drain()
+    assert dispatcher.socketio.emitted == [
+        ('import_summary', 'admin_room', {'importadas': 3}),
+        ('import_summary', 'admin_room', {'importadas': 4}),
+    ]
+
+def test_nothing_is_queued_without_socketio():
+    from notifications import NotificationDispatcher
+    dispatcher = NotificationDispatcher()
+    dispatcher.publish('new', 'admin_room', 1, {})
+    dispatcher.drain()
+    assert dispatcher.stats()['published'] == 0
+    assert not dispatcher._started
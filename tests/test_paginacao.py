@@ -0,0 +1,111 @@
+"""
+Dashboard keyset pagination: walking the cursors forwards and backwards
+visits every row once, in the dashboard order, across the NULL prazo boundary
+and ties in status and prazo; a cursor that doesn't decode sends the user back
+to the first page
+"""
+
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import login
+
+PRAZO = datetime(2025, 6, 2, 15, 0)
+
+@pytest.fixture
+def ordem(app):
+    """Ids of a mixed set of atividades, in dashboard order"""
+    from models import create_atividade
+    specs = [
+        # Ties in prazo and status rank, only the id separates them
+        ('Pendente', PRAZO), ('Pendente', PRAZO), ('Em andamento', PRAZO), ('Concluída', PRAZO),
+        ('Cancelada', PRAZO), ('Em andamento', datetime(2025, 6, 1)), ('Pendente', datetime(2025, 7, 1)),
+        # Without prazo, also with ties
+        ('Pendente', None), ('Concluída', None), ('Em andamento', None), ('Pendente', None),
+        ('Em andamento', None),
+    ]
+    ids = [create_atividade(f'tarefa {i}', status, 'Média', 1, prazo=prazo, local='Sala', setor_id=1).id
+           for i, (status, prazo) in enumerate(specs)]
+    rank = {'Em andamento': 1, 'Pendente': 2, 'Cancelada': 2, 'Concluída': 3}
+    keys = {atividade_id: (prazo is None, prazo or datetime.min, rank[status], atividade_id)
+            for atividade_id, (status, prazo) in zip(ids, specs)}
+    return sorted(ids, key=keys.get)
+
+def _forward(per_page):
+    from models import get_all_atividades
+    pagination = get_all_atividades(page=1, per_page=per_page)
+    seen = [row.id for row in pagination.items]
+    cursor = pagination.next_cursor
+    while cursor:
+        pagination = get_all_atividades(per_page=per_page, cursor=cursor)
+        assert len(pagination.items) <= per_page
+        seen += [row.id for row in pagination.items]
+        cursor = pagination.next_cursor
+    return seen
+
+def _backward(per_page):
+    from models import get_all_atividades, encode_cursor
+    cursor, seen = encode_cursor('prev'), []
+    while cursor:
+        pagination = get_all_atividades(per_page=per_page, cursor=cursor)
+        seen = [row.id for row in pagination.items] + seen
+        cursor = pagination.prev_cursor
+    return seen
+
+@pytest.mark.parametrize('per_page', [1, 2, 3, 5])
+def test_cursors_visit_every_row_once_in_order(ordem, per_page):
+    assert _forward(per_page) == ordem
+    assert _backward(per_page) == ordem
+
+def test_setor_pages_follow_the_same_order(ordem):
+    from models import create_atividade, get_atividades_by_setor
+    create_atividade('outro setor', 'Pendente', 'Média', 1, prazo=PRAZO, local='Sala', setor_id=2)
+    pagination = get_atividades_by_setor(1, page=1, per_page=4)
+    seen = [row.id for row in pagination.items]
+    while pagination.next_cursor:
+        pagination = get_atividades_by_setor(1, per_page=4, cursor=pagination.next_cursor)
+        seen += [row.id for row in pagination.items]
+    assert seen == ordem
+
+def _cursor(payload):
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+BAD_CURSORS = [
+    'garbage',
+    '%%%',
+    _cursor('not json'),
+    _cursor('[1, 2]'),
+    _cursor('{"d": "sideways"}'),
+    _cursor('{"d": "next", "k": [0, null, 2, 1]}'),
+    _cursor('{"d": "next", "k": [1, "2025-06-02T15:00:00", 2, 1]}'),
+    _cursor('{"d": "next", "k": [0, "ontem", 2, 1]}'),
+    _cursor('{"d": "next", "k": [0, "2025-06-02T15:00:00", 1e400, 1]}'),
+    _cursor('{"d": "next", "k": [0, "2025-06-02T15:00:00", 2, 99999999999999999999999]}'),
+    _cursor('{"d": "next", "k": [0, "2025-06-02T15:00:00", 2]}'),
+    _cursor('{"d": "next", "k": ' + '[' * 100000 + ']' * 100000 + '}'),
+]
+
+@pytest.mark.parametrize('cursor', BAD_CURSORS)
+def test_bad_cursor_falls_back_to_the_first_page(client, ordem, cursor):
+    login(client)
+    response = client.get('/', query_string={'cursor': cursor})
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/'
+    archive = client.get('/', query_string={'cursor': cursor, 'arquivo': '1'})
+    assert archive.status_code == 302
+    assert archive.headers['Location'] == '/?arquivo=1'
+
+    body = client.get('/api/atividades', query_string={'cursor': cursor, 'per_page': 3}).get_json()
+    assert body['page'] == 1
+    assert [row[0] for row in body['rows']] == ordem[:3]
+
+def test_cursor_round_trip():
+    from models import encode_cursor, decode_cursor
+    assert decode_cursor(encode_cursor('next', (0, PRAZO, 2, 7))) == ('next', (0, PRAZO, 2, 7))
+    assert decode_cursor(encode_cursor('prev', (1, None, 1, 3))) == ('prev', (1, None, 1, 3))
+    assert decode_cursor(encode_cursor('prev')) == ('prev', None)
+    with pytest.raises(ValueError):
+        decode_cursor(_cursor(json.dumps({'d': 'next', 'k': [0, None, 2, 1]})))
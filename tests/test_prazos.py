@@ -0,0 +1,111 @@
+"""
+Deadline scanner: every crossing is notified once, by one scanner, to the
+setor rooms and the admin room; prazos written behind the mark are picked up
+by the next tick
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+AGORA = datetime(2025, 6, 2, 12, 0)
+
+@pytest.fixture
+def announced(monkeypatch):
+    """(event, room, payload) of every announce"""
+    from notifications import notifications
+    calls = []
+    monkeypatch.setattr(notifications, 'announce', lambda event, room, data: calls.append((event, room, data)))
+    return calls
+
+def _nova(descricao, prazo, setor_id=1, status='Pendente'):
+    from models import create_atividade
+    return create_atividade(descricao, status, 'Alta', 1, prazo=prazo, local='Sala', setor_id=setor_id).id
+
+def _batches(announced, alerta):
+    return {room: [task['descricao'] for task in data['tasks']]
+            for event, room, data in announced if event == 'deadline_batch' and data['alerta'] == alerta}
+
+def test_two_ticks_notify_each_crossing_once(announced):
+    from prazos import DeadlineScanner, deadline_scanner
+    scanner = DeadlineScanner()
+    scanner.due_soon = deadline_scanner.due_soon
+    assert scanner.scan(AGORA) == 0  # First run only sets the marks
+
+    _nova('vence', AGORA + timedelta(hours=2))
+    _nova('atrasa', AGORA + timedelta(minutes=5))
+    _nova('concluida', AGORA + timedelta(minutes=5), status='Concluída')
+    _nova('depois', AGORA + timedelta(days=3))
+
+    # 'vence' is due within 24h; 'atrasa' is already overdue and only gets that alert
+    assert scanner.scan(AGORA + timedelta(minutes=10)) == 2
+    assert _batches(announced, 'vencendo')['admin_room'] == ['vence']
+    assert _batches(announced, 'atrasada')['admin_room'] == ['atrasa']
+
+    announced.clear()
+    assert scanner.scan(AGORA + timedelta(minutes=10)) == 0
+    assert scanner.scan(AGORA + timedelta(minutes=11)) == 0
+    assert announced == []
+
+def test_concurrent_scanners_notify_a_window_once(announced, monkeypatch):
+    import prazos
+    from prazos import DeadlineScanner, deadline_scanner
+    a, b = DeadlineScanner(), DeadlineScanner()
+    a.due_soon = b.due_soon = deadline_scanner.due_soon
+    a.scan(AGORA)
+    _nova('atrasa', AGORA + timedelta(minutes=5))
+    tick = AGORA + timedelta(minutes=10)
+
+    # a claims and notifies the window after b read the marks and before its UPDATE
+    get_escopo_versao = prazos.get_escopo_versao
+    def between_read_and_update():
+        monkeypatch.setattr(prazos, 'get_escopo_versao', get_escopo_versao)
+        assert a.scan(tick) == 1
+        return get_escopo_versao()
+    monkeypatch.setattr(prazos, 'get_escopo_versao', between_read_and_update)
+    assert b.scan(tick) == 0
+
+    assert a.scan(tick) + b.scan(tick) == 0
+    assert [(room, data['alerta']) for _, room, data in announced] == [
+        ('setor_TI', 'atrasada'), ('admin_room', 'atrasada'),
+    ]
+
+def test_batches_go_to_each_setor_room_and_the_admin_room(announced):
+    from prazos import deadline_scanner
+    deadline_scanner.scan(AGORA)
+    _nova('ti 1', AGORA + timedelta(minutes=1), setor_id=1)
+    _nova('rh', AGORA + timedelta(minutes=2), setor_id=2)
+    _nova('ti 2', AGORA + timedelta(minutes=3), setor_id=1)
+    _nova('sem setor', AGORA + timedelta(minutes=4), setor_id=None)
+
+    assert deadline_scanner.scan(AGORA + timedelta(minutes=5)) == 4
+    assert _batches(announced, 'atrasada') == {
+        'setor_TI': ['ti 1', 'ti 2'],
+        'setor_RH': ['rh'],
+        'admin_room': ['ti 1', 'rh', 'ti 2', 'sem setor'],
+    }
+    task = next(data for _, room, data in announced if room == 'setor_RH')['tasks'][0]
+    assert task['prazo'] == '02/06/2025 12:02'
+    assert task['setor'] == 'RH'
+
+def test_prazos_written_behind_the_mark_are_notified_next_tick(announced):
+    from models import db, Atividade, bulk_update_status
+    from prazos import deadline_scanner
+    reaberta = _nova('reaberta', AGORA - timedelta(days=2), status='Concluída')
+    editada = _nova('editada', AGORA + timedelta(days=5))
+    deadline_scanner.scan(AGORA)
+
+    # After the marks: a past prazo is created, a task is reopened and one is moved to the next hours
+    _nova('importada', AGORA - timedelta(days=1))
+    bulk_update_status([reaberta], 'Pendente')
+    atividade = db.session.get(Atividade, editada)
+    atividade.prazo = AGORA + timedelta(hours=3)
+    db.session.commit()
+
+    assert deadline_scanner.scan(AGORA + timedelta(minutes=1)) == 3
+    assert _batches(announced, 'atrasada')['admin_room'] == ['reaberta', 'importada']
+    assert _batches(announced, 'vencendo')['admin_room'] == ['editada']
+
+    announced.clear()
+    assert deadline_scanner.scan(AGORA + timedelta(minutes=2)) == 0
+    assert announced == []
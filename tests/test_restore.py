@@ -0,0 +1,52 @@
+"""
+restore.py on a backup of the test database: exact counts must match, approximate
+(MySQL) counts may differ within the tolerance, and a table missing or empty in
+the restore always fails
+"""
+
+import json
+import os
+
+import pytest
+
+import backup
+import restore
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    directory = backup.backup_database(compression='gzip', output_dir=str(tmp_path))
+    assert directory
+    return directory
+
+def edit_manifest(directory, **changes):
+    manifest = restore.load_manifest(directory)
+    rows = changes.pop('rows', {})
+    manifest['rows'].update(rows)
+    manifest.update(changes)
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+def test_backup_verifies(backup_dir):
+    report = restore.restore_backup(backup_dir)
+    assert report['ok']
+    assert report['row_mismatches'] == []
+    assert report['rows'] == sum(restore.load_manifest(backup_dir)['rows'].values())
+
+def test_exact_counts_must_match(backup_dir):
+    edit_manifest(backup_dir, rows={'user': 3})
+    report = restore.restore_backup(backup_dir)
+    assert not report['ok']
+    assert report['row_mismatches'] == [('user', 3, 2, False)]
+
+def test_approximate_counts_within_tolerance(backup_dir):
+    edit_manifest(backup_dir, rows={'user': 3}, rows_exact=False)
+    assert not restore.restore_backup(backup_dir, row_tolerance=0.1)['ok']
+    report = restore.restore_backup(backup_dir, row_tolerance=0.5)
+    assert report['ok']
+    assert report['row_mismatches'] == [('user', 3, 2, True)]
+
+def test_missing_or_empty_table_always_fails(backup_dir):
+    edit_manifest(backup_dir, rows={'atividade': 10, 'fantasma': 5}, rows_exact=False)
+    report = restore.restore_backup(backup_dir, row_tolerance=1.0)
+    assert not report['ok']
+    assert report['row_mismatches'] == [('atividade', 10, 0, False), ('fantasma', 5, None, False)]
@@ -0,0 +1,96 @@
+"""
+Password hashing executor and login throttling: a saturated or slow executor
+answers "Servidor ocupado" on every form that hashes a password
+"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import PASSWORD, login
+
+BUSY = 'Servidor ocupado'
+
+@pytest.fixture
+def hasher():
+    from flask import Flask
+    from security import PasswordHasher
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=1, PASSWORD_HASH_TIMEOUT=0.2)
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+    return hasher
+
+def test_saturated_executor_raises_hash_busy(hasher):
+    from security import HashBusy
+    release = threading.Event()
+    started = [threading.Thread(target=lambda: hasher._run(release.wait)) for _ in range(2)]
+    for thread in started:
+        thread.start()
+    time.sleep(0.05)
+    with pytest.raises(HashBusy):
+        hasher._run(lambda: None)
+    release.set()
+    for thread in started:
+        thread.join()
+    assert hasher._run(lambda: 'ok') == 'ok'
+
+def test_slow_hash_raises_hash_busy_after_timeout(hasher):
+    from security import HashBusy
+    with pytest.raises(HashBusy):
+        hasher._run(time.sleep, 0.5)
+
+@pytest.fixture
+def busy(monkeypatch):
+    from security import password_hasher, HashBusy
+
+    def saturated(*args):
+        raise HashBusy()
+    monkeypatch.setattr(password_hasher, '_run', saturated)
+
+def _flashes(client, response):
+    return client.get(response.headers['Location']).get_data(as_text=True)
+
+def test_login_when_busy(client, busy):
+    response = client.post('/login', data={'email': 'sec@x.com', 'password': PASSWORD})
+    assert BUSY in _flashes(client, response)
+
+def test_register_when_busy(client, busy):
+    from models import get_user_by_email
+    response = client.post('/register', data={'username': 'novo', 'email': 'novo@x.com', 'password': 'Senha123',
+                                              'confirm_password': 'Senha123', 'setor_id': '1'})
+    assert BUSY in _flashes(client, response)
+    assert get_user_by_email('novo@x.com') is None
+
+def test_change_password_when_busy(client, monkeypatch):
+    from security import password_hasher, HashBusy
+    login(client)
+
+    def busy_generate(password):
+        raise HashBusy()
+    monkeypatch.setattr(password_hasher, 'generate', busy_generate)
+    response = client.post('/change-password', data={'current_password': PASSWORD, 'new_password': 'Outra123',
+                                                     'confirm_password': 'Outra123'})
+    assert BUSY in _flashes(client, response)
+
+def test_reset_password_when_busy(client, busy):
+    from models import get_user_by_email
+    token = get_user_by_email('t2@x.com').generate_reset_token()
+    response = client.post(f'/reset-password/{token}', data={'new_password': 'Outra123',
+                                                            'confirm_password': 'Outra123'})
+    assert BUSY in _flashes(client, response)
+    # The token is still valid for a second try
+    assert get_user_by_email('t2@x.com').reset_token == token
+
+def test_throttle_is_per_client_ip(client, app):
+    capacity = app.config['THROTTLE_IP_CAPACITY']
+    for i in range(capacity):
+        client.post('/login', data={'email': f'u{i}@x.com', 'password': 'x'},
+                    environ_base={'REMOTE_ADDR': '10.0.0.1'})
+    blocked = client.post('/login', data={'email': 'outro@x.com', 'password': 'x'},
+                          environ_base={'REMOTE_ADDR': '10.0.0.1'})
+    assert 'Muitas tentativas' in _flashes(client, blocked)
+    other = client.post('/login', data={'email': 'outro@x.com', 'password': 'x'},
+                        environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert 'Credenciais inválidas' in _flashes(client, other)
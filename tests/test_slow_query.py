@@ -0,0 +1,80 @@
+"""
+Slow query log: statements longer than the logged text are EXPLAINed whole, a
+failing EXPLAIN still records the query, and parameter values stay out of the
+log unless SLOW_QUERY_LOG_PARAMETERS is set
+"""
+
+import logging
+import re
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from slow_query import MAX_STATEMENT_LENGTH, SlowQueryLog
+
+@pytest.fixture
+def slow_log(tmp_path):
+    log = SlowQueryLog()
+    app = Flask(__name__)
+    app.config.update(SLOW_QUERY_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN_SAMPLE=1,
+                      SLOW_QUERY_LOG_PATH=str(tmp_path / 'slow.jsonl'))
+    log.init_app(app)
+    yield log
+    event.remove(Engine, 'before_cursor_execute', log._before_cursor_execute)
+    event.remove(Engine, 'after_cursor_execute', log._after_cursor_execute)
+    event.remove(Engine, 'handle_error', log._handle_error)
+    for handler in list(log.logger.handlers):
+        log.logger.removeHandler(handler)
+        handler.close()
+
+def run(log, statement, **parameters):
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        conn.execute(text(statement), parameters).fetchall()
+    log._queue.join()
+    # Named parameters reach sqlite3 as qmarks
+    executed = re.sub(r':\w+', '?', ' '.join(statement.split()))
+    return [entry for entry in log.entries if entry['fingerprint'] == executed]
+
+def test_long_statement_is_explained_whole(slow_log):
+    # Cut at MAX_STATEMENT_LENGTH the subquery is left open, so only the whole text explains
+    statement = 'SELECT * FROM (SELECT ' + ', '.join(f'{i} AS coluna_{i}' for i in range(500)) + ')'
+    assert len(statement) > MAX_STATEMENT_LENGTH
+    [entry] = run(slow_log, statement)
+    assert len(entry['statement']) == MAX_STATEMENT_LENGTH
+    assert entry['explain_error'] is None
+    assert entry['plan']
+
+def test_failed_explain_still_records(slow_log, monkeypatch):
+    def broken(engine, statement, parameters):
+        raise RuntimeError('no plan')
+    monkeypatch.setattr(slow_log, 'explain', broken)
+    [entry] = run(slow_log, 'SELECT 1')
+    assert entry['plan'] is None
+    assert entry['explain_error'] == 'no plan'
+    assert slow_log.recorded == 1
+    assert '"explain_error": "no plan"' in _logged(slow_log)
+
+def _logged(log):
+    with open(log.logger.handlers[0].baseFilename, encoding='utf-8') as f:
+        return f.read()
+
+SECRET_QUERY = 'SELECT :email AS email, :token AS token, :user_id AS user_id, :vazio AS vazio'
+SECRETS = dict(email='maria@example.com', token='s3cr3t-reset-token', user_id=42, vazio=None)
+
+def test_parameters_are_masked_by_default(slow_log):
+    [entry] = run(slow_log, SECRET_QUERY, **SECRETS)
+    assert entry['parameters'] == ['<str len=17>', '<str len=18>', '<int>', 'None']
+    # The EXPLAIN still ran with the real values
+    assert entry['explain_error'] is None
+    logged = _logged(slow_log)
+    assert 'maria@example.com' not in logged and 's3cr3t-reset-token' not in logged
+    assert '<str len=17>' in logged
+
+def test_parameters_logged_when_enabled(slow_log):
+    slow_log.log_parameters = True
+    [entry] = run(slow_log, SECRET_QUERY, **SECRETS)
+    assert entry['parameters'] == ["'maria@example.com'", "'s3cr3t-reset-token'", '42', 'None']
+    assert 's3cr3t-reset-token' in _logged(slow_log)
@@ -0,0 +1,93 @@
+"""
+SOCKETIO_MESSAGE_QUEUE: an event emitted by one process reaches a client
+connected to another one (two workers, or a CLI command and a worker)
+"""
+
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from broker import RedisStandIn, free_port
+from conftest import ROOT, subprocess_env
+
+socketio_client = pytest.importorskip('socketio')
+pytest.importorskip('redis')
+pytest.importorskip('websocket')
+
+SERVER = """
+from app import app, socketio
+socketio.run(app, host='127.0.0.1', port={port}, allow_unsafe_werkzeug=True, use_reloader=False)
+"""
+
+# What a CLI command does after its import: queue the summary, then wait for it
+EMITTER = """
+from app import app, notifications
+with app.app_context():
+    notifications.announce('queue_test', 'admin_room', {'origem': 'outro processo'})
+    notifications.drain()
+"""
+
+def _wait_for_port(port, process, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise AssertionError(process.stdout.read())
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise AssertionError(f'server did not listen on {port}')
+
+@pytest.fixture
+def broker():
+    broker = RedisStandIn().start()
+    yield broker
+    broker.stop()
+
+def test_emit_from_another_process_reaches_client(broker, app):
+    port = free_port()
+    env = subprocess_env(SOCKETIO_MESSAGE_QUEUE=broker.url, DASHBOARD_CACHE_BACKEND='memory')
+    server = subprocess.Popen([sys.executable, '-c', SERVER.format(port=port)], cwd=ROOT, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    client = socketio_client.Client()
+    joined = threading.Event()
+    received = threading.Event()
+    payloads = []
+
+    @client.on('status')
+    def on_status(data):
+        joined.set()
+
+    @client.on('queue_test')
+    def on_queue_test(data):
+        payloads.append(data)
+        received.set()
+
+    try:
+        _wait_for_port(port, server)
+        client.connect(f'http://127.0.0.1:{port}', transports=['websocket'])
+        client.emit('join_admin_room')
+        # The server answers the join with a status event once the client is in the room
+        assert joined.wait(timeout=5)
+
+        emitter = subprocess.run([sys.executable, '-c', EMITTER], cwd=ROOT, env=env,
+                                 capture_output=True, text=True, timeout=60)
+        assert emitter.returncode == 0, emitter.stderr
+        assert received.wait(timeout=10)
+        assert payloads == [{'origem': 'outro processo'}]
+        assert broker.published >= 1
+    finally:
+        client.disconnect()
+        server.terminate()
+        server.wait(timeout=10)
+
+def test_without_queue_emit_stays_in_process(app):
+    from app import socketio
+    # The single-process default keeps the rooms in memory, with no broker
+    assert app.config['SOCKETIO_MESSAGE_QUEUE'] is None
+    assert not isinstance(socketio.server.manager, socketio_client.PubSubManager)
@@ -0,0 +1,41 @@
+"""
+start_production.py: several workers force WebSocket-only Socket.IO, which the
+server then enforces, and the threads per worker never exceed the database pool
+"""
+
+import subprocess
+import sys
+
+import start_production
+from conftest import ROOT, subprocess_env
+
+def test_threads_follow_the_pool(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '5')
+    monkeypatch.setenv('DB_MAX_OVERFLOW', '3')
+    monkeypatch.delenv('GUNICORN_THREADS', raising=False)
+    assert start_production.thread_count() == 8
+    monkeypatch.setenv('GUNICORN_THREADS', '4')
+    assert start_production.thread_count() == 4
+    monkeypatch.setenv('GUNICORN_THREADS', '100')
+    assert start_production.thread_count() == 8
+
+def test_several_workers_are_websocket_only(monkeypatch):
+    monkeypatch.setenv('SOCKETIO_WEBSOCKET_ONLY', 'False')
+    monkeypatch.setenv('DASHBOARD_CACHE_BACKEND', 'none')
+    start_production.worker_environment(1)
+    assert start_production.os.environ['SOCKETIO_WEBSOCKET_ONLY'] == 'False'
+    start_production.worker_environment(3)
+    assert start_production.os.environ['SOCKETIO_WEBSOCKET_ONLY'] == 'True'
+
+def polling_handshake(**env):
+    """Status of a long-polling handshake against an app loaded with env"""
+    code = ("from app import app\n"
+            "print(app.test_client().get('/socket.io/?EIO=4&transport=polling').status_code)")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=subprocess_env(**env),
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return int(result.stdout.split()[-1])
+
+def test_server_refuses_polling_when_websocket_only():
+    assert polling_handshake(SOCKETIO_WEBSOCKET_ONLY='False') == 200
+    assert polling_handshake(SOCKETIO_WEBSOCKET_ONLY='True') == 400